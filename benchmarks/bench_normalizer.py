@@ -0,0 +1,123 @@
+"""
+Benchmark the shared text normalizer against the previous regex implementations.
+
+Checks that utils/text_normalizer.py gives exactly the same output as the old
+TranscriptCleaner.clean_text and process_gold_transcripts code, and reports
+throughput in lines/sec. Runs on the Mozilla and Beatrix reference transcripts
+and ASR outputs if they are present, and on a deterministic synthetic corpus.
+
+Usage:
+    python benchmarks/bench_normalizer.py
+"""
+
+import os
+import re
+import sys
+import glob
+import time
+import random
+import string
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.text_normalizer import clean_hypothesis, normalize_gold_line
+
+CORPORA = {
+    'mozilla': (os.path.join('data', 'reference_transcripts_mozilla', 'orthographic'),
+                os.path.join('output', 'transcripts_mozilla')),
+    'beatrix': (os.path.join('data', 'reference_transcripts_beatrix', 'orthographic'),
+                os.path.join('output', 'transcripts_beatrix')),
+}
+
+# Previous implementations, kept here as the reference for equivalence and speed
+
+_FILLERS = {'uh', 'um', 'hè', 'huh', 'hm', 'hmm', 'eh', 'euh', 'uhm', 'oh', 'ehm'}
+_PUNCTUATION = r'[.,!?;:()\[\]{}"\'-]'
+
+
+def legacy_clean_text(text):
+    text = re.sub(r'\[UNK\]', '', text)
+    text = text.lower()
+    text = re.sub(_PUNCTUATION, '', text)
+    text = text.strip()
+    cleaned_words = [word for word in text.split() if word not in _FILLERS]
+    return re.sub(r'\s+', ' ', ' '.join(cleaned_words)).strip()
+
+
+_fillers_pattern = re.compile('|'.join([r'\buh\b', r'\beh\b', r'\behm\b', r'\boh\b']), re.IGNORECASE)
+_punctuation_pattern = re.compile(f'[{re.escape(string.punctuation)}]')
+_whitespace_pattern = re.compile(r'\s+')
+_space_before_period_pattern = re.compile(r'\s+\.$')
+
+
+def legacy_gold_line(line):
+    line = line.lstrip()
+    clean = _space_before_period_pattern.sub('.', _fillers_pattern.sub('', line))
+    clean = _whitespace_pattern.sub(' ', clean).strip() + ('\n' if clean.endswith('\n') else '')
+    norm = _punctuation_pattern.sub('', line).lower()
+    norm = _whitespace_pattern.sub(' ', norm).strip() + ('\n' if norm.endswith('\n') else '')
+    norm_clean = _punctuation_pattern.sub('', _fillers_pattern.sub('', line)).lower()
+    norm_clean = _whitespace_pattern.sub(' ', norm_clean).strip() + ('\n' if norm_clean.endswith('\n') else '')
+    return clean, norm, norm_clean
+
+
+def synthetic_lines(n_lines=50000, seed=42):
+    """Random Dutch-like lines with fillers, punctuation, [UNK] tokens and irregular whitespace."""
+    rng = random.Random(seed)
+    words = ("Ik de het een en van je dat niet is op te wat in met ze hij er maar die dan nog wel "
+             "ook zijn Koffie dokter uh eh ehm oh Uh hmm [UNK] hè").split()
+    tokens = words + list('.,!?;:()"\'-') + [' ', '  ', '\t', ' .']
+    lines = []
+    for _ in range(n_lines):
+        line = ''.join(rng.choice(tokens) + rng.choice(['', ' ']) for _ in range(rng.randint(0, 40)))
+        lines.append(rng.choice(['', ' ', '  ']) + line + rng.choice(['', '\n', ' .\n', '.']))
+    return lines
+
+
+def read_lines(folder, recursive=False):
+    pattern = os.path.join(folder, '**', '*.txt') if recursive else os.path.join(folder, '*.txt')
+    lines = []
+    for path in glob.glob(pattern, recursive=recursive):
+        with open(path, 'r', encoding='utf-8') as f:
+            lines.extend(f.readlines())
+    return lines
+
+
+def bench(name, fn, lines):
+    start = time.perf_counter()
+    outputs = [fn(line) for line in lines]
+    seconds = time.perf_counter() - start
+    return outputs, len(lines) / seconds if seconds > 0 else float('inf')
+
+
+def report(corpus, kind, lines, legacy, new):
+    if not lines:
+        return 0
+    expected, legacy_rate = bench('legacy', legacy, lines)
+    actual, new_rate = bench('new', new, lines)
+    mismatches = sum(a != b for a, b in zip(expected, actual))
+    print(f"{corpus:>10} {kind:<10} {len(lines):>8} lines  legacy {legacy_rate:>11,.0f} lines/s  "
+          f"normalizer {new_rate:>11,.0f} lines/s  ({new_rate / legacy_rate:.1f}x)"
+          + ("" if not mismatches else f"  {mismatches} MISMATCHES"))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=50000, help='Synthetic lines')
+    args = parser.parse_args()
+
+    mismatches = 0
+    for corpus, (ref_dir, asr_dir) in CORPORA.items():
+        mismatches += report(corpus, 'gold', read_lines(ref_dir), legacy_gold_line, normalize_gold_line)
+        mismatches += report(corpus, 'hypothesis', read_lines(asr_dir, recursive=True), legacy_clean_text, clean_hypothesis)
+    lines = synthetic_lines(args.lines)
+    mismatches += report('synthetic', 'gold', lines, legacy_gold_line, normalize_gold_line)
+    mismatches += report('synthetic', 'hypothesis', lines, legacy_clean_text, clean_hypothesis)
+    print("Outputs identical" if mismatches == 0 else f"{mismatches} lines with different output")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,407 @@
+"""
+Reproducible throughput benchmarks for the pipeline, runnable offline on a CPU-only box.
+
+Generates deterministic synthetic audio (speech-like modulated tones plus noise) and
+transcripts, and times the pipeline stages under several configurations:
+- transcribe: transcribe_segments with a stub ASR model (or a local model with --model)
+  per batch size, and per precision (fp32/int8/bf16) for local models
+- normalizer: clean_hypothesis and normalize_gold_lines
+- postprocess: TranscriptCleaner.process_directory per number of worker processes
+- wer: evaluate_models per number of worker processes
+- store: writing and reading the segment store per dtype
+- ctc: greedy CTC decoding of synthetic wav2vec2-sized logits per batch size
+- service: concurrent requests through the transcription service's micro-batcher (stub
+  model) per maximum batch size, with latency percentiles
+
+The stub model has the call signature of a transformers ASR pipeline. It computes a
+spectrogram and a fixed random projection per input, so its cost grows with the audio
+length like a real encoder, and returns deterministic text; no network access or model
+download is needed. All benchmarks run in a temporary working directory.
+
+Results are written as JSON (one record per benchmark and configuration, with the git
+revision and platform) for regression tracking. With --baseline, throughputs are compared
+to an earlier results file and the exit code is 1 if any dropped by more than --tolerance.
+
+Usage:
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --quick --benchmarks normalizer,wer
+    python benchmarks/bench_suite.py --model path/to/tiny-whisper --batch-sizes 1,8 --precisions fp32,int8
+    python benchmarks/bench_suite.py --baseline benchmarks/results/baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+import numpy as np
+import soundfile as sf
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+RESULTS_DIR = os.path.join(REPO_DIR, 'benchmarks', 'results')
+BENCHMARKS = ('transcribe', 'normalizer', 'postprocess', 'wer', 'store', 'ctc', 'service')
+SAMPLE_RATE = 16000
+SEGMENT_DURATIONS = (1.0, 2.5, 5.0, 10.0, 20.0, 30.0)
+STUB_MODEL = 'stub/asr-stub'
+
+WORDS = ("ik de het een en van je dat niet is op te wat in met ze hij er maar die "
+         "dan nog wel ook zijn was heb goed ja nee thuis koffie dokter vandaag morgen").split()
+FILLERS = ('uh', 'eh', 'ehm', 'oh')
+
+
+def synthetic_audio(duration, seed, sr=SAMPLE_RATE):
+    """Deterministic speech-like audio: syllable-rate modulated harmonics plus noise, with pauses."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sr)) / sr
+    f0 = rng.uniform(90, 220)
+    voiced = sum(np.sin(2 * np.pi * f0 * k * t + rng.uniform(0, 2 * np.pi)) / k for k in range(1, 6))
+    envelope = np.clip(np.sin(2 * np.pi * rng.uniform(3, 5) * t), 0, None)
+    envelope *= rng.uniform(size=len(t) // sr + 1).repeat(sr)[:len(t)] > 0.2  # pauses of one second
+    audio = 0.2 * voiced * envelope + 0.01 * rng.standard_normal(len(t))
+    return audio.astype(np.float32)
+
+
+def synthetic_text(rng, n_words):
+    return ' '.join(rng.choice(WORDS) for _ in range(n_words))
+
+
+def write_fixtures(segments_dir, n_segments, seed=42):
+    """Write n_segments WAV files cycling through SEGMENT_DURATIONS; returns the total audio duration."""
+    os.makedirs(segments_dir, exist_ok=True)
+    total = 0.0
+    for i in range(n_segments):
+        duration = SEGMENT_DURATIONS[i % len(SEGMENT_DURATIONS)]
+        sf.write(os.path.join(segments_dir, f"rec{i // len(SEGMENT_DURATIONS)}_SPEAKER_0{i % 2}_seg_{i}.wav"),
+                 synthetic_audio(duration, seed + i), SAMPLE_RATE, subtype='PCM_16')
+        total += duration
+    return total
+
+
+def write_transcripts(ref_dir, asr_dir, n_models, n_segments, seed=42):
+    """Reference transcripts and per-model hypotheses with random errors, fillers and punctuation."""
+    rng = random.Random(seed)
+    os.makedirs(ref_dir, exist_ok=True)
+    references = {}
+    for i in range(n_segments):
+        references[f"seg_{i}"] = synthetic_text(rng, rng.randint(1, 60))
+        with open(os.path.join(ref_dir, f"seg_{i}.txt"), 'w', encoding='utf-8') as f:
+            f.write(references[f"seg_{i}"])
+    for m in range(n_models):
+        model_dir = os.path.join(asr_dir, f"model-{m}")
+        os.makedirs(model_dir, exist_ok=True)
+        for segment_id, reference in references.items():
+            words = []
+            for word in reference.split():
+                r = rng.random()
+                if r < 0.05:
+                    continue
+                words.append(rng.choice(WORDS) if r < 0.15 else word)
+                if rng.random() < 0.05:
+                    words.append(rng.choice(FILLERS) + rng.choice(('', ',', '...')))
+            text = ' '.join(words).capitalize() + '.'
+            with open(os.path.join(model_dir, f"{segment_id}.txt"), 'w', encoding='utf-8') as f:
+                f.write(text)
+
+
+class StubTranscriber:
+    """
+    Stand-in for a transformers ASR pipeline: deterministic text, cost proportional to the audio length.
+    """
+
+    def __init__(self, n_fft=400, hop=160, hidden=256, seed=0):
+        self.n_fft = n_fft
+        self.hop = hop
+        self.window = np.hanning(n_fft).astype(np.float32)
+        self.projection = np.random.default_rng(seed).standard_normal((n_fft // 2 + 1, hidden)).astype(np.float32)
+
+    def _read(self, audio_input):
+        if isinstance(audio_input, str):
+            audio, _ = sf.read(audio_input, dtype='float32')
+            return audio
+        return np.asarray(audio_input['raw'], dtype=np.float32)
+
+    def _transcribe(self, audio):
+        if len(audio) < self.n_fft:
+            audio = np.pad(audio, (0, self.n_fft - len(audio)))
+        frames = np.lib.stride_tricks.sliding_window_view(audio, self.n_fft)[::self.hop] * self.window
+        features = np.log1p(np.abs(np.fft.rfft(frames, axis=1))) @ self.projection
+        rng = random.Random(int(features.size) + int(abs(features[:, 0].sum()) * 1000))
+        return synthetic_text(rng, max(1, int(len(audio) / SAMPLE_RATE * 2.5)))
+
+    def __call__(self, inputs, batch_size=1, generate_kwargs=None, **kwargs):
+        single = not isinstance(inputs, list)
+        results = [{"text": self._transcribe(self._read(audio_input))}
+                   for audio_input in ([inputs] if single else inputs)]
+        return results[0] if single else results
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def result(benchmark, config, seconds, items, unit, audio_s=None):
+    record = {'benchmark': benchmark, 'config': config, 'seconds': round(seconds, 4), 'items': items,
+              'unit': unit, 'throughput': round(items / seconds, 3) if seconds > 0 else None}
+    if audio_s is not None:
+        record['audio_s'] = audio_s
+        record['rtf'] = round(seconds / audio_s, 5)
+    return record
+
+
+def bench_transcribe(work_dir, args):
+    from utils.asr_backends import PipelineBackend
+    from utils.model_registry import get_registry
+    from utils.transcribe import transcribe_segments
+
+    segments_dir = os.path.join(work_dir, 'segments')
+    audio_s = write_fixtures(segments_dir, args.segments)
+    model_name = args.model or STUB_MODEL
+    if args.model is None:
+        get_registry().get(('asr', STUB_MODEL, True),
+                           lambda: PipelineBackend(STUB_MODEL, pipeline=StubTranscriber()))
+
+    # The stub has no weights to quantize
+    precisions = args.precisions if args.model else ['fp32']
+    results = []
+    for precision in precisions:
+        for batch_size in args.batch_sizes:
+            output_dir = os.path.join(work_dir, f'transcripts_{precision}_bs{batch_size}')
+            seconds = timed(lambda: transcribe_segments([model_name], cpu=True, segments_dir=segments_dir,
+                                                        output_transcript_dir=output_dir, batch_size=batch_size,
+                                                        precision=precision))
+            results.append(result('transcribe', {'model': model_name, 'batch_size': batch_size,
+                                                 'precision': precision},
+                                  seconds, args.segments, 'segments/s', audio_s))
+    return results
+
+
+def bench_normalizer(work_dir, args):
+    from utils.text_normalizer import clean_hypothesis, normalize_gold_lines
+
+    rng = random.Random(42)
+    lines = [synthetic_text(rng, rng.randint(1, 40)).capitalize() + rng.choice(('.', ' uh.', ', eh?')) + '\n'
+             for _ in range(args.lines)]
+    hypothesis_seconds = timed(lambda: [clean_hypothesis(line) for line in lines])
+    gold_seconds = timed(lambda: normalize_gold_lines(lines))
+    return [result('normalizer', {'kind': 'hypothesis'}, hypothesis_seconds, len(lines), 'lines/s'),
+            result('normalizer', {'kind': 'gold'}, gold_seconds, len(lines), 'lines/s')]
+
+
+def bench_postprocess(work_dir, args):
+    from utils.postprocess_transcripts import TranscriptCleaner
+
+    asr_dir = os.path.join(work_dir, 'asr')
+    if not os.path.exists(asr_dir):
+        write_transcripts(os.path.join(work_dir, 'references'), asr_dir, args.models, args.transcripts)
+    n_files = args.models * args.transcripts
+    cleaner = TranscriptCleaner()
+    results = []
+    for workers in args.workers:
+        output_dir = os.path.join(work_dir, f'cleaned_w{workers}')
+        seconds = timed(lambda: cleaner.process_directory(asr_dir, output_dir, max_workers=workers))
+        results.append(result('postprocess', {'workers': workers}, seconds, n_files, 'files/s'))
+    return results
+
+
+def bench_wer(work_dir, args):
+    from utils.wer_evaluator import evaluate_models
+
+    ref_dir, asr_dir = os.path.join(work_dir, 'references'), os.path.join(work_dir, 'asr')
+    if not os.path.exists(asr_dir):
+        write_transcripts(ref_dir, asr_dir, args.models, args.transcripts)
+    results = []
+    for workers in args.workers:
+        seconds = timed(lambda: evaluate_models(ref_dir, asr_dir, max_workers=workers))
+        results.append(result('wer', {'workers': workers, 'models': args.models}, seconds,
+                              args.models * args.transcripts, 'pairs/s'))
+    return results
+
+
+def bench_store(work_dir, args):
+    from utils.segment_store import SegmentStore, write_recording
+
+    step = int(SEGMENT_DURATIONS[-1] * SAMPLE_RATE)
+    recordings = {f"rec{i}": synthetic_audio(args.segments * SEGMENT_DURATIONS[-1] / 4, 100 + i) for i in range(4)}
+    results = []
+    for dtype in args.dtypes:
+        store_dir = os.path.join(work_dir, f'store_{dtype}')
+
+        def write():
+            for recording_id, audio in recordings.items():
+                segments = [(f"{recording_id}_seg_{j}", 'SPEAKER_00', start, min(start + step, len(audio)))
+                            for j, start in enumerate(range(0, len(audio), step))]
+                write_recording(store_dir, recording_id, audio, segments, dtype=dtype)
+
+        write_seconds = timed(write)
+        store = SegmentStore(store_dir)
+        read_seconds = timed(lambda: [float(store[segment_id].sum()) for segment_id in store])
+        audio_s = store.total_duration()
+        results.append(result('store', {'dtype': dtype, 'op': 'write'}, write_seconds, len(store), 'segments/s',
+                              audio_s))
+        results.append(result('store', {'dtype': dtype, 'op': 'read'}, read_seconds, len(store), 'segments/s',
+                              audio_s))
+    return results
+
+
+def bench_ctc(work_dir, args):
+    from utils.ctc_decoding import ctc_greedy_decode
+
+    vocab = ['<pad>', '<s>', '</s>', '<unk>', '|'] + list('abcdefghijklmnopqrstuvwxyzéëïöü\'')
+    rng = np.random.default_rng(42)
+    frames = int(SEGMENT_DURATIONS[-1] * 50)  # wav2vec2 outputs 50 frames per second
+    results = []
+    for batch_size in args.batch_sizes:
+        n_batches = max(1, args.segments // batch_size)
+        logits = rng.standard_normal((batch_size, frames, len(vocab))).astype(np.float32)
+        logits[..., 0] += 2.0  # Mostly blanks, as in real CTC output
+        lengths = rng.integers(frames // 10, frames + 1, batch_size)
+        seconds = timed(lambda: [ctc_greedy_decode(logits, lengths, vocab, 0, [1, 2, 3]) for _ in range(n_batches)])
+        results.append(result('ctc', {'batch_size': batch_size}, seconds, n_batches * batch_size, 'segments/s'))
+    return results
+
+
+def bench_service(work_dir, args):
+    import asyncio
+    from utils.asr_backends import PipelineBackend
+    from utils.transcription_service import MicroBatcher
+
+    arrays = [synthetic_audio(SEGMENT_DURATIONS[i % 3], 200 + i) for i in range(args.segments)]  # Short utterances
+    audio_s = sum(len(audio) for audio in arrays) / SAMPLE_RATE
+    backend = PipelineBackend(STUB_MODEL, pipeline=StubTranscriber())
+
+    async def run(max_batch_size):
+        batcher = MicroBatcher(backend, max_batch_size=max_batch_size, max_wait=args.max_wait_ms / 1000)
+        batcher.start()
+        try:
+            await asyncio.gather(*(batcher.submit(audio) for audio in arrays))
+        finally:
+            await batcher.stop()
+        return batcher.metrics.snapshot()
+
+    results = []
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        metrics = asyncio.run(run(batch_size))
+        record = result('service', {'max_batch_size': batch_size, 'max_wait_ms': args.max_wait_ms},
+                        time.perf_counter() - start, args.segments, 'requests/s', audio_s)
+        record.update(mean_batch_size=metrics['mean_batch_size'], latency_s=metrics['latency_s'])
+        results.append(record)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, tolerance):
+    """Print throughput changes against a baseline results file; returns the number of regressions."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['benchmark'], json.dumps(r['config'], sort_keys=True)): r for r in json.load(f)['results']}
+    regressions = 0
+    for r in results:
+        base = baseline.get((r['benchmark'], json.dumps(r['config'], sort_keys=True)))
+        if base is None or not base.get('throughput') or not r['throughput']:
+            continue
+        change = r['throughput'] / base['throughput'] - 1
+        regressed = change < -tolerance
+        regressions += regressed
+        print(f"{r['benchmark']:<12} {json.dumps(r['config'], sort_keys=True):<50} {change:+7.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def parse_list(value, cast=int):
+    return [cast(item) for item in value.split(',') if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--benchmarks', default=','.join(BENCHMARKS), help='Comma-separated benchmarks to run')
+    parser.add_argument('--model', help='Local ASR model instead of the stub (loaded offline)')
+    parser.add_argument('--segments', type=int, default=60, help='Synthetic audio segments')
+    parser.add_argument('--lines', type=int, default=50000, help='Synthetic lines for the normalizer')
+    parser.add_argument('--models', type=int, default=6, help='Synthetic models for postprocess and wer')
+    parser.add_argument('--transcripts', type=int, default=1000, help='Synthetic transcripts per model')
+    parser.add_argument('--batch-sizes', default='1,4,8', help='Batch sizes for transcribe, ctc and service')
+    parser.add_argument('--workers', default='1,4', help='Worker processes for postprocess and wer')
+    parser.add_argument('--precisions', default='fp32', help='Model precisions for transcribe with --model')
+    parser.add_argument('--max-wait-ms', type=float, default=20.0, help='Micro-batcher wait for service')
+    parser.add_argument('--dtypes', default='float32,int16', help='Segment store dtypes')
+    parser.add_argument('--quick', action='store_true', help='Small sizes, for a smoke test')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/<timestamp>_<revision>.json)')
+    parser.add_argument('--baseline', help='Earlier results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative throughput drop')
+    args = parser.parse_args()
+
+    if args.quick:
+        args.segments, args.lines, args.models, args.transcripts = 12, 5000, 2, 200
+    args.batch_sizes = parse_list(args.batch_sizes)
+    args.workers = parse_list(args.workers)
+    args.dtypes = parse_list(args.dtypes, str)
+    args.precisions = parse_list(args.precisions, str)
+    if args.model:
+        args.model = os.path.abspath(args.model) if os.path.exists(args.model) else args.model
+    # Never download models or datasets during a benchmark
+    os.environ.setdefault('HF_HUB_OFFLINE', '1')
+    os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+
+    benchmarks = {'transcribe': bench_transcribe, 'normalizer': bench_normalizer, 'postprocess': bench_postprocess,
+                  'wer': bench_wer, 'store': bench_store, 'ctc': bench_ctc,
+                  'service': bench_service}
+    selected = parse_list(args.benchmarks, str)
+    unknown = set(selected) - set(benchmarks)
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = []
+    work_dir = tempfile.mkdtemp(prefix='asr_bench_')
+    cwd = os.getcwd()
+    os.chdir(work_dir)  # Scripts write to output/ relative to the working directory
+    try:
+        for name in selected:
+            for r in benchmarks[name](work_dir, args):
+                results.append(r)
+                rtf = f", RTF {r['rtf']:.4f}" if 'rtf' in r else ''
+                # None when the run was too fast to time
+                throughput = f"{r['throughput']:10.1f}" if r['throughput'] is not None else f"{'n/a':>10}"
+                print(f"{r['benchmark']:<12} {json.dumps(r['config'], sort_keys=True):<50} "
+                      f"{r['seconds']:8.3f} s  {throughput} {r['unit']}{rtf}")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    revision = git_revision()
+    output_path = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{revision or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump({'timestamp': datetime.now().isoformat(timespec='seconds'), 'revision': revision,
+                   'platform': platform.platform(), 'python': platform.python_version(),
+                   'cpu_count': os.cpu_count(), 'args': {k: v for k, v in vars(args).items()},
+                   'results': results}, f, indent=1)
+    print(f"Results written to {output_path}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        print(f"{regressions} regressions (tolerance {args.tolerance:.0%})")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
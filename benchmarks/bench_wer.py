@@ -0,0 +1,111 @@
+"""
+Benchmark the vectorized WER engine against the per-pair jiwer path.
+
+Checks that both give identical results (per-utterance WER and corpus-level
+error counts) and reports the time of each. Uses a deterministic synthetic corpus
+by default, or real transcripts with --ref-dir and --asr-dir.
+
+Usage:
+    python benchmarks/bench_wer.py
+    python benchmarks/bench_wer.py --ref-dir data/reference_transcripts_mozilla/normalized \
+        --asr-dir output/transcripts_mozilla_cleaned
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+import jiwer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.wer_engine import WEREngine
+from utils.wer_evaluator import read_reference_transcripts, read_asr_transcripts
+
+WORDS = ("ik de het een en van je dat niet is op te wat in met ze hij er maar die "
+         "dan nog wel ook zijn was heb goed ja nee thuis koffie dokter vandaag morgen").split()
+
+
+def synthetic_corpus(n_models=11, n_segments=2000, seed=42):
+    """Random references, and per model hypotheses with random substitutions, deletions and insertions."""
+    rng = random.Random(seed)
+    references = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 60))) for _ in range(n_segments)]
+    models = {}
+    for m in range(n_models):
+        hypotheses = []
+        for ref in references:
+            words = []
+            for word in ref.split():
+                r = rng.random()
+                if r < 0.05:
+                    continue
+                words.append(rng.choice(WORDS) if r < 0.15 else word)
+                if rng.random() < 0.05:
+                    words.append(rng.choice(WORDS))
+            hypotheses.append(' '.join(words))
+        models[f"model-{m}"] = hypotheses
+    return references, models
+
+
+def jiwer_path(references, models):
+    """The original evaluation loop: one jiwer call per pair, plus jiwer corpus-level counts."""
+    results = {}
+    for model_name, hypotheses in models.items():
+        pairs = [(r, h) for r, h in zip(references, hypotheses) if r.strip() and h.strip()]
+        per_utterance = [jiwer.wer(r, h) for r, h in pairs]
+        output = jiwer.process_words([r for r, _ in pairs], [h for _, h in pairs])
+        errors = output.substitutions + output.deletions + output.insertions
+        results[model_name] = (per_utterance, errors, output.hits + output.substitutions + output.deletions)
+    return results
+
+
+def engine_path(references, models):
+    engine = WEREngine(references)
+    return {model_name: engine.evaluate(hypotheses) for model_name, hypotheses in models.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ref-dir', help='Folder with reference transcripts')
+    parser.add_argument('--asr-dir', help='Folder with one subfolder of transcripts per model')
+    parser.add_argument('--segments', type=int, default=2000, help='Synthetic segments per model')
+    parser.add_argument('--models', type=int, default=11, help='Synthetic models')
+    args = parser.parse_args()
+
+    if args.ref_dir and args.asr_dir:
+        references = read_reference_transcripts(args.ref_dir)
+        models = {name: hyps for name, hyps in read_asr_transcripts(args.asr_dir).items()
+                  if len(hyps) == len(references)}
+    else:
+        references, models = synthetic_corpus(args.models, args.segments)
+
+    start = time.perf_counter()
+    expected = jiwer_path(references, models)
+    jiwer_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = engine_path(references, models)
+    engine_seconds = time.perf_counter() - start
+
+    mismatches = 0
+    for model_name, (per_utterance, errors, ref_words) in expected.items():
+        result = actual[model_name]
+        scored = [w for w in result['utterance_wer'] if w == w]  # drop NaN (skipped pairs)
+        engine_errors = result['substitutions'] + result['deletions'] + result['insertions']
+        if (len(scored) != len(per_utterance) or any(abs(a - b) > 1e-12 for a, b in zip(scored, per_utterance))
+                or engine_errors != errors or result['ref_words'] != ref_words):
+            mismatches += 1
+            print(f"Mismatch for {model_name}")
+
+    n_pairs = sum(len(h) for h in models.values())
+    print(f"Models: {len(models)}, pairs: {n_pairs}")
+    print(f"jiwer per-pair path: {jiwer_seconds:.2f} s")
+    print(f"WER engine:          {engine_seconds:.2f} s ({jiwer_seconds / engine_seconds:.1f}x)")
+    print("Results identical" if mismatches == 0 else f"{mismatches} models with different results")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+import sys
+import types
+
+import numpy as np
+import torch
+
+from utils.asr_backends import (CTCBackend, PipelineBackend, VoxtralBackend, backend_class, select_device,
+                                stitch_texts, window_offsets)
+from utils.ctc_decoding import LogitsCache
+
+SR = 16000
+
+
+class FakeInputs(dict):
+    def __init__(self):
+        super().__init__(input_ids=np.zeros((1, 3), dtype=np.int64), input_features=np.zeros((1, 8)))
+        self.input_ids = self['input_ids']
+        self.device = None
+
+    def to(self, device, dtype=None):
+        self.device = device
+        return self
+
+
+class FakeProcessor:
+    def __init__(self):
+        self.request = None
+
+    def apply_transcrition_request(self, **kwargs):
+        self.request = kwargs
+        self.inputs = FakeInputs()
+        return self.inputs
+
+    def batch_decode(self, outputs, skip_special_tokens=True):
+        return [' '.join(map(str, row)) for row in outputs.tolist()]
+
+
+class FakeModel:
+    """Accepts only what GenerationMixin.generate accepts for Voxtral: model inputs and generation kwargs."""
+
+    def __init__(self, seconds=0.0):
+        self.kwargs = None
+        self.seconds = seconds  # simulated generation time
+
+    def generate(self, input_ids, input_features, max_new_tokens=None, stopping_criteria=None):
+        self.kwargs = {'max_new_tokens': max_new_tokens, 'max_time': stopping_criteria[0].max_time}
+        for criterion in stopping_criteria:
+            criterion.initial_timestamp -= self.seconds
+        stopping_criteria(torch.as_tensor(input_ids), None)
+        return np.array([[0, 0, 0, 7, 8]])
+
+
+def test_voxtral_passes_language_to_request_only():
+    backend = VoxtralBackend(cpu=True)
+    backend.processor, backend.model = FakeProcessor(), FakeModel()
+
+    assert backend.transcribe([np.zeros(SR, dtype=np.float32)], max_time=5.0) == ['7 8']
+    assert backend.processor.request['language'] == 'nl'
+    assert backend.processor.request['sampling_rate'] == SR
+    assert backend.model.kwargs == {'max_new_tokens': 500, 'max_time': 5.0}
+    assert not backend.interrupted
+
+
+def test_voxtral_reports_interrupted_generation():
+    backend = VoxtralBackend(cpu=True)
+    backend.processor, backend.model = FakeProcessor(), FakeModel(seconds=10.0)
+    backend.transcribe([np.zeros(SR, dtype=np.float32)], max_time=5.0)
+    assert backend.interrupted
+
+
+def test_voxtral_respects_cpu():
+    assert VoxtralBackend(cpu=True).device == 'cpu'
+    assert VoxtralBackend(cpu=False).device == select_device(False)
+
+
+def test_window_offsets_cover_audio_with_overlap():
+    offsets = window_offsets(70 * SR, window=30.0, overlap=5.0, sr=SR)
+    assert offsets == [(0, 30 * SR), (25 * SR, 55 * SR), (50 * SR, 70 * SR)]
+    assert window_offsets(10 * SR, window=30.0, overlap=5.0, sr=SR) == [(0, 10 * SR)]
+
+
+def test_stitch_texts_drops_repeated_overlap():
+    assert stitch_texts(["de kat zit op", "Zit op de mat."]) == "de kat zit op de mat."
+    assert stitch_texts(["een twee", "drie vier"]) == "een twee drie vier"
+
+
+CTC_VOCAB = ['<pad>', '<s>', '</s>', '<unk>', '|', 'a', 'b', 'c']
+
+
+class FakeTokenizer:
+    pad_token_id = 0
+    unk_token_id = 3
+    all_special_ids = [0, 1, 2, 3]
+    all_special_tokens = CTC_VOCAB[:4]
+
+    def convert_ids_to_tokens(self, token_id):
+        return CTC_VOCAB[token_id]
+
+
+class FakeCTCBackend(CTCBackend):
+    """CTCBackend whose 'model' reads the audio as one token id per frame."""
+
+    def __init__(self):
+        super().__init__('fake/wav2vec2', pipeline=types.SimpleNamespace(
+            tokenizer=FakeTokenizer(),
+            model=types.SimpleNamespace(config=types.SimpleNamespace(vocab_size=len(CTC_VOCAB), _commit_hash='abc'))))
+        self.forward_passes = 0
+
+    def logits(self, arrays):
+        self.forward_passes += 1
+        frames = max(len(audio) for audio in arrays)
+        logits = np.zeros((len(arrays), frames, len(CTC_VOCAB)), dtype=np.float32)
+        for i, audio in enumerate(arrays):
+            logits[i, np.arange(len(audio)), audio.astype(int)] = 5.0
+        return logits, np.array([len(audio) for audio in arrays])
+
+
+def tokens(*ids):
+    return np.array(ids, dtype=np.float32)
+
+
+def test_ctc_backend_greedy_decoding_keeps_unk():
+    backend = FakeCTCBackend()
+    texts = backend.transcribe([tokens(5, 5, 0, 5, 4, 6, 3, 1), tokens(7, 7, 4, 2, 5)])
+    assert texts == ['aa b<unk>', 'c a']
+    assert backend.forward_passes == 1
+
+
+def test_ctc_backend_logits_cache(tmp_path):
+    backend = FakeCTCBackend().configure_decoding(logits_cache=str(tmp_path))
+    batch = [tokens(5, 4, 6), tokens(7, 7, 0, 7)]
+    assert backend.transcribe(batch) == ['a b', 'cc']
+    assert backend.transcribe(batch) == ['a b', 'cc']
+    assert backend.forward_passes == 1
+    assert isinstance(backend.logits_cache, LogitsCache)
+    assert backend.logits_cache.stats() == {'hits': 2, 'misses': 2}
+
+
+def fake_transformers(monkeypatch, architectures):
+    config = types.SimpleNamespace(architectures=architectures)
+    auto_config = types.SimpleNamespace(from_pretrained=lambda model_name: config)
+    monkeypatch.setitem(sys.modules, 'transformers', types.SimpleNamespace(AutoConfig=auto_config))
+
+
+def test_backend_class_selection(monkeypatch):
+    assert backend_class('mistralai/Voxtral-Mini-3B-2507') is VoxtralBackend
+    fake_transformers(monkeypatch, ['Wav2Vec2ForCTC'])
+    assert backend_class('facebook/wav2vec2-base-960h') is CTCBackend
+    fake_transformers(monkeypatch, ['WhisperForConditionalGeneration'])
+    assert backend_class('openai/whisper-small') is PipelineBackend
+    fake_transformers(monkeypatch, None)
+    assert backend_class('some/model') is PipelineBackend
@@ -0,0 +1,63 @@
+import numpy as np
+
+from utils.chunking import frame_rms, merge_turns, smart_chunks, split_long_chunks, split_point
+
+SR = 16000
+
+
+def test_frame_rms_matches_loop():
+    rng = np.random.default_rng(0)
+    audio = rng.normal(0, 0.1, SR).astype(np.float32)
+    frame, hop = int(0.025 * SR), int(0.010 * SR)
+    expected = [np.sqrt(np.mean(audio[start:start + frame] ** 2)) for start in range(0, len(audio) - frame + 1, hop)]
+    np.testing.assert_allclose(frame_rms(audio, SR), expected, rtol=1e-5)
+
+
+def test_frame_rms_of_short_audio():
+    assert len(frame_rms(np.ones(10, dtype=np.float32), SR)) == 1
+
+
+def test_merge_turns_of_same_speaker():
+    speaker_segments = {'A': [(0.0, 2.0), (2.5, 4.0), (10.0, 11.0)], 'B': [(4.2, 5.0)]}
+    assert merge_turns(speaker_segments, max_length=30.0, max_gap=1.0) == [
+        ('A', 0.0, 4.0), ('B', 4.2, 5.0), ('A', 10.0, 11.0)]
+
+
+def test_merge_turns_respects_other_speakers_and_max_length():
+    # B speaks between the two turns of A, so they stay apart
+    assert merge_turns({'A': [(0.0, 1.0), (1.6, 2.0)], 'B': [(1.1, 1.5)]}) == [
+        ('A', 0.0, 1.0), ('B', 1.1, 1.5), ('A', 1.6, 2.0)]
+    # Merging would exceed max_length
+    assert merge_turns({'A': [(0.0, 20.0), (20.5, 35.0)]}, max_length=30.0) == [('A', 0.0, 20.0), ('A', 20.5, 35.0)]
+
+
+def test_split_long_chunks_at_fixed_boundaries_without_audio():
+    assert split_long_chunks([('A', 0.0, 70.0)], max_length=30.0) == [
+        ('A', 0.0, 30.0), ('A', 30.0, 60.0), ('A', 60.0, 70.0)]
+
+
+def test_split_long_chunks_at_quietest_frame():
+    audio = np.full(40 * SR, 0.5, dtype=np.float32)
+    audio[27 * SR:int(27.2 * SR)] = 0.0  # pause in the last 5 s before the 30 s limit
+    chunks = split_long_chunks([('A', 0.0, 40.0)], frame_rms(audio, SR), max_length=30.0)
+    assert len(chunks) == 2
+    assert 27.0 <= chunks[0][2] <= 27.2
+    assert chunks[1] == ('A', chunks[0][2], 40.0)
+
+
+def test_split_point_falls_back_to_limit():
+    assert split_point(np.ones(10), start=5.0, limit=5.0) == 5.0
+
+
+def test_smart_chunks_index_segments_per_speaker():
+    chunks = smart_chunks({'A': [(0.0, 1.0), (5.0, 6.0)], 'B': [(2.0, 3.0)]})
+    assert chunks == [('A', 0, 0, 1000), ('B', 0, 2000, 3000), ('A', 1, 5000, 6000)]
+
+
+def test_smart_chunks_never_exceed_max_length():
+    rng = np.random.default_rng(1)
+    audio = rng.normal(0, 0.1, 100 * SR).astype(np.float32)
+    chunks = smart_chunks({'A': [(0.0, 100.0)]}, audio, SR, max_length=30.0)
+    assert all(end - start <= 30000 for _, _, start, end in chunks)
+    assert chunks[0][2] == 0 and chunks[-1][3] == 100000
+    assert all(a[3] == b[2] for a, b in zip(chunks, chunks[1:]))
@@ -0,0 +1,67 @@
+import numpy as np
+
+from utils.ctc_decoding import LogitsCache, ctc_greedy_decode, log_softmax
+
+VOCAB = ['<pad>', '<s>', '</s>', '<unk>', '|', 'a', 'b', 'c']
+BLANK = 0
+
+
+def one_hot(*sequences):
+    """(batch, frames, vocabulary) logits that select the given token ids, padded with blanks."""
+    frames = max(len(sequence) for sequence in sequences)
+    logits = np.zeros((len(sequences), frames, len(VOCAB)), dtype=np.float32)
+    for i, sequence in enumerate(sequences):
+        padded = list(sequence) + [BLANK] * (frames - len(sequence))
+        logits[i, np.arange(frames), padded] = 5.0
+    return logits
+
+
+def decode(logits, lengths=None, special_ids=(1, 2)):
+    lengths = [logits.shape[1]] * len(logits) if lengths is None else lengths
+    return ctc_greedy_decode(logits, lengths, VOCAB, BLANK, special_ids)
+
+
+def test_repeats_collapse():
+    assert decode(one_hot([5, 5, 5, 6, 6, 7])) == ['abc']
+
+
+def test_blank_separates_repeated_tokens():
+    assert decode(one_hot([5, 0, 5, 5, 0, 0, 6])) == ['aab']
+
+
+def test_word_delimiter_becomes_space():
+    # Leading, trailing and repeated delimiters do not leave extra spaces
+    assert decode(one_hot([4, 5, 6, 4, 0, 4, 7, 4])) == ['ab c']
+
+
+def test_special_tokens_are_dropped():
+    assert decode(one_hot([1, 5, 2, 6])) == ['ab']
+    assert decode(one_hot([5, 3, 6]), special_ids=(1, 2)) == ['a<unk>b']
+
+
+def test_lengths_mask_padding():
+    logits = one_hot([5, 6], [7, 4, 5, 6])
+    logits[0, 2:, 7] = 10.0  # garbage in the padding frames of the first item
+    assert decode(logits, lengths=[2, 4]) == ['ab', 'c ab']
+
+
+def test_log_softmax_matches_probabilities():
+    logits = np.random.default_rng(0).normal(size=(2, 3, len(VOCAB))).astype(np.float32)
+    log_probs = log_softmax(logits)
+    np.testing.assert_allclose(np.exp(log_probs).sum(axis=-1), 1.0, rtol=1e-5)
+    assert decode(log_probs) == decode(logits)
+
+
+def test_logits_cache_round_trip(tmp_path):
+    cache = LogitsCache(str(tmp_path))
+    key = LogitsCache.key('digest', 'facebook/wav2vec2-base', 'main')
+    assert key != LogitsCache.key('digest', 'facebook/wav2vec2-base', 'main', precision='int8')
+    log_probs = log_softmax(np.random.default_rng(1).normal(size=(40, len(VOCAB))))
+
+    assert cache.get(key) is None
+    cache.put(key, log_probs)
+    cached = cache.get(key)
+    assert cached.dtype == np.float32 and cached.shape == log_probs.shape
+    np.testing.assert_allclose(cached, log_probs, atol=1e-2)
+    assert decode(cached[None]) == decode(log_probs[None])
+    assert cache.stats() == {'hits': 1, 'misses': 1}
@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from utils.devices import split_cores
+from utils.diarization import DiarizationCache, link_speakers, merge_adjacent, read_rttm, write_rttm
+
+# Voice embeddings of three speakers of a recording
+VOICES = np.eye(3) + 0.05
+
+
+def test_link_speakers_across_chunks():
+    rng = np.random.default_rng(0)
+    noisy = lambda speaker: VOICES[speaker] + rng.normal(0, 0.02, 3)
+    chunks = [
+        (['A', 'B'], np.stack([noisy(0), noisy(1)]), [30.0, 20.0]),
+        (['A', 'B'], np.stack([noisy(1), noisy(0)]), [10.0, 40.0]),  # local labels swapped
+        (['A'], np.stack([noisy(0)]), [50.0]),
+    ]
+    mappings = link_speakers(chunks, num_speakers=2)
+    assert mappings == [{'A': 'SPEAKER_00', 'B': 'SPEAKER_01'},
+                        {'A': 'SPEAKER_01', 'B': 'SPEAKER_00'},
+                        {'A': 'SPEAKER_00'}]
+
+
+def test_link_speakers_never_merges_speakers_of_one_chunk():
+    # Both local speakers are closest to the same known speaker; the assignment keeps them apart
+    chunks = [(['A'], VOICES[:1], [30.0]),
+              (['A', 'B'], np.stack([VOICES[0], VOICES[0] + 0.1]), [10.0, 10.0])]
+    mappings = link_speakers(chunks, num_speakers=2)
+    assert sorted(mappings[1].values()) == ['SPEAKER_00', 'SPEAKER_01']
+
+
+def test_link_speakers_adds_new_speakers_up_to_num_speakers():
+    chunks = [(['A'], VOICES[:1], [30.0]), (['A'], VOICES[1:2], [30.0]), (['A'], VOICES[2:3], [30.0])]
+    assert [m['A'] for m in link_speakers(chunks, num_speakers=None)] == ['SPEAKER_00', 'SPEAKER_01', 'SPEAKER_02']
+    # With two speakers, the third voice joins the closest known speaker
+    assert [m['A'] for m in link_speakers(chunks, num_speakers=2)][:2] == ['SPEAKER_00', 'SPEAKER_01']
+
+
+def test_speakers_without_embedding_go_to_main_speaker():
+    chunks = [(['A', 'B'], np.stack([VOICES[0], VOICES[1]]), [50.0, 5.0]),
+              (['A', 'B'], np.stack([VOICES[1], np.full(3, np.nan)]), [5.0, 0.3])]
+    assert link_speakers(chunks, num_speakers=2)[1] == {'A': 'SPEAKER_01', 'B': 'SPEAKER_00'}
+
+
+def test_merge_adjacent():
+    merged = merge_adjacent({'S': [(5.0, 6.0), (0.0, 1.0), (1.005, 2.0)]}, max_gap=0.01)
+    assert merged == {'S': [(0.0, 2.0), (5.0, 6.0)]}
+
+
+def test_rttm_round_trip(tmp_path):
+    speaker_segments = {'SPEAKER_00': [(0.0, 1.5), (3.0, 4.25)], 'SPEAKER_01': [(1.5, 3.0)]}
+    path = str(tmp_path / 'a.rttm')
+    write_rttm(path, 'my recording', speaker_segments)
+    assert read_rttm(path) == speaker_segments
+    with open(path) as f:
+        assert f.readline().split()[1] == 'my_recording'
+
+
+def test_cache_hits_and_misses(tmp_path):
+    cache = DiarizationCache(str(tmp_path))
+    key = DiarizationCache.key('digest', 'models/speaker-diarization-3.1/', {'num_speakers': 2})
+    assert key == DiarizationCache.key('digest', 'pyannote/speaker-diarization-3.1', {'num_speakers': 2})
+    assert key != DiarizationCache.key('digest', 'pyannote/speaker-diarization-3.1', {'num_speakers': 3})
+
+    assert cache.get(key) is None
+    cache.put(key, 'audio', {'SPEAKER_00': [(0.0, 1.0)]})
+    assert cache.get(key) == {'SPEAKER_00': [(0.0, 1.0)]}
+    assert cache.stats() == {'hits': 1, 'misses': 1}
+    assert [p.suffix for p in tmp_path.iterdir()] == ['.rttm']
+
+
+def test_import_does_not_load_the_asr_stack():
+    code = ("import sys, utils.segment_audio; "
+            "print(sorted(m for m in ('torch', 'transformers', 'utils.transcribe', 'utils.asr_backends') if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.stdout.strip() == '[]'
+
+
+@pytest.mark.parametrize('n_cores, n_parts, expected', [
+    (8, 3, [[0, 1, 2], [3, 4, 5], [6, 7]]),
+    (2, 3, [[0], [1], [0]]),
+])
+def test_split_cores(n_cores, n_parts, expected):
+    assert split_cores(list(range(n_cores)), n_parts) == expected
@@ -0,0 +1,99 @@
+from utils.model_registry import ModelRegistry, estimate_model_bytes
+
+
+class Tensor:
+    def __init__(self, numel, element_size=4):
+        self._numel = numel
+        self._element_size = element_size
+
+    def numel(self):
+        return self._numel
+
+    def element_size(self):
+        return self._element_size
+
+
+class FakeModel:
+    """Stand-in for a torch module with nbytes of parameters; records whether it was unloaded."""
+
+    def __init__(self, nbytes):
+        self.weights = [Tensor(nbytes // 4)]
+        self.unloaded = False
+
+    def parameters(self):
+        return self.weights
+
+    def buffers(self):
+        return []
+
+    def unload(self):
+        self.unloaded = True
+
+
+def loader(models, key, nbytes=400):
+    def load():
+        models[key] = FakeModel(nbytes)
+        return models[key]
+    return load
+
+
+def test_models_are_loaded_once():
+    registry, models = ModelRegistry(max_models=2), {}
+    first = registry.get('a', loader(models, 'a'))
+    assert registry.get('a', lambda: FakeModel(4)) is first
+    metrics = registry.metrics()
+    assert (metrics['hits'], metrics['misses']) == (1, 1)
+    assert metrics['loads']['a']['bytes'] == 400
+
+
+def test_least_recently_used_model_is_evicted_at_max_models():
+    registry, models = ModelRegistry(max_models=2), {}
+    registry.get('a', loader(models, 'a'))
+    registry.get('b', loader(models, 'b'))
+    registry.get('a', loader(models, 'a'))  # 'b' is now the least recently used
+    registry.get('c', loader(models, 'c'))
+    assert registry.loaded() == ['a', 'c']
+    assert models['b'].unloaded and not models['a'].unloaded
+    assert registry.metrics()['evictions'] == 1
+
+
+def test_memory_budget_evicts_until_within_budget():
+    registry, models = ModelRegistry(max_models=10, memory_budget=1000), {}
+    registry.get('a', loader(models, 'a', 400))
+    registry.get('b', loader(models, 'b', 400))
+    registry.get('c', loader(models, 'c', 600))
+    assert registry.loaded() == ['b', 'c']
+    assert registry.metrics()['loaded_bytes'] == 1000
+    assert models['a'].unloaded and not models['b'].unloaded
+    registry.get('d', loader(models, 'd', 700))
+    assert registry.loaded() == ['d']
+
+
+def test_model_larger_than_budget_is_kept():
+    registry, models = ModelRegistry(max_models=10, memory_budget=100), {}
+    registry.get('a', loader(models, 'a', 50))
+    registry.get('big', loader(models, 'big', 400))
+    assert registry.loaded() == ['big']
+
+
+def test_clear_evicts_everything():
+    registry, models = ModelRegistry(max_models=3), {}
+    for key in 'abc':
+        registry.get(key, loader(models, key))
+    registry.clear()
+    assert registry.loaded() == []
+    assert all(model.unloaded for model in models.values())
+
+
+def test_estimate_model_bytes_of_nested_models():
+    class Pipeline:
+        def __init__(self):
+            self.model = FakeModel(400)
+            self.other = FakeModel(100)
+            self.name = 'pipeline'
+
+    pipeline = Pipeline()
+    assert estimate_model_bytes(pipeline) == 500
+    assert estimate_model_bytes((pipeline, FakeModel(40))) == 540
+    # Shared submodules are counted once
+    assert estimate_model_bytes((pipeline, pipeline.model)) == 500
@@ -0,0 +1,94 @@
+import json
+import os
+
+import pytest
+
+from utils.postprocess_transcripts import MANIFEST_NAME, TranscriptCleaner
+
+
+class CountingCleaner(TranscriptCleaner):
+    """Records which files were (re)processed."""
+
+    def __init__(self):
+        super().__init__()
+        self.processed = []
+
+    def process_file(self, input_path, output_path):
+        self.processed.append(os.path.basename(input_path))
+        return super().process_file(input_path, output_path)
+
+
+@pytest.fixture
+def transcripts(tmp_path):
+    input_dir = tmp_path / 'transcripts'
+    (input_dir / 'model').mkdir(parents=True)
+    (input_dir / 'model' / 'a.txt').write_text("Hallo, Wereld!", encoding='utf-8')
+    (input_dir / 'model' / 'b.txt').write_text("Uhm, goedemorgen.", encoding='utf-8')
+    return input_dir, tmp_path / 'cleaned'
+
+
+def run(input_dir, output_dir):
+    cleaner = CountingCleaner()
+    cleaner.process_directory(str(input_dir), str(output_dir), incremental=True, max_workers=1)
+    return sorted(cleaner.processed)
+
+
+def test_incremental_run_skips_unchanged_files(transcripts):
+    input_dir, output_dir = transcripts
+    assert run(input_dir, output_dir) == ['a.txt', 'b.txt']
+    cleaner = TranscriptCleaner()
+    assert (output_dir / 'model' / 'a.txt').read_text(encoding='utf-8') == cleaner.clean_text("Hallo, Wereld!")
+    assert run(input_dir, output_dir) == []
+
+
+def test_touched_files_are_not_reprocessed(transcripts):
+    input_dir, output_dir = transcripts
+    run(input_dir, output_dir)
+    stat = (input_dir / 'model' / 'a.txt').stat()
+    os.utime(input_dir / 'model' / 'a.txt', ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert run(input_dir, output_dir) == []
+
+
+def test_changed_new_and_removed_files(transcripts):
+    input_dir, output_dir = transcripts
+    run(input_dir, output_dir)
+    (input_dir / 'model' / 'a.txt').write_text("Iets anders, echt!", encoding='utf-8')
+    (input_dir / 'model' / 'c.txt').write_text("Nieuw.", encoding='utf-8')
+    (input_dir / 'model' / 'b.txt').unlink()
+
+    assert run(input_dir, output_dir) == ['a.txt', 'c.txt']
+    assert not (output_dir / 'model' / 'b.txt').exists()
+    with open(output_dir / MANIFEST_NAME, encoding='utf-8') as f:
+        assert sorted(json.load(f)['files']) == ['model/a.txt', 'model/c.txt']
+
+
+def test_deleted_output_is_regenerated(transcripts):
+    input_dir, output_dir = transcripts
+    run(input_dir, output_dir)
+    (output_dir / 'model' / 'b.txt').unlink()
+    assert run(input_dir, output_dir) == ['b.txt']
+
+
+def test_config_change_reprocesses_everything(transcripts, monkeypatch):
+    input_dir, output_dir = transcripts
+    run(input_dir, output_dir)
+    monkeypatch.setattr('utils.postprocess_transcripts.CLEANER_VERSION', 2)
+    assert run(input_dir, output_dir) == ['a.txt', 'b.txt']
+
+
+def test_orphans_are_removed_after_config_change(transcripts, monkeypatch):
+    input_dir, output_dir = transcripts
+    run(input_dir, output_dir)
+    (input_dir / 'model' / 'b.txt').unlink()
+    monkeypatch.setattr('utils.postprocess_transcripts.CLEANER_VERSION', 2)
+    assert run(input_dir, output_dir) == ['a.txt']
+    assert not (output_dir / 'model' / 'b.txt').exists()
+
+
+def test_orphans_are_removed_without_manifest(transcripts):
+    input_dir, output_dir = transcripts
+    # An output directory from a full (non-incremental) run, with an output whose source is gone since
+    (output_dir / 'model').mkdir(parents=True)
+    (output_dir / 'model' / 'old.txt').write_text("oud", encoding='utf-8')
+    assert run(input_dir, output_dir) == ['a.txt', 'b.txt']
+    assert sorted(path.name for path in (output_dir / 'model').iterdir()) == ['a.txt', 'b.txt']
@@ -0,0 +1,57 @@
+import json
+
+import pandas as pd
+import pytest
+
+from utils.profiling import Profiler, load_profile, summarize_profile
+
+
+def test_disabled_profiler_writes_nothing(tmp_path):
+    profiler = Profiler(None)
+    profiler.record('transcribe', audio_s=1.0)
+    with profiler.stage('decode') as event:
+        event['audio_s'] = 1.0
+    assert not profiler.enabled
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_stage_records_wall_time_and_fields(tmp_path):
+    path = str(tmp_path / 'profile.jsonl')
+    profiler = Profiler(path)
+    with profiler.stage('decode', file='a.wav') as event:
+        event['audio_s'] = 2.0
+    profiler.record('transcribe', model='m', audio_s=4.0, model_s=1.0)
+
+    with open(path) as f:
+        events = [json.loads(line) for line in f]
+    assert [event['stage'] for event in events] == ['decode', 'transcribe']
+    assert events[0]['file'] == 'a.wav' and events[0]['wall_s'] >= 0
+    assert events[1]['rtf'] == pytest.approx(0.25)
+    assert {'peak_rss_mb', 'pid', 'timestamp'} <= set(events[1])
+    assert len(load_profile(path)) == 2
+
+
+def test_summarize_record_only_profile(tmp_path):
+    # profile_batch and the streaming stage only use record(), without wall_s
+    path = str(tmp_path / 'profile.jsonl')
+    profiler = Profiler(path)
+    for _ in range(2):
+        profiler.record('transcribe', model='m', audio_s=2.0, model_s=0.5, decode_s=0.1, tokens=10)
+    profiler.record('stream', audio_s=1.0)
+
+    summary = summarize_profile(path).set_index('stage')
+    assert summary.loc['transcribe', 'events'] == 2
+    assert summary.loc['transcribe', 'rtf'] == pytest.approx(0.25)
+    assert summary.loc['transcribe', 'decode_s'] == pytest.approx(0.2)
+    assert summary.loc['transcribe', 'tokens_per_s'] == pytest.approx(20.0)
+    assert summary.loc['stream', 'model'] == '-'
+    assert pd.isna(summary.loc['stream', 'wall_s'])
+
+
+def test_summarize_uses_wall_time_without_model_time():
+    df = pd.DataFrame([{'stage': 'decode', 'audio_s': 10.0, 'wall_s': 1.0, 'peak_rss_mb': 100.0},
+                       {'stage': 'decode', 'audio_s': 10.0, 'wall_s': 3.0, 'peak_rss_mb': 120.0}])
+    row = summarize_profile(df).iloc[0]
+    assert row['rtf'] == pytest.approx(0.2)
+    assert row['wall_p50'] == pytest.approx(2.0)
+    assert row['peak_rss_mb'] == 120.0
@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+from utils.quantization import check_precision, compare_precisions, precision_deltas
+
+
+def write_transcripts(folder, texts):
+    folder.mkdir(parents=True)
+    for segment_id, text in texts.items():
+        (folder / f"{segment_id}.txt").write_text(text, encoding='utf-8')
+
+
+def test_compare_precisions_reports_wer_delta(tmp_path):
+    references = {'s1': 'de kat zit op de mat', 's2': 'goedemorgen allemaal'}
+    write_transcripts(tmp_path / 'ref', references)
+    write_transcripts(tmp_path / 'asr' / 'whisper-small', references)
+    write_transcripts(tmp_path / 'asr' / 'whisper-small-int8', {'s1': 'de kat zat op de mat', 's2': 'goedemorgen allemaal'})
+
+    result = compare_precisions(str(tmp_path / 'ref'), str(tmp_path / 'asr'), ['openai/whisper-small'])
+
+    assert len(result) == 1
+    row = result.iloc[0]
+    assert (row['model'], row['precision']) == ('openai/whisper-small', 'int8')
+    assert row['corpus_wer_fp32'] == 0.0
+    assert row['corpus_wer_delta'] == pytest.approx(1 / 8)
+    assert row['mean_utterance_wer_delta'] == pytest.approx(1 / 12)
+
+
+def test_precision_deltas_fails_loudly_without_matching_runs():
+    summary = pd.DataFrame({'corpus_wer': [0.1, 0.2], 'mean_utterance_wer': [0.1, 0.2]},
+                           index=['asr/whisper-small', 'asr/whisper-small-int8'])
+    assert len(precision_deltas(summary, 'output/asr/', ['openai/whisper-small'])) == 1
+    with pytest.raises(ValueError, match='whisper-medium'):
+        precision_deltas(summary, 'output/asr', ['openai/whisper-medium'])
+    with pytest.raises(ValueError):
+        precision_deltas(summary, 'output/transcripts', ['openai/whisper-small'])
+
+
+def test_check_precision():
+    check_precision('int8', cpu=True)
+    with pytest.raises(ValueError):
+        check_precision('int8', cpu=False)
+    with pytest.raises(ValueError):
+        check_precision('fp16')
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from utils.profiling import latency_percentiles
+from utils.streaming import EnergyEndpointer, StreamingTranscriber
+
+SR = 16000
+
+
+def synthetic_stream(pattern, seed=0):
+    """Concatenate (seconds, is_speech) parts: low noise, or a loud voiced tone for speech."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for seconds, is_speech in pattern:
+        n = int(seconds * SR)
+        audio = rng.normal(0, 0.002, n)
+        if is_speech:
+            audio += 0.3 * np.sin(2 * np.pi * 150 * np.arange(n) / SR)
+        parts.append(audio.astype(np.float32))
+    return np.concatenate(parts)
+
+
+def chunks(audio, chunk_length=0.1):
+    size = int(chunk_length * SR)
+    return [audio[i:i + size] for i in range(0, len(audio), size)]
+
+
+class EchoBackend:
+    """Stand-in for an ASR backend: 'transcribes' audio as its length in samples."""
+    model_name = 'echo'
+
+    def __init__(self):
+        self.calls = 0
+
+    def transcribe(self, audio_inputs, max_time=None):
+        self.calls += 1
+        return [str(len(audio)) for audio in audio_inputs]
+
+
+def test_endpointer_finds_utterances():
+    audio = synthetic_stream([(1.0, False), (1.0, True), (1.0, False), (0.5, True), (1.0, False)])
+    endpointer = EnergyEndpointer(SR)
+    events = [event for chunk in chunks(audio) for event in endpointer.process(chunk)] + endpointer.flush()
+
+    assert [kind for kind, _ in events] == ['start', 'end', 'start', 'end']
+    times = [sample / SR for _, sample in events]
+    assert times == pytest.approx([1.0, 2.0, 3.0, 3.5], abs=0.05)
+
+
+def test_endpointer_ignores_short_clicks_and_closes_at_flush():
+    audio = synthetic_stream([(1.0, False), (0.04, True), (1.0, False), (1.0, True)])
+    endpointer = EnergyEndpointer(SR)
+    events = [event for chunk in chunks(audio) for event in endpointer.process(chunk)]
+    assert [kind for kind, _ in events] == ['start']
+    assert endpointer.flush() == [('end', len(audio))]
+    assert endpointer.flush() == []
+
+
+def test_endpointer_cuts_long_utterances():
+    audio = synthetic_stream([(0.5, False), (5.0, True), (1.0, False)])
+    endpointer = EnergyEndpointer(SR, max_utterance=2.0)
+    events = [event for chunk in chunks(audio) for event in endpointer.process(chunk)]
+    starts = [sample for kind, sample in events if kind == 'start']
+    ends = [sample for kind, sample in events if kind == 'end']
+    assert len(starts) == len(ends) == 3
+    assert all(end - start <= 2.0 * SR for start, end in zip(starts, ends))
+
+
+def test_transcriber_emits_finals_with_pre_roll():
+    audio = synthetic_stream([(1.0, False), (1.0, True), (1.0, False), (0.5, True), (1.0, False)])
+    transcriber = StreamingTranscriber(EchoBackend(), partial_interval=None, pre_roll=0.2)
+    results = []
+    for chunk in chunks(audio):
+        results.extend(transcriber.feed(chunk, arrival=0.0))
+    results.extend(transcriber.flush())
+
+    assert [r['type'] for r in results] == ['final', 'final']
+    assert [r['utterance'] for r in results] == [0, 1]
+    assert results[0]['start_s'] == pytest.approx(0.8, abs=0.05)
+    assert results[0]['end_s'] == pytest.approx(2.0, abs=0.05)
+    # The transcribed audio is exactly the utterance interval
+    assert int(results[1]['text']) == round((results[1]['end_s'] - results[1]['start_s']) * SR)
+    # Between utterances only the pre-roll is buffered
+    assert len(transcriber._buffer) <= 0.2 * SR + 0.1 * SR
+
+
+def test_transcriber_emits_partials_and_skips_them_when_lagging():
+    audio = synthetic_stream([(0.5, False), (3.0, True), (1.0, False)])
+    transcriber = StreamingTranscriber(EchoBackend(), partial_interval=1.0)
+    for chunk in chunks(audio):
+        transcriber.feed(chunk)
+    transcriber.flush()
+    kinds = [r['type'] for r in transcriber.results]
+    assert kinds.count('final') == 1
+    assert kinds.count('partial') >= 2
+
+    lagging = StreamingTranscriber(EchoBackend(), partial_interval=1.0, max_lag=1.0)
+    for chunk in chunks(audio):
+        lagging.feed(chunk, arrival=-10.0)  # every chunk arrived 10 s ago
+    assert lagging.skipped_partials >= 2
+    assert all(r['type'] == 'final' for r in lagging.results)
+
+    summary = transcriber.latency_summary()
+    assert summary['utterances'] == 1
+    assert summary['final_latency_s']['p50'] is not None
+
+
+def test_latency_percentiles():
+    assert latency_percentiles([]) == {'p50': None, 'p95': None, 'p99': None}
+    result = latency_percentiles(np.arange(101) / 100)
+    assert result['p50'] == pytest.approx(0.5)
+    assert result['p95'] == pytest.approx(0.95)
+    assert latency_percentiles([1.0, 2.0], percentiles=(0, 100)) == {'p0': 1.0, 'p100': 2.0}
@@ -0,0 +1,95 @@
+import random
+import re
+import string
+
+import pytest
+
+from utils.postprocess_transcripts import TranscriptCleaner
+from utils.preprocess_gold_transcripts import process_gold_transcripts
+from utils.text_normalizer import clean_hypothesis, normalize_gold_line
+
+# The regex implementations the normalizer replaced, as the reference for equivalence
+
+_FILLERS = {'uh', 'um', 'hè', 'huh', 'hm', 'hmm', 'eh', 'euh', 'uhm', 'oh', 'ehm'}
+_PUNCTUATION = r'[.,!?;:()\[\]{}"\'-]'
+
+
+def legacy_clean_text(text):
+    text = re.sub(r'\[UNK\]', '', text)
+    text = text.lower()
+    text = re.sub(_PUNCTUATION, '', text)
+    text = text.strip()
+    cleaned_words = [word for word in text.split() if word not in _FILLERS]
+    return re.sub(r'\s+', ' ', ' '.join(cleaned_words)).strip()
+
+
+_fillers_pattern = re.compile('|'.join([r'\buh\b', r'\beh\b', r'\behm\b', r'\boh\b']), re.IGNORECASE)
+_punctuation_pattern = re.compile(f'[{re.escape(string.punctuation)}]')
+_whitespace_pattern = re.compile(r'\s+')
+_space_before_period_pattern = re.compile(r'\s+\.$')
+
+
+def legacy_gold_line(line):
+    line = line.lstrip()
+    clean = _space_before_period_pattern.sub('.', _fillers_pattern.sub('', line))
+    clean = _whitespace_pattern.sub(' ', clean).strip() + ('\n' if clean.endswith('\n') else '')
+    norm = _punctuation_pattern.sub('', line).lower()
+    norm = _whitespace_pattern.sub(' ', norm).strip() + ('\n' if norm.endswith('\n') else '')
+    norm_clean = _punctuation_pattern.sub('', _fillers_pattern.sub('', line)).lower()
+    norm_clean = _whitespace_pattern.sub(' ', norm_clean).strip() + ('\n' if norm_clean.endswith('\n') else '')
+    return clean, norm, norm_clean
+
+
+EDGE_CASES = [
+    '',
+    '\n',
+    '   \n',
+    'Uh, ik weet het niet.\n',
+    '  Eh... dat is  OH zo  .\n',
+    'De dokter zei: "ehm, neem twee (2) tabletten" .',
+    '[UNK] hallo [UNK]daar hmm, hè?',
+    'Uhm-uh well-oh\tnee\t.\n',
+    'ik heb een euh koffie gedronken',
+    "Zo'n café, 't is mooi!",
+    'Oh.',
+    'uh\n',
+    'tekst zonder newline .',
+]
+
+
+def random_lines(n_lines=2000, seed=0):
+    rng = random.Random(seed)
+    words = "Ik de het een Koffie dokter uh eh ehm oh Uh UH hmm [UNK] hè café 't zo'n".split()
+    tokens = words + list('.,!?;:()"\'-[]') + [' ', '  ', '\t', ' .']
+    return [rng.choice(['', ' ', '  ']) + ''.join(rng.choice(tokens) + rng.choice(['', ' '])
+                                                  for _ in range(rng.randint(0, 25)))
+            + rng.choice(['', '\n', ' .\n', '.']) for _ in range(n_lines)]
+
+
+@pytest.mark.parametrize('line', EDGE_CASES)
+def test_edge_cases_match_legacy(line):
+    assert clean_hypothesis(line) == legacy_clean_text(line)
+    assert normalize_gold_line(line) == legacy_gold_line(line)
+
+
+def test_random_lines_match_legacy():
+    for line in random_lines():
+        assert clean_hypothesis(line) == legacy_clean_text(line), line
+        assert normalize_gold_line(line) == legacy_gold_line(line), line
+
+
+def test_transcript_cleaner_uses_normalizer():
+    assert TranscriptCleaner().clean_text('Uh, HALLO [UNK] daar!') == 'hallo daar'
+
+
+def test_gold_transcripts_match_legacy(tmp_path):
+    lines = EDGE_CASES[3:] + random_lines(200, seed=1)
+    lines = [line if line.endswith('\n') else line + '\n' for line in lines]
+    (tmp_path / 'orthographic').mkdir()
+    (tmp_path / 'orthographic' / 'a.txt').write_text(''.join(lines), encoding='utf-8')
+
+    process_gold_transcripts(str(tmp_path))
+
+    expected = list(zip(*[legacy_gold_line(line) for line in lines]))
+    for folder, variant in zip(('orthographic_clean', 'normalized', 'normalized_clean'), expected):
+        assert (tmp_path / folder / 'a.txt').read_text(encoding='utf-8') == ''.join(variant)
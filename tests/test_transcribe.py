@@ -0,0 +1,115 @@
+import os
+import time
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+import utils.stream_pipeline as stream_pipeline
+import utils.transcribe as transcribe
+from utils.deadline import Deadline
+from utils.transcribe import transcribe_within
+from utils.transcript_cache import TranscriptCache
+
+SR = 16000
+
+
+class FakeBackend:
+    """Stand-in for an ASR backend that takes `seconds` per batch."""
+    model_name = 'fake'
+
+    def __init__(self, seconds=0.0, cut_short=False):
+        self.seconds = seconds
+        self.cut_short = cut_short  # generation is stopped at max_time (like generate), or runs to completion (CTC)
+        self.batch_sizes = []
+        self.interrupted = False
+
+    def transcribe(self, audio_inputs, max_time=None):
+        self.batch_sizes.append(len(audio_inputs))
+        time.sleep(self.seconds)
+        self.interrupted = self.cut_short and max_time is not None and self.seconds > max_time
+        return ['cut' if self.interrupted else f"{len(audio)} samples" for audio in audio_inputs]
+
+
+def test_transcribe_within_statuses():
+    audio = [np.zeros(SR, dtype=np.float32)]
+    assert transcribe_within(FakeBackend(), audio, Deadline(10.0)) == (['16000 samples'], 'ok')
+    assert transcribe_within(FakeBackend(0.05), audio, Deadline(0.01)) == (['16000 samples'], 'late')
+    assert transcribe_within(FakeBackend(0.05, cut_short=True), audio, Deadline(0.01)) == (['cut'], 'interrupted')
+
+
+@pytest.fixture
+def short_deadlines(monkeypatch):
+    monkeypatch.setattr(Deadline, 'for_audio', classmethod(lambda cls, duration, *args: cls(0.01)))
+
+
+def run_model(backend, monkeypatch, tmp_path):
+    monkeypatch.setattr(stream_pipeline, 'get_transcriber', lambda model_name, cpu=True: backend)
+    segments = {'a': np.zeros(SR, dtype=np.float32), 'b': np.zeros(2 * SR, dtype=np.float32)}
+    timeout_info = {'timeouts': {'fake': []}}
+    stream_pipeline._transcribe_model('fake', segments, str(tmp_path), True, 2, timeout_info)
+    transcripts = {segment_id: (tmp_path / f"{segment_id}.txt").read_text() for segment_id in segments}
+    return transcripts, timeout_info
+
+
+def test_late_batches_are_kept(short_deadlines, monkeypatch, tmp_path):
+    backend = FakeBackend(0.05)
+    transcripts, timeout_info = run_model(backend, monkeypatch, tmp_path)
+    assert backend.batch_sizes == [2]  # not retried one by one
+    assert transcripts == {'a': '16000 samples', 'b': '32000 samples'}
+    assert timeout_info['timeouts']['fake'] == []
+    assert timeout_info['late']['fake'][0]['files'] == ['a.wav', 'b.wav']
+
+
+def test_interrupted_batches_are_retried_then_timed_out(short_deadlines, monkeypatch, tmp_path):
+    backend = FakeBackend(0.05, cut_short=True)
+    transcripts, timeout_info = run_model(backend, monkeypatch, tmp_path)
+    assert backend.batch_sizes == [2, 1, 1]
+    assert transcripts == {'a': 'None', 'b': 'None'}
+    assert [timeout['file'] for timeout in timeout_info['timeouts']['fake']] == ['a.wav', 'b.wav']
+
+
+class CachedBackend(FakeBackend):
+    def revision(self):
+        return 'abc'
+
+    def generation_settings(self):
+        return {'language': 'nl'}
+
+
+def test_cached_segments_are_decoded_once(monkeypatch, tmp_path):
+    segments_dir = tmp_path / 'segments'
+    segments_dir.mkdir()
+    for i, seconds in enumerate([1.0, 2.0, 3.0]):
+        sf.write(str(segments_dir / f"seg_{i}.wav"), np.full(int(seconds * SR), 0.1 * (i + 1), dtype=np.float32), SR)
+    decoded = []
+
+    def load_audio(path):
+        decoded.append(os.path.basename(path))
+        audio, _ = sf.read(path, dtype='float32')
+        return audio
+
+    backend = CachedBackend()
+    monkeypatch.setattr(transcribe, 'load_audio', load_audio)
+    monkeypatch.setattr(transcribe, 'get_transcriber', lambda model_name, cpu=True, precision='fp32': backend)
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('output')
+    cache = TranscriptCache(str(tmp_path / 'cache.sqlite'))
+
+    def run():
+        transcribe.transcribe_segments(['fake'], segments_dir=str(segments_dir),
+                                       output_transcript_dir=str(tmp_path / 'transcripts'), batch_size=2, cache=cache)
+
+    run()
+    assert sorted(decoded) == ['seg_0.wav', 'seg_1.wav', 'seg_2.wav']
+    assert sum(backend.batch_sizes) == 3
+    transcript = tmp_path / 'transcripts' / 'fake' / 'seg_1.txt'
+    assert transcript.read_text() == '32000 samples'
+
+    # Second run: every segment is a cache hit, decoded once and not transcribed
+    decoded.clear()
+    transcript.unlink()
+    run()
+    assert sorted(decoded) == ['seg_0.wav', 'seg_1.wav', 'seg_2.wav']
+    assert sum(backend.batch_sizes) == 3
+    assert transcript.read_text() == '32000 samples'
@@ -0,0 +1,66 @@
+from itertools import count
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from utils import transcript_cache
+from utils.transcript_cache import TranscriptCache, audio_hash, cache_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Strictly increasing timestamps, so LRU order does not depend on the timer resolution."""
+    ticks = count(1)
+    monkeypatch.setattr(transcript_cache, 'time', SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+def test_audio_hash_depends_on_samples_not_dtype():
+    audio = np.linspace(-1, 1, 1000, dtype=np.float32)
+    assert audio_hash(audio) == audio_hash(audio.astype(np.float64))
+    assert audio_hash(audio) != audio_hash(audio[::-1])
+
+
+def test_cache_key_changes_with_model_revision_and_settings():
+    digest = audio_hash(np.zeros(160, dtype=np.float32))
+    key = cache_key(digest, 'openai/whisper-small', 'abc', {'language': 'nl'})
+    assert key == cache_key(digest, 'openai/whisper-small', 'abc', {'language': 'nl'})
+    assert key != cache_key(digest, 'openai/whisper-medium', 'abc', {'language': 'nl'})
+    assert key != cache_key(digest, 'openai/whisper-small', 'def', {'language': 'nl'})
+    assert key != cache_key(digest, 'openai/whisper-small', 'abc', {'language': 'en'})
+
+
+def test_get_put_and_stats(tmp_path, clock):
+    cache = TranscriptCache(str(tmp_path / 'cache.sqlite'))
+    assert cache.get('a') is None
+    cache.put('a', 'model', 'hallo')
+    assert cache.get('a') == 'hallo'
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    assert stats['hit_rate'] == 0.5
+    cache.close()
+
+
+def test_entries_survive_reopening(tmp_path, clock):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = TranscriptCache(path)
+    cache.put('a', 'model', 'hallo')
+    cache.close()
+    assert TranscriptCache(path).get('a') == 'hallo'
+
+
+def test_evicts_least_recently_used(tmp_path, clock):
+    # Every entry is 1 (key) + 10 (text) bytes; room for two
+    cache = TranscriptCache(str(tmp_path / 'cache.sqlite'), max_bytes=22)
+    cache.put('a', 'model', 'x' * 10)
+    cache.put('b', 'model', 'y' * 10)
+    assert cache.get('a') is not None  # 'b' is now the least recently used entry
+    cache.put('c', 'model', 'z' * 10)
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.get('c') is not None
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['bytes'] <= 22
+    cache.close()
@@ -0,0 +1,146 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import utils.transcription_service as transcription_service
+from utils.transcription_service import MicroBatcher, TranscriptionService
+
+SR = 16000
+
+
+class EchoBackend:
+    """Stand-in for an ASR backend: 'transcribes' audio as its length in samples and records batch sizes."""
+
+    def __init__(self, model_name='echo', delay=0.0):
+        self.model_name = model_name
+        self.delay = delay
+        self.batch_sizes = []
+
+    def transcribe(self, audio_inputs, max_time=None):
+        self.batch_sizes.append(len(audio_inputs))
+        time.sleep(self.delay)
+        return [str(len(audio)) for audio in audio_inputs]
+
+
+def audio(seconds):
+    return np.zeros(int(seconds * SR), dtype=np.float32)
+
+
+async def run_batcher(backend, requests, **kwargs):
+    batcher = MicroBatcher(backend, **kwargs)
+    batcher.start()
+    try:
+        return await asyncio.gather(*(batcher.submit(array) for array in requests)), batcher
+    finally:
+        await batcher.stop()
+
+
+def test_concurrent_requests_share_a_batch():
+    backend = EchoBackend()
+    results, batcher = asyncio.run(run_batcher(backend, [audio(1), audio(2), audio(0.5)], max_batch_size=8,
+                                               max_wait=0.5))
+    assert backend.batch_sizes == [3]
+    assert [result['text'] for result in results] == ['16000', '32000', '8000']
+    assert all(result['batch_size'] == 3 and not result['timeout'] for result in results)
+    assert batcher.metrics.snapshot()['completed'] == 3
+
+
+def test_batches_are_capped_at_max_batch_size():
+    backend = EchoBackend()
+    results, _ = asyncio.run(run_batcher(backend, [audio(0.1)] * 10, max_batch_size=4, max_wait=0.5))
+    assert backend.batch_sizes == [4, 4, 2]
+    assert len(results) == 10
+
+
+def test_sparse_requests_wait_at_most_max_wait():
+    async def sparse():
+        backend = EchoBackend()
+        batcher = MicroBatcher(backend, max_batch_size=8, max_wait=0.01)
+        batcher.start()
+        first = await batcher.submit(audio(0.1))
+        second = await batcher.submit(audio(0.1))
+        await batcher.stop()
+        return backend, first, second
+
+    backend, first, second = asyncio.run(sparse())
+    assert backend.batch_sizes == [1, 1]
+    assert first['queue_s'] < 0.5 and second['queue_s'] < 0.5
+
+
+def test_backend_errors_fail_the_batch():
+    class FailingBackend(EchoBackend):
+        def transcribe(self, audio_inputs, max_time=None):
+            raise RuntimeError("model crashed")
+
+    with pytest.raises(RuntimeError, match="model crashed"):
+        asyncio.run(run_batcher(FailingBackend(), [audio(0.1)], max_wait=0.0))
+
+
+
+def test_errors_outside_the_backend_fail_only_their_batch(monkeypatch):
+    calls = []
+
+    def failing_profile_batch(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("profiling failed")
+
+    monkeypatch.setattr(transcription_service, 'profile_batch', failing_profile_batch)
+
+    async def submit_twice():
+        batcher = MicroBatcher(EchoBackend(), max_wait=0.0)
+        batcher.start()
+        try:
+            with pytest.raises(RuntimeError, match="profiling failed"):
+                await batcher.submit(audio(0.1))
+            # The batcher survived the error and serves later requests
+            return await asyncio.wait_for(batcher.submit(audio(0.1)), timeout=5), batcher
+        finally:
+            await batcher.stop()
+
+    result, batcher = asyncio.run(submit_twice())
+    assert result['text'] == '1600'
+    assert batcher.metrics.snapshot()['failed'] == 1
+
+
+def test_stop_fails_in_flight_requests():
+    started, release = threading.Event(), threading.Event()
+
+    class BlockingBackend(EchoBackend):
+        def transcribe(self, audio_inputs, max_time=None):
+            started.set()
+            release.wait(5)
+            return super().transcribe(audio_inputs, max_time)
+
+    async def stop_during_batch():
+        batcher = MicroBatcher(BlockingBackend(), max_wait=0.0)
+        batcher.start()
+        request = asyncio.ensure_future(batcher.submit(audio(0.1)))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        threading.Timer(0.1, release.set).start()  # stop() waits for the running batch to finish
+        await batcher.stop()
+        with pytest.raises(RuntimeError, match="stopped"):
+            await request
+
+    asyncio.run(stop_during_batch())
+
+
+def test_service_routes_requests_per_model():
+    async def serve():
+        service = TranscriptionService(['a', 'b'], backends={'a': EchoBackend('a'), 'b': EchoBackend('b')})
+        await service.start()
+        try:
+            default = await service.transcribe(audio(0.1))
+            other = await service.transcribe(audio(0.1), model='b')
+            with pytest.raises(KeyError):
+                await service.transcribe(audio(0.1), model='c')
+            return default, other, service.metrics()
+        finally:
+            await service.stop()
+
+    default, other, metrics = asyncio.run(serve())
+    assert (default['model'], other['model']) == ('a', 'b')
+    assert metrics['a']['completed'] == metrics['b']['completed'] == 1
@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from utils.vad import (VAD_MANIFEST, dropped_segments, filter_segment, frame_zcr, speech_bounds, speech_frames,
+                       vad_filter_segments)
+from utils.wer_evaluator import _evaluate_model
+
+SR = 16000
+
+
+def synthetic_segment(pattern, seed=0):
+    """Concatenate (seconds, kind) parts: 'silence' (low noise), 'speech' (voiced tone) or 'hiss' (loud noise)."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for seconds, kind in pattern:
+        n = int(seconds * SR)
+        audio = rng.normal(0, 0.001, n)
+        if kind == 'speech':
+            audio += 0.3 * np.sin(2 * np.pi * 150 * np.arange(n) / SR)
+        elif kind == 'hiss':
+            audio = rng.normal(0, 0.2, n)
+        parts.append(audio.astype(np.float32))
+    return np.concatenate(parts)
+
+
+def write_segment(folder, name, audio):
+    path = os.path.join(folder, name)
+    sf.write(path, audio, SR, subtype='PCM_16')
+    return path
+
+
+def test_frame_zcr_separates_voiced_speech_from_noise():
+    assert frame_zcr(synthetic_segment([(1.0, 'speech')])).mean() < 0.05
+    assert frame_zcr(synthetic_segment([(1.0, 'hiss')])).mean() > 0.4
+
+
+def test_speech_bounds_trim_silence_with_padding():
+    audio = synthetic_segment([(2.0, 'silence'), (1.0, 'speech'), (2.0, 'silence')])
+    start, end = speech_bounds(audio, SR, padding=0.2)
+    assert start / SR == pytest.approx(1.8, abs=0.05)
+    assert end / SR == pytest.approx(3.2, abs=0.05)
+
+
+def test_fully_voiced_segment_is_speech():
+    # No pauses: the noise floor estimate lies within the speech itself
+    assert speech_frames(synthetic_segment([(2.0, 'speech')]), SR).mean() > 0.9
+
+
+def test_silence_and_hiss_have_no_speech():
+    assert speech_bounds(synthetic_segment([(2.0, 'silence')]), SR) is None
+    assert speech_bounds(synthetic_segment([(2.0, 'hiss')]), SR) is None
+
+
+def test_filter_segment_statuses(tmp_path):
+    source, output = tmp_path / 'segments', tmp_path / 'vad'
+    source.mkdir()
+    output.mkdir()
+    kept = write_segment(source, 'kept.wav', synthetic_segment([(2.0, 'speech')]))
+    trimmed = write_segment(source, 'trimmed.wav', synthetic_segment([(2.0, 'silence'), (1.0, 'speech'),
+                                                                       (2.0, 'silence')]))
+    dropped = write_segment(source, 'dropped.wav', synthetic_segment([(2.0, 'silence')]))
+    # Output of an earlier run that must disappear once the segment is dropped
+    write_segment(output, 'dropped.wav', synthetic_segment([(1.0, 'speech')]))
+
+    assert filter_segment(kept, str(output))['status'] == 'kept'
+    row = filter_segment(trimmed, str(output))
+    assert row['status'] == 'trimmed'
+    assert sf.info(str(output / 'trimmed.wav')).duration == pytest.approx(row['end_s'] - row['start_s'], abs=0.01)
+    assert filter_segment(dropped, str(output))['status'] == 'dropped'
+    assert not (output / 'dropped.wav').exists()
+
+    # Kept segments are copies: rewriting the output must not change the source
+    output_kept = str(output / 'kept.wav')
+    assert not os.path.islink(output_kept) and os.stat(output_kept).st_nlink == 1
+    sf.write(output_kept, np.zeros(SR, dtype=np.float32), SR)
+    assert sf.info(kept).duration == pytest.approx(2.0)
+
+
+def test_vad_filter_segments_writes_manifest(tmp_path):
+    source, output = tmp_path / 'segments', tmp_path / 'vad'
+    source.mkdir()
+    write_segment(source, 'a.wav', synthetic_segment([(1.0, 'speech')]))
+    write_segment(source, 'b.wav', synthetic_segment([(1.0, 'silence')]))
+
+    manifest = vad_filter_segments(str(source), str(output), max_workers=1)
+    assert dict(zip(manifest['segment_id'], manifest['status'])) == {'a': 'kept', 'b': 'dropped'}
+    assert (output / VAD_MANIFEST).exists()
+    assert dropped_segments(str(output)) == ['b']
+    assert dropped_segments(str(source)) == []
+
+
+def test_dropped_segments_count_as_deletions():
+    references = {'a': 'goedemorgen allemaal', 'b': 'dit is gemist'}
+    hypotheses = {'a': 'goedemorgen allemaal', 'b': ''}  # 'b' was dropped by the VAD
+
+    rows = {row['segment_id']: row for row in _evaluate_model('m', references, hypotheses, False)}
+    assert rows['b']['status'] == 'empty'
+    assert (rows['b']['deletions'], rows['b']['wer']) == (3, 1.0)
+
+    rows = {row['segment_id']: row for row in _evaluate_model('m', references, hypotheses, False,
+                                                              penalize_empty=False)}
+    assert rows['b']['wer'] is None
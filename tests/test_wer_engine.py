@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+
+from utils.wer_engine import Alignment, WEREngine, align, align_batch, wer
+from utils.wer_evaluator import calculate_wer
+
+
+def counts(alignment):
+    return alignment.hits, alignment.substitutions, alignment.deletions, alignment.insertions
+
+
+def reference_counts(ref, hyp):
+    """
+    Plain O(N*M) Levenshtein alignment with the tie-breaking of rapidfuzz's editops (used by jiwer):
+    common prefix and suffix first, then deletion, insertion, diagonal in the backtrace.
+    """
+    result = [0, 0, 0, 0]
+    while ref and hyp and ref[0] == hyp[0]:
+        ref, hyp, result[0] = ref[1:], hyp[1:], result[0] + 1
+    while ref and hyp and ref[-1] == hyp[-1]:
+        ref, hyp, result[0] = ref[:-1], hyp[:-1], result[0] + 1
+    n, m = len(ref), len(hyp)
+    d = np.zeros((n + 1, m + 1), dtype=int)
+    d[:, 0] = np.arange(n + 1)
+    d[0, :] = np.arange(m + 1)
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            d[i, j] = min(d[i - 1, j - 1] + (ref[i - 1] != hyp[j - 1]), d[i - 1, j] + 1, d[i, j - 1] + 1)
+    i, j = n, m
+    while i > 0 and j > 0:
+        if d[i, j] == d[i - 1, j] + 1:
+            result[2] += 1
+            i -= 1
+        elif j > 1 and d[i, j - 1] == d[i - 1, j - 1] - 1:
+            result[3] += 1
+            j -= 1
+        else:
+            result[1 if ref[i - 1] != hyp[j - 1] else 0] += 1
+            i, j = i - 1, j - 1
+    result[2] += i
+    result[3] += j
+    return tuple(result)
+
+
+def test_align_counts_operations():
+    engine = WEREngine(["de kat zit op de mat"])
+    assert counts(engine.align(0, "de kat zit op de mat")) == (6, 0, 0, 0)
+    assert counts(engine.align(0, "de hond zit op mat")) == (4, 1, 1, 0)
+    assert counts(engine.align(0, "de kat zit hier op de mat")) == (6, 0, 0, 1)
+    assert counts(engine.align(0, "")) == (0, 0, 6, 0)
+
+
+def test_wer_of_pair():
+    assert wer("een twee drie vier", "een twee vier") == pytest.approx(0.25)
+    assert np.isnan(wer("", "iets"))
+
+
+def test_align_batch_matches_reference_alignment():
+    rng = np.random.default_rng(0)
+    refs = [rng.integers(0, 6, rng.integers(0, 15)).astype(np.int32) for _ in range(200)]
+    hyps = [rng.integers(0, 6, rng.integers(0, 15)).astype(np.int32) for _ in range(200)]
+    for ref, hyp, alignment in zip(refs, hyps, align_batch(refs, hyps)):
+        assert counts(alignment) == reference_counts(ref.tolist(), hyp.tolist())
+
+
+def test_chunking_does_not_change_results():
+    rng = np.random.default_rng(1)
+    refs = [rng.integers(0, 20, rng.integers(0, 60)).astype(np.int32) for _ in range(300)]
+    hyps = [rng.integers(0, 20, rng.integers(0, 60)).astype(np.int32) for _ in range(300)]
+    expected = [counts(a) for a in align_batch(refs, hyps)]
+    assert [counts(a) for a in align_batch(refs, hyps, chunk_size=7)] == expected
+    # A cell budget smaller than one pair still aligns every pair, one per chunk
+    assert [counts(a) for a in align_batch(refs, hyps, max_cells=10)] == expected
+
+
+def test_long_transcript_pair():
+    rng = np.random.default_rng(2)
+    ref = rng.integers(0, 1000, 5000).astype(np.int32)
+    hyp = ref.copy()
+    hyp[::10] = -5  # 500 substitutions
+    hyp = np.delete(hyp, np.arange(5, 5000, 50))  # 100 deletions
+    alignment = align(ref, hyp)
+    assert alignment.errors == 600
+    assert alignment.ref_words == 5000
+
+
+def test_evaluate_skips_missing_and_empty():
+    engine = WEREngine(["een twee", "drie vier", "vijf"])
+    result = engine.evaluate(["een twee", None, ""])
+    assert result['utterances'] == 1
+    assert result['corpus_wer'] == 0.0
+
+    penalized = engine.evaluate(["een twee", None, ""], skip_empty=False)
+    assert penalized['utterances'] == 2
+    assert penalized['deletions'] == 1
+    assert penalized['corpus_wer'] == pytest.approx(1 / 3)
+
+
+def test_matches_jiwer():
+    jiwer = pytest.importorskip("jiwer")
+    pairs = [("de kat zit op de mat", "de kat zat op mat"), ("hallo", "hallo daar"), ("a b c d", "d c b a")]
+    for reference, hypothesis in pairs:
+        assert wer(reference, hypothesis) == pytest.approx(jiwer.wer(reference, hypothesis))
+
+
+def test_counts_match_jiwer():
+    # Small vocabularies give many alignments of equal cost, so differences in tie-breaking show up
+    jiwer = pytest.importorskip("jiwer")
+    rng = np.random.default_rng(3)
+    words = ['a', 'b', 'c', 'd', 'e']
+    references = [' '.join(rng.choice(words, rng.integers(1, 15))) for _ in range(500)]
+    hypotheses = [' '.join(rng.choice(words, rng.integers(1, 15))) for _ in range(500)]
+    engine = WEREngine(references)
+    for index, (alignment, hypothesis) in enumerate(zip(engine.align_all(hypotheses), hypotheses)):
+        output = jiwer.process_words(references[index], hypothesis)
+        assert counts(alignment) == (output.hits, output.substitutions, output.deletions, output.insertions)
+
+
+def test_calculate_wer_rejects_empty_reference():
+    with pytest.raises(ValueError):
+        calculate_wer("", "iets")
+    assert calculate_wer("een twee", "een drie") == 0.5
+
+
+def test_alignment_properties():
+    alignment = Alignment(hits=3, substitutions=1, deletions=1, insertions=2)
+    assert alignment.errors == 4
+    assert alignment.ref_words == 5
+    assert alignment.wer == pytest.approx(0.8)
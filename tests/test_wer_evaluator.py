@@ -0,0 +1,82 @@
+import math
+
+import pytest
+
+from utils.wer_evaluator import (_evaluate_model, evaluate_models, evaluate_wer, evaluate_wer_detailed,
+                                 summarize_results)
+
+REFERENCES = {'scored': 'de kat zit op de mat', 'missing': 'een twee drie', 'timeout': 'vier vijf',
+              'empty': 'zes zeven acht', 'empty_reference': ''}
+HYPOTHESES = {'scored': 'de kat zat op de mat', 'timeout': 'None', 'empty': '', 'empty_reference': 'iets',
+              'extra': 'geen referentie'}
+
+
+def evaluate(**kwargs):
+    options = dict(penalize_missing=False, penalize_empty=True)
+    options.update(kwargs)
+    rows = _evaluate_model('m', REFERENCES, HYPOTHESES, **options)
+    return {row['segment_id']: row for row in rows}
+
+
+def test_statuses():
+    rows = evaluate()
+    assert {segment_id: row['status'] for segment_id, row in rows.items()} == {
+        'scored': 'scored', 'missing': 'missing', 'timeout': 'timeout', 'empty': 'empty',
+        'empty_reference': 'empty_reference', 'extra': 'no_reference'}
+
+
+def test_default_scoring():
+    rows = evaluate()
+    assert (rows['scored']['substitutions'], rows['scored']['wer']) == (1, pytest.approx(1 / 6))
+    assert (rows['empty']['deletions'], rows['empty']['wer']) == (3, 1.0)
+    for segment_id in ('missing', 'timeout', 'empty_reference'):
+        assert rows[segment_id]['wer'] is None
+
+
+def test_penalize_missing_scores_missing_and_timeouts_only():
+    rows = evaluate(penalize_missing=True)
+    assert (rows['missing']['deletions'], rows['missing']['wer']) == (3, 1.0)
+    assert (rows['timeout']['deletions'], rows['timeout']['wer']) == (2, 1.0)
+    # Empty references are never scored, whatever the flags
+    assert rows['empty_reference']['wer'] is None
+
+
+def test_penalize_empty_false_skips_empty_hypotheses():
+    rows = evaluate(penalize_empty=False)
+    assert rows['empty']['wer'] is None
+    assert rows['scored']['wer'] == pytest.approx(1 / 6)
+
+
+def write_transcripts(folder, transcripts):
+    folder.mkdir(parents=True)
+    for segment_id, text in transcripts.items():
+        (folder / f"{segment_id}.txt").write_text(text, encoding='utf-8')
+
+
+def test_evaluate_models_joins_on_segment_id(tmp_path):
+    write_transcripts(tmp_path / 'refs', {'seg_02': 'goede morgen', 'seg_01': 'hallo daar'})
+    # Listed in another order and with one segment missing: rows are joined on the filename, not the position
+    write_transcripts(tmp_path / 'asr' / 'model-a', {'seg_02': 'goede morgen'})
+    write_transcripts(tmp_path / 'asr' / 'model-b', {'seg_01': 'hallo daar', 'seg_02': 'goede avond'})
+
+    table = evaluate_models(str(tmp_path / 'refs'), str(tmp_path / 'asr'), max_workers=1)
+    rows = {(row.model, row.segment_id): row for row in table.itertuples()}
+    assert rows[('asr/model-a', 'seg_02')].wer == 0.0
+    assert rows[('asr/model-a', 'seg_01')].status == 'missing'
+    assert rows[('asr/model-b', 'seg_01')].wer == 0.0
+    assert rows[('asr/model-b', 'seg_02')].wer == 0.5
+
+    summary = summarize_results(table)
+    assert summary.loc['asr/model-a', 'missing'] == 1
+    assert summary.loc['asr/model-b', 'corpus_wer'] == 0.25
+
+
+def test_evaluate_wer_matches_evaluate_models_defaults():
+    references = ['een twee drie', 'vier vijf', '']
+    hypotheses = {'m': ['een twee drie', '', 'iets']}
+    # The empty hypothesis counts as all words deleted; the empty reference is skipped
+    assert evaluate_wer(references, hypotheses) == {'m': 0.5}
+    assert evaluate_wer(references, hypotheses, penalize_empty=False) == {'m': 0.0}
+    detailed = evaluate_wer_detailed(references, hypotheses)['m']
+    assert (detailed['utterances'], detailed['deletions'], detailed['insertions']) == (2, 2, 0)
+    assert math.isnan(detailed['utterance_wer'][2])
@@ -0,0 +1,456 @@
+"""
+ASR backends: one class per kind of model, behind a common interface.
+
+A backend loads a model, transcribes batches of audio, transcribes long recordings and
+unloads the model, and describes what it supports (BackendCapabilities). The rest of the
+pipeline only talks to backends, so adding a model family means adding a backend here
+instead of branching on model names in transcribe.py.
+
+Backends:
+- PipelineBackend: transformers ASR pipeline, batched generate (Whisper and other seq2seq models)
+- CTCBackend: CTC models such as wav2vec2; batches are run as one forward pass and decoded
+  with numpy (greedy, or beam search with an n-gram LM), without the overhead of the pipeline
+- VoxtralBackend: Voxtral, through its processor's transcription request
+
+backend_for picks the backend from BACKENDS (explicit model names) or from the model's
+architecture. Devices are chosen with select_device: cuda, then mps, then cpu.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Type
+
+import numpy as np
+import torch
+
+try:
+    from utils.audio_io import TARGET_SAMPLE_RATE, load_audio
+    from utils.quantization import load_pipeline
+    from utils.transcript_cache import audio_hash
+    from utils.ctc_decoding import BeamDecoder, LogitsCache, ctc_greedy_decode, log_softmax
+    from utils.chunking import LONGFORM_WINDOW, LONGFORM_OVERLAP, window_offsets
+    from utils.devices import select_device
+except ImportError:  # Run as a script from within utils/
+    from audio_io import TARGET_SAMPLE_RATE, load_audio
+    from quantization import load_pipeline
+    from transcript_cache import audio_hash
+    from ctc_decoding import BeamDecoder, LogitsCache, ctc_greedy_decode, log_softmax
+    from chunking import LONGFORM_WINDOW, LONGFORM_OVERLAP, window_offsets
+    from devices import select_device
+
+VOXTRAL_MODEL = "mistralai/Voxtral-Mini-3B-2507"
+LANGUAGE = "nl"
+
+
+def _stitch_key(word):
+    return word.lower().strip('.,!?;:()[]{}"\'-')
+
+def stitch_texts(texts, max_overlap_words=40):
+    """
+    Join the transcriptions of overlapping windows, dropping the words at the start of each window
+    that repeat the end of the text so far (longest match, ignoring case and punctuation).
+    """
+    words = []
+    for text in texts:
+        new_words = text.split()
+        tail = [_stitch_key(word) for word in words[-max_overlap_words:]]
+        head = [_stitch_key(word) for word in new_words[:max_overlap_words]]
+        overlap = 0
+        for k in range(min(len(tail), len(head)), 0, -1):
+            if tail[-k:] == head[:k]:
+                overlap = k
+                break
+        words.extend(new_words[overlap:])
+    return ' '.join(words)
+
+
+def time_limit_criteria(max_time: float):
+    """
+    Stopping criteria for generate that end generation max_time seconds from now, like its
+    max_time argument. The criterion's triggered attribute tells whether it stopped generation.
+    """
+    from transformers import MaxTimeCriteria, StoppingCriteriaList
+
+    class TimeLimit(MaxTimeCriteria):
+        triggered = False
+
+        def __call__(self, input_ids, scores, **kwargs):
+            stop = super().__call__(input_ids, scores, **kwargs)
+            self.triggered = self.triggered or bool(stop.any() if hasattr(stop, 'any') else stop)
+            return stop
+
+    return StoppingCriteriaList([TimeLimit(max_time, initial_timestamp=time.time())])
+
+
+def _as_arrays(audio_inputs):
+    """Decode file paths; arrays are passed through."""
+    return [load_audio(audio) if isinstance(audio, str) else audio for audio in audio_inputs]
+
+
+@dataclass(frozen=True)
+class BackendCapabilities:
+    """What a backend supports; used by callers to pick batch sizes and options."""
+    max_batch_size: Optional[int] = None  # None: limited by memory only
+    supports_timestamps: bool = False
+    supports_max_time: bool = False  # Generation stops cooperatively after max_time seconds
+    supports_precision: bool = False  # int8/bf16 weights (see utils/quantization.py)
+
+
+class ASRBackend:
+    """
+    Base class of the ASR backends.
+
+    Subclasses implement load and transcribe; transcribe_long defaults to overlapping windows
+    that are transcribed in batches and stitched. After each call, interrupted tells whether
+    max_time stopped generation, i.e. whether the output was cut short.
+    """
+
+    capabilities = BackendCapabilities()
+
+    def __init__(self, model_name: str, cpu: bool = True, precision: str = 'fp32'):
+        self.model_name = model_name
+        self.cpu = cpu
+        self.precision = precision
+        self.device = select_device(cpu)
+        self.interrupted = False
+
+    def load(self) -> 'ASRBackend':
+        """Load the model; returns self."""
+        raise NotImplementedError
+
+    def unload(self) -> None:
+        """Drop the references to the model, so its memory can be freed."""
+        raise NotImplementedError
+
+    def generation_settings(self) -> dict:
+        """Generation settings of the model (part of the transcription cache key)."""
+        return {"language": LANGUAGE}
+
+    def revision(self) -> Optional[str]:
+        """Commit hash of the loaded model weights, if known."""
+        model = getattr(self, 'model', None)
+        return getattr(getattr(model, 'config', None), '_commit_hash', None)
+
+    def tokenizer(self):
+        return None
+
+    def count_tokens(self, text: str) -> Optional[int]:
+        """Number of tokens of a transcription according to the model's tokenizer (None if unknown)."""
+        tokenizer = self.tokenizer()
+        if tokenizer is None:
+            return None
+        return len(tokenizer(text, add_special_tokens=False).input_ids)
+
+    def transcribe(self, audio_inputs: list, max_time: Optional[float] = None) -> List[str]:
+        """
+        Transcribe a batch of audio in a single forward pass.
+
+        Args:
+            audio_inputs: Audio file paths, or mono float32 arrays sampled at TARGET_SAMPLE_RATE
+            max_time: Optional time budget in seconds (if supports_max_time; other backends run to
+                completion and never set interrupted)
+
+        Returns:
+            list: Transcriptions, in the same order as audio_inputs
+        """
+        raise NotImplementedError
+
+    def transcribe_long(self, audio, batch_size=8, window=LONGFORM_WINDOW, overlap=LONGFORM_OVERLAP,
+                        timestamps=False, max_time=None) -> Tuple[str, Optional[List[dict]]]:
+        """
+        Transcribe a full recording with overlapping windows, batch_size windows per forward pass.
+        max_time is the time budget for the whole recording: every batch gets the time that is left.
+
+        Returns:
+            tuple: (text, chunks); chunks is a list of {"start", "end", "text"} dicts (seconds),
+            or None if timestamps is False
+        """
+        offsets = window_offsets(len(audio), window, overlap)
+        end_time = None if max_time is None else time.monotonic() + max_time
+        texts, interrupted = [], False
+        for i in range(0, len(offsets), batch_size):
+            batch = [audio[start:end] for start, end in offsets[i:i + batch_size]]
+            remaining = None if end_time is None else max(0.0, end_time - time.monotonic())
+            texts.extend(text.strip() for text in self.transcribe(batch, max_time=remaining))
+            interrupted = interrupted or self.interrupted
+        self.interrupted = interrupted
+        chunks = None
+        if timestamps:
+            chunks = [{"start": start / TARGET_SAMPLE_RATE, "end": end / TARGET_SAMPLE_RATE, "text": text}
+                      for (start, end), text in zip(offsets, texts)]
+        return stitch_texts(texts), chunks
+
+
+class PipelineBackend(ASRBackend):
+    """transformers ASR pipeline (Whisper and other seq2seq models), batched generate."""
+
+    capabilities = BackendCapabilities(supports_timestamps=True, supports_max_time=True, supports_precision=True)
+
+    def __init__(self, model_name, cpu=True, precision='fp32', pipeline=None):
+        super().__init__(model_name, cpu, precision)
+        self.pipeline = pipeline
+
+    def _load_pipeline(self, **pipeline_kwargs):
+        return load_pipeline(self.model_name, precision=self.precision, device=self.device, **pipeline_kwargs)
+
+    def load(self):
+        if self.pipeline is None:
+            self.pipeline = self._load_pipeline(generate_kwargs={"language": f"<|{LANGUAGE}|>"})
+        return self
+
+    def unload(self):
+        self.pipeline = None
+
+    @property
+    def model(self):
+        return getattr(self.pipeline, 'model', None)
+
+    def tokenizer(self):
+        return getattr(self.pipeline, 'tokenizer', None)
+
+    def transcribe(self, audio_inputs, max_time=None):
+        generate_kwargs = self.generation_settings()
+        time_limit = None
+        if max_time is not None:
+            time_limit = time_limit_criteria(max_time)
+            generate_kwargs["stopping_criteria"] = time_limit
+        if not isinstance(audio_inputs[0], str):
+            audio_inputs = [{"raw": audio, "sampling_rate": TARGET_SAMPLE_RATE} for audio in audio_inputs]
+        results = self.pipeline(audio_inputs, batch_size=len(audio_inputs), generate_kwargs=generate_kwargs)
+        self.interrupted = time_limit is not None and time_limit[0].triggered
+        return [result["text"] for result in results]
+
+    def _timestamp_mode(self):
+        return True
+
+    def transcribe_long(self, audio, batch_size=8, window=LONGFORM_WINDOW, overlap=LONGFORM_OVERLAP,
+                        timestamps=False, max_time=None):
+        """
+        Uses the chunking of the pipeline (chunk_length_s/stride_length_s), which merges overlaps on token level.
+        The pipeline calls generate once per batch of windows; max_time bounds all of them together.
+        """
+        generate_kwargs = self.generation_settings()
+        time_limit = None
+        if max_time is not None and self.capabilities.supports_max_time:
+            # One criterion with a fixed start, so the budget is shared by all generate calls
+            time_limit = time_limit_criteria(max_time)
+            generate_kwargs["stopping_criteria"] = time_limit
+        kwargs = {"return_timestamps": self._timestamp_mode()} if timestamps else {}
+        result = self.pipeline({"raw": audio, "sampling_rate": TARGET_SAMPLE_RATE}, chunk_length_s=window,
+                               stride_length_s=overlap, batch_size=batch_size, generate_kwargs=generate_kwargs,
+                               **kwargs)
+        self.interrupted = time_limit is not None and time_limit[0].triggered
+        chunks = None
+        if timestamps:
+            chunks = [{"start": chunk["timestamp"][0], "end": chunk["timestamp"][1], "text": chunk["text"].strip()}
+                      for chunk in result.get("chunks", [])]
+        return result["text"].strip(), chunks
+
+
+class CTCBackend(PipelineBackend):
+    """
+    CTC models (wav2vec2 and similar). A batch is padded, run through the model in one
+    forward pass and decoded with numpy (see utils/ctc_decoding.py): greedy by default, or
+    with beam search and an n-gram LM after configure_decoding. Models that ship with an LM
+    (pipeline type ctc_with_lm) use its beam search decoder. A forward pass cannot be stopped
+    halfway, so max_time is ignored: a slow batch finishes late, with complete output.
+    """
+
+    capabilities = BackendCapabilities(supports_timestamps=True, supports_precision=True)
+
+    def __init__(self, model_name, cpu=True, precision='fp32', pipeline=None):
+        super().__init__(model_name, cpu, precision, pipeline)
+        self.decoder = None
+        self.logits_cache = None
+        self._vocab = None
+
+    def load(self):
+        if self.pipeline is None:
+            self.pipeline = self._load_pipeline()
+        if getattr(self.pipeline, 'type', None) == 'ctc_with_lm':
+            self.decoder = BeamDecoder(self.pipeline.decoder, settings={'lm': 'bundled'},
+                                       special_tokens=self.pipeline.tokenizer.all_special_tokens)
+        return self
+
+    def configure_decoding(self, lm_path=None, alpha=0.5, beta=1.0, beam_width=None, logits_cache=None):
+        """
+        Choose how logits are decoded.
+
+        Args:
+            lm_path: KenLM language model (.arpa or .bin) for beam search
+            alpha, beta: LM weight and word insertion bonus
+            beam_width: Beam width; without lm_path and beam_width, greedy decoding is used
+            logits_cache: LogitsCache (or a directory) to store and reuse the log-probabilities,
+                so other decoder settings can be tried without running the model again
+
+        Returns:
+            self
+        """
+        if lm_path is not None or beam_width is not None:
+            self.decoder = BeamDecoder.build(self.vocab(), self.blank_id(), lm_path=lm_path, alpha=alpha, beta=beta,
+                                             beam_width=beam_width or 100,
+                                             special_tokens=self.pipeline.tokenizer.all_special_tokens)
+        else:
+            self.decoder = None
+        if isinstance(logits_cache, str):
+            logits_cache = LogitsCache(logits_cache)
+        self.logits_cache = logits_cache
+        return self
+
+    def generation_settings(self):
+        settings = super().generation_settings()
+        if self.decoder is not None:
+            settings['decoder'] = self.decoder.settings()
+        return settings
+
+    def _timestamp_mode(self):
+        # CTC models only support character or word level timestamps
+        return "word"
+
+    def vocab(self):
+        """Token string per output id of the model."""
+        if self._vocab is None:
+            tokenizer = self.pipeline.tokenizer
+            self._vocab = [tokenizer.convert_ids_to_tokens(token_id) or ''
+                           for token_id in range(self.pipeline.model.config.vocab_size)]
+        return self._vocab
+
+    def blank_id(self):
+        return self.pipeline.tokenizer.pad_token_id
+
+    def special_ids(self):
+        """
+        Ids dropped from greedy output: special tokens other than the blank and <unk>. The pipeline's
+        decode keeps <unk>, so raw transcripts (and their WER) match the pipeline path.
+        """
+        tokenizer = self.pipeline.tokenizer
+        return [token_id for token_id in tokenizer.all_special_ids
+                if token_id not in (self.blank_id(), tokenizer.unk_token_id)]
+
+    def logits(self, arrays) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Run a batch through the model.
+
+        Returns:
+            tuple: (batch, frames, vocabulary) float32 logits and the number of valid frames per item
+        """
+        features = self.pipeline.feature_extractor(arrays, sampling_rate=TARGET_SAMPLE_RATE,
+                                                   padding=True, return_tensors="pt")
+        model = self.pipeline.model
+        inputs = {"input_values": features.input_values.to(model.device, dtype=model.dtype)}
+        if "attention_mask" in features:
+            inputs["attention_mask"] = features.attention_mask.to(model.device)
+        with torch.inference_mode():
+            logits = model(**inputs).logits.float().cpu().numpy()
+            lengths = model._get_feat_extract_output_lengths(torch.tensor([len(audio) for audio in arrays]))
+        return logits, np.minimum(lengths.numpy(), logits.shape[1])
+
+    def log_probs(self, arrays) -> List[np.ndarray]:
+        """(frames, vocabulary) log-probabilities per item, from the logits cache where possible."""
+        keys, results = None, [None] * len(arrays)
+        if self.logits_cache is not None:
+            revision = self.revision()
+            keys = [LogitsCache.key(audio_hash(audio), self.model_name, revision, self.precision) for audio in arrays]
+            results = [self.logits_cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            logits, lengths = self.logits([arrays[i] for i in missing])
+            log_probs = log_softmax(logits)
+            for i, item, length in zip(missing, log_probs, lengths):
+                results[i] = item[:length]
+                if keys is not None:
+                    self.logits_cache.put(keys[i], results[i])
+        return results
+
+    def transcribe(self, audio_inputs, max_time=None):
+        arrays = _as_arrays(audio_inputs)
+        if self.decoder is None and self.logits_cache is None:
+            logits, lengths = self.logits(arrays)
+            return ctc_greedy_decode(logits, lengths, self.vocab(), self.blank_id(), self.special_ids())
+
+        log_probs = self.log_probs(arrays)
+        if self.decoder is not None:
+            return self.decoder.decode(log_probs)
+        padded = np.zeros((len(log_probs), max(len(item) for item in log_probs), len(self.vocab())), dtype=np.float32)
+        for i, item in enumerate(log_probs):
+            padded[i, :len(item)] = item
+        return ctc_greedy_decode(padded, [len(item) for item in log_probs], self.vocab(), self.blank_id(),
+                                 self.special_ids())
+
+
+class VoxtralBackend(ASRBackend):
+    """
+    Voxtral, through the transcription request of its processor. Runs in bf16 (it is too
+    slow in fp32), on the CPU if cpu is True, otherwise on the best available device.
+    """
+
+    capabilities = BackendCapabilities(supports_max_time=True)
+
+    def __init__(self, model_name=VOXTRAL_MODEL, cpu=True, precision='fp32'):
+        super().__init__(model_name, cpu, precision)
+        self.model = None
+        self.processor = None
+
+    def load(self):
+        from transformers import AutoProcessor, VoxtralForConditionalGeneration
+
+        if self.precision != 'fp32':
+            print(f"Precision {self.precision} is not supported for {self.model_name}, using its default (bf16)")
+        self.processor = AutoProcessor.from_pretrained(self.model_name)
+        self.model = VoxtralForConditionalGeneration.from_pretrained(self.model_name, torch_dtype=torch.bfloat16,
+                                                                     device_map=self.device)
+        return self
+
+    def unload(self):
+        self.model = None
+        self.processor = None
+
+    def generation_settings(self):
+        return {"language": LANGUAGE, "max_new_tokens": 500}
+
+    def tokenizer(self):
+        return getattr(self.processor, 'tokenizer', None)
+
+    def transcribe(self, audio_inputs, max_time=None):
+        in_memory = not isinstance(audio_inputs[0], str)
+        audio = list(audio_inputs) if len(audio_inputs) > 1 else audio_inputs[0]
+        extra_kwargs = {"sampling_rate": TARGET_SAMPLE_RATE} if in_memory else {}
+        settings = self.generation_settings()
+        inputs = self.processor.apply_transcrition_request(language=settings["language"],
+                                                           audio=audio,
+                                                           model_id=self.model_name, **extra_kwargs)
+        inputs = inputs.to(self.device, dtype=torch.bfloat16)
+
+        # The language is part of the transcription request; generate only takes generation kwargs
+        time_limit = None if max_time is None else time_limit_criteria(max_time)
+        outputs = self.model.generate(**inputs, max_new_tokens=settings["max_new_tokens"], stopping_criteria=time_limit)
+        self.interrupted = time_limit is not None and time_limit[0].triggered
+        return self.processor.batch_decode(outputs[:, inputs.input_ids.shape[1]:], skip_special_tokens=True)
+
+
+# Backends for specific model names; other models are matched on their architecture
+BACKENDS: Dict[str, Type[ASRBackend]] = {
+    VOXTRAL_MODEL: VoxtralBackend,
+}
+
+
+def register_backend(model_name: str, backend: Type[ASRBackend]) -> None:
+    """Use backend for model_name instead of choosing one from the model's architecture."""
+    BACKENDS[model_name] = backend
+
+
+def backend_class(model_name: str) -> Type[ASRBackend]:
+    """Return the backend class for a model: from BACKENDS, CTCBackend for *ForCTC architectures, else PipelineBackend."""
+    if model_name in BACKENDS:
+        return BACKENDS[model_name]
+    from transformers import AutoConfig
+
+    architectures = getattr(AutoConfig.from_pretrained(model_name), 'architectures', None) or []
+    if any(architecture.endswith('ForCTC') for architecture in architectures):
+        return CTCBackend
+    return PipelineBackend
+
+
+def backend_for(model_name: str, cpu: bool = True, precision: str = 'fp32') -> ASRBackend:
+    """Create and load the backend for a model."""
+    return backend_class(model_name)(model_name, cpu=cpu, precision=precision).load()
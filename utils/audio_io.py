@@ -0,0 +1,104 @@
+"""
+Audio decoding helpers shared by the pipeline stages.
+
+Recordings are decoded once into a mono float32 numpy array at the sample rate
+the ASR models expect (16 kHz). Segments are then plain slices (views) of that
+array, so no intermediate files are needed. link_or_copy places existing audio
+files in another folder (hard link, symlink or copy).
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import subprocess
+
+import numpy as np
+import librosa
+import soundfile as sf
+
+TARGET_SAMPLE_RATE = 16000
+LINK_MODES = ('link', 'hardlink', 'symlink', 'copy')
+
+
+def load_audio(file_path: str, sr: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode an audio file into a mono float32 array at sample rate sr.
+
+    Uses a single ffmpeg process (decode, downmix and resample in one go) when ffmpeg
+    is available, and librosa otherwise.
+
+    Args:
+        file_path: Path to the audio file (any format ffmpeg understands)
+        sr: Target sample rate
+
+    Returns:
+        1-D float32 numpy array
+    """
+    if shutil.which('ffmpeg'):
+        command = ['ffmpeg', '-nostdin', '-loglevel', 'error', '-i', file_path,
+                   '-ac', '1', '-ar', str(sr), '-f', 'f32le', '-']
+        result = subprocess.run(command, capture_output=True, check=True)
+        return np.frombuffer(result.stdout, dtype=np.float32)
+    audio, _ = librosa.load(file_path, sr=sr, mono=True)
+    return audio.astype(np.float32, copy=False)
+
+
+def decode_audio_bytes(data: bytes, sr: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode an audio file held in memory (e.g. an upload) into a mono float32 array at sample rate sr.
+
+    Formats soundfile reads (WAV, FLAC, OGG) are decoded in memory; anything else
+    (m4a, mp3, ...) goes through a temporary file and load_audio.
+    """
+    try:
+        audio, file_sr = sf.read(io.BytesIO(data), dtype='float32', always_2d=True)
+    except RuntimeError:  # Not a format libsndfile reads (soundfile.LibsndfileError)
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(data)
+            f.flush()
+            return load_audio(f.name, sr)
+    audio = audio.mean(axis=1)
+    if file_sr != sr:
+        audio = librosa.resample(audio, orig_sr=file_sr, target_sr=sr)
+    return audio.astype(np.float32, copy=False)
+
+
+def slice_segment(audio: np.ndarray, sr: int, start: float, end: float) -> np.ndarray:
+    """Return the samples between start and end (in seconds) as a view on audio."""
+    return audio[int(start * sr):int(end * sr)]
+
+
+def write_wav(file_path: str, audio: np.ndarray, sr: int = TARGET_SAMPLE_RATE) -> None:
+    """Write a mono float32 array as a 16-bit PCM WAV file."""
+    sf.write(file_path, audio, sr, subtype='PCM_16')
+
+
+def link_or_copy(src: str, dst: str, mode: str = 'link') -> str:
+    """
+    Place src at dst and return how it was done ('hardlink', 'symlink' or 'copy').
+
+    mode 'link' tries a hard link (same file system only), then a symlink, then a copy;
+    'hardlink', 'symlink' and 'copy' only try that method. An existing dst is replaced.
+    """
+    if mode not in LINK_MODES:
+        raise ValueError(f"Unknown mode {mode!r}, expected one of {', '.join(LINK_MODES)}")
+    if os.path.lexists(dst):
+        os.remove(dst)
+
+    if mode in ('link', 'hardlink'):
+        try:
+            os.link(src, dst)
+            return 'hardlink'
+        except OSError:
+            if mode == 'hardlink':
+                raise
+    if mode in ('link', 'symlink'):
+        try:
+            os.symlink(os.path.abspath(src), dst)
+            return 'symlink'
+        except OSError:
+            if mode == 'symlink':
+                raise
+    shutil.copy2(src, dst)
+    return 'copy'
@@ -0,0 +1,114 @@
+"""
+Fast audio metadata scanning.
+
+Reads only container headers: soundfile.info for WAV/FLAC/OGG (and MP3 with recent
+libsndfile), ffprobe for compressed formats such as m4a/aac, and only falls back to
+librosa (which may decode the file) when neither works. Folders are scanned with a
+thread pool, since the work is dominated by file system latency.
+"""
+
+import os
+import json
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import pandas as pd
+import soundfile as sf
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.m4a', '.flac', '.ogg', '.aac')
+MAX_WORKERS = 16
+
+_SUBTYPE_BIT_DEPTH = {
+    'PCM_S8': 8, 'PCM_U8': 8, 'PCM_16': 16, 'PCM_24': 24, 'PCM_32': 32,
+    'FLOAT': 32, 'DOUBLE': 64, 'ULAW': 8, 'ALAW': 8,
+}
+COLUMNS = ['path', 'filename', 'duration', 'sample_rate', 'channels', 'bit_depth', 'format', 'error']
+
+
+def _soundfile_metadata(path: str) -> dict:
+    info = sf.info(path)
+    return {
+        'duration': info.frames / info.samplerate if info.samplerate else 0.0,
+        'sample_rate': info.samplerate,
+        'channels': info.channels,
+        'bit_depth': _SUBTYPE_BIT_DEPTH.get(info.subtype),
+        'format': info.format,
+    }
+
+
+def _ffprobe_metadata(path: str) -> dict:
+    command = ['ffprobe', '-v', 'error', '-select_streams', 'a:0', '-print_format', 'json',
+               '-show_entries', 'stream=sample_rate,channels,bits_per_raw_sample,bits_per_sample,codec_name:format=duration',
+               path]
+    result = subprocess.run(command, capture_output=True, check=True, text=True)
+    probe = json.loads(result.stdout)
+    stream = probe['streams'][0]
+    bit_depth = int(stream.get('bits_per_raw_sample') or stream.get('bits_per_sample') or 0) or None
+    return {
+        'duration': float(probe['format']['duration']),
+        'sample_rate': int(stream['sample_rate']),
+        'channels': int(stream['channels']),
+        'bit_depth': bit_depth,
+        'format': stream.get('codec_name'),
+    }
+
+
+def _librosa_metadata(path: str) -> dict:
+    import librosa
+    return {
+        'duration': librosa.get_duration(path=path),
+        'sample_rate': librosa.get_samplerate(path),
+        'channels': None,
+        'bit_depth': None,
+        'format': None,
+    }
+
+
+def read_audio_metadata(path: str) -> dict:
+    """
+    Read duration, sample rate, channels and bit depth of an audio file from its header.
+
+    Args:
+        path: Path to the audio file
+
+    Returns:
+        Dictionary with path, filename, duration (seconds), sample_rate, channels, bit_depth
+        (None for compressed formats) and format; 'error' is set if the file could not be read
+    """
+    metadata = {'path': path, 'filename': os.path.basename(path), 'error': None}
+    readers = [_soundfile_metadata]
+    if shutil.which('ffprobe'):
+        readers.append(_ffprobe_metadata)
+    readers.append(_librosa_metadata)
+
+    for reader in readers:
+        try:
+            metadata.update(reader(path))
+            metadata['error'] = None
+            return metadata
+        except Exception as e:
+            metadata['error'] = str(e)
+    return metadata
+
+
+def scan_audio_metadata(folder_path: str, extensions=AUDIO_EXTENSIONS,
+                        max_workers: Optional[int] = MAX_WORKERS) -> pd.DataFrame:
+    """
+    Read the metadata of all audio files in a folder in parallel.
+
+    Args:
+        folder_path: Folder containing audio files
+        extensions: File extensions to include
+        max_workers: Number of threads
+
+    Returns:
+        DataFrame with one row per file and columns path, filename, duration, sample_rate,
+        channels, bit_depth, format and error, sorted by filename
+    """
+    paths = sorted(os.path.join(folder_path, filename) for filename in os.listdir(folder_path)
+                   if os.path.splitext(filename)[1].lower() in extensions)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        rows = list(executor.map(read_audio_metadata, paths))
+    return pd.DataFrame(rows, columns=COLUMNS)
@@ -2,27 +2,32 @@ import librosa
 import soundfile as sf
 import os
 
+try:
+    from utils.audio_metadata import scan_audio_metadata
+except ImportError:  # Run as a script from within utils/
+    from audio_metadata import scan_audio_metadata
+
 OUTPUT_SEGMENTS_DIR = os.path.join('output', 'segments')
 
 def check_and_convert_to_mono(directory=OUTPUT_SEGMENTS_DIR):
     """
     Check if WAV files in the specified directory are mono, convert to mono if they're not.
+    Channel counts are read from the file headers, so only files that need conversion are decoded.
     """
-    for filename in os.listdir(directory):
-        if filename.endswith('.wav'):
-            filepath = os.path.join(directory, filename)
-            # Load audio file
-            audio, sr = librosa.load(filepath, sr=None, mono=False)
-            
-            # Check if stereo (has 2 channels)
-            if len(audio.shape) > 1 and audio.shape[0] > 1:
-                # Convert to mono by averaging channels
-                audio_mono = librosa.to_mono(audio)
-                # Save the mono version
-                sf.write(filepath, audio_mono, sr)
-                print(f"Converted {filename} to mono")
-            else:
-                print(f"{filename} is already mono")
+    metadata = scan_audio_metadata(directory, extensions=('.wav',))
+    stereo = metadata[metadata['channels'] > 1]
+    for filename, filepath in zip(stereo['filename'], stereo['path']):
+        # Load audio file
+        audio, sr = librosa.load(filepath, sr=None, mono=False)
+        # Convert to mono by averaging channels
+        audio_mono = librosa.to_mono(audio)
+        # Save the mono version
+        sf.write(filepath, audio_mono, sr)
+        print(f"Converted {filename} to mono")
+    failed = metadata[metadata['error'].notna()]
+    for filename, error in zip(failed['filename'], failed['error']):
+        print(f"Error reading {filename}: {error}")
+    print(f"{len(metadata) - len(stereo)} of {len(metadata)} files were already mono")
 
 if __name__ == "__main__":
-    check_and_convert_to_mono() 
\ No newline at end of file
+    check_and_convert_to_mono()
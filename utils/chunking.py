@@ -0,0 +1,151 @@
+"""
+Diarization-aware chunking of speaker turns into ASR windows.
+
+Whisper-style models always process a 30 s window, so many sub-second segments waste
+most of every forward pass, while fixed 30 s cuts split words mid-utterance. This module:
+- packs consecutive turns of the same speaker (not interrupted by another speaker and
+  with a short pause in between) into one chunk of up to the model window
+- splits turns that are longer than the window at the quietest frame near the limit,
+  using a frame-wise RMS energy computed once per recording with numpy
+
+window_offsets cuts a recording into fixed overlapping windows instead (long-form
+transcription and chunked diarization).
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from utils.audio_io import TARGET_SAMPLE_RATE
+except ImportError:  # Run as a script from within utils/
+    from audio_io import TARGET_SAMPLE_RATE
+
+MAX_CHUNK_LENGTH = 30.0  # Model window in seconds
+MAX_MERGE_GAP = 1.0  # Longest pause (seconds) between turns that are merged into one chunk
+SPLIT_SEARCH_WINDOW = 5.0  # Look for a split point in the last seconds before the limit
+FRAME_LENGTH = 0.025
+HOP_LENGTH = 0.010
+LONGFORM_WINDOW = 30.0  # Seconds of audio per window in long-form mode
+LONGFORM_OVERLAP = 5.0  # Seconds of overlap between consecutive windows
+
+
+def frame_rms(audio: np.ndarray, sr: int = TARGET_SAMPLE_RATE, frame_length: float = FRAME_LENGTH,
+              hop_length: float = HOP_LENGTH) -> np.ndarray:
+    """
+    RMS energy per frame of a mono signal, computed without a Python loop.
+
+    Returns:
+        Array with the RMS of frame i, which starts at sample i * hop_length * sr
+    """
+    frame = max(1, int(round(frame_length * sr)))
+    hop = max(1, int(round(hop_length * sr)))
+    if len(audio) < frame:
+        audio = np.pad(audio, (0, frame - len(audio)))
+    frames = np.lib.stride_tricks.sliding_window_view(np.asarray(audio, dtype=np.float32), frame)[::hop]
+    return np.sqrt(np.einsum('ij,ij->i', frames, frames) / frame)
+
+
+def merge_turns(speaker_segments: Dict[str, List[Tuple[float, float]]], max_length: float = MAX_CHUNK_LENGTH,
+                max_gap: float = MAX_MERGE_GAP) -> List[Tuple[str, float, float]]:
+    """
+    Pack consecutive turns of the same speaker into chunks of at most max_length seconds.
+
+    Turns are only merged if no turn of another speaker starts in between and the pause
+    between them is at most max_gap. Turns that are longer than max_length on their own
+    are kept as one chunk (see split_long_chunks).
+
+    Args:
+        speaker_segments: Speaker label -> list of (start, end) tuples in seconds (see segment_audio.diarize)
+
+    Returns:
+        list: (speaker, start, end) tuples in seconds, ordered by start time
+    """
+    turns = sorted((start, end, speaker) for speaker, segments in speaker_segments.items()
+                   for start, end in segments if end > start)
+    chunks = []
+    for start, end, speaker in turns:
+        if chunks:
+            last_speaker, last_start, last_end = chunks[-1]
+            if (last_speaker == speaker and start - last_end <= max_gap
+                    and max(end, last_end) - last_start <= max_length):
+                chunks[-1] = (speaker, last_start, max(end, last_end))
+                continue
+        chunks.append((speaker, start, end))
+    return chunks
+
+
+def split_point(rms: np.ndarray, start: float, limit: float, search_window: float = SPLIT_SEARCH_WINDOW,
+                hop_length: float = HOP_LENGTH) -> float:
+    """Time (seconds) of the quietest frame in [limit - search_window, limit], at least after start."""
+    first = int(max(start, limit - search_window) / hop_length)
+    last = min(int(limit / hop_length), len(rms))
+    if last <= first:
+        return limit
+    return (first + int(np.argmin(rms[first:last]))) * hop_length
+
+
+def split_long_chunks(chunks: List[Tuple[str, float, float]], rms: Optional[np.ndarray] = None,
+                      max_length: float = MAX_CHUNK_LENGTH, search_window: float = SPLIT_SEARCH_WINDOW,
+                      hop_length: float = HOP_LENGTH) -> List[Tuple[str, float, float]]:
+    """
+    Split chunks longer than max_length, at the lowest-energy frame near the limit if rms
+    (see frame_rms) is given, and at fixed max_length boundaries otherwise.
+    """
+    result = []
+    for speaker, start, end in chunks:
+        while end - start > max_length:
+            cut = start + max_length
+            if rms is not None:
+                cut = split_point(rms, start, cut, search_window, hop_length)
+                if cut <= start:
+                    cut = start + max_length
+            result.append((speaker, start, cut))
+            start = cut
+        result.append((speaker, start, end))
+    return result
+
+
+def smart_chunks(speaker_segments: Dict[str, List[Tuple[float, float]]], audio: Optional[np.ndarray] = None,
+                 sr: int = TARGET_SAMPLE_RATE, max_length: float = MAX_CHUNK_LENGTH,
+                 max_gap: float = MAX_MERGE_GAP) -> List[Tuple[str, int, int, int]]:
+    """
+    Chunk diarized speaker turns into ASR windows: merge short turns, split long turns on silence.
+
+    Drop-in replacement for segment_audio.chunk_speaker_turns.
+
+    Args:
+        speaker_segments: Speaker label -> list of (start, end) tuples in seconds
+        audio: Mono audio of the recording, used to find quiet split points (optional)
+        sr: Sample rate of audio
+        max_length: Longest chunk in seconds
+        max_gap: Longest pause between merged turns in seconds
+
+    Returns:
+        list: (speaker, seg_idx, chunk_start_ms, chunk_end_ms) tuples, seg_idx counting per speaker
+    """
+    rms = frame_rms(audio, sr) if audio is not None else None
+    chunks = split_long_chunks(merge_turns(speaker_segments, max_length, max_gap), rms, max_length)
+
+    seg_indices = {}
+    result = []
+    for speaker, start, end in chunks:
+        seg_idx = seg_indices.get(speaker, 0)
+        seg_indices[speaker] = seg_idx + 1
+        result.append((speaker, seg_idx, int(start * 1000), int(end * 1000)))
+    return result
+
+
+def window_offsets(num_samples, window=LONGFORM_WINDOW, overlap=LONGFORM_OVERLAP, sr=TARGET_SAMPLE_RATE):
+    """
+    Return (start, end) sample offsets of overlapping windows covering num_samples samples.
+    Consecutive windows start window - overlap seconds apart; the last window ends at num_samples.
+    """
+    size = int(window * sr)
+    step = max(1, size - int(overlap * sr))
+    offsets = []
+    for start in range(0, max(num_samples, 1), step):
+        offsets.append((start, min(start + size, num_samples)))
+        if start + size >= num_samples:
+            break
+    return offsets
@@ -1,26 +1,106 @@
 import os
-from pydub import AudioSegment
 import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from utils.audio_io import TARGET_SAMPLE_RATE
+    from utils.audio_metadata import read_audio_metadata
+    from utils.profiling import get_profiler
+except ImportError:  # Run as a script from within utils/
+    from audio_io import TARGET_SAMPLE_RATE
+    from audio_metadata import read_audio_metadata
+    from profiling import get_profiler
 
 RAW_DATA_DIR = os.path.join('data', 'raw')
 CONVERTED_DATA_DIR = os.path.join('data', 'converted')
+SOURCE_EXTENSIONS = ('.m4a', '.wav', '.mp3', '.flac', '.ogg')
+
+def is_up_to_date(src_path, dst_path):
+    """True if dst_path exists and is not older than src_path."""
+    return os.path.exists(dst_path) and os.path.getmtime(dst_path) >= os.path.getmtime(src_path)
+
+def convert_to_wav(filename, raw_dir=RAW_DATA_DIR, converted_dir=CONVERTED_DATA_DIR,
+                   sample_rate=TARGET_SAMPLE_RATE, overwrite=False):
+    """
+    Convert an audio file to a 16-bit mono WAV file at sample_rate (16 kHz, what the ASR models expect),
+    with a single ffmpeg process. WAV files that already have the target format are copied.
+
+    Args:
+        filename: Name of the file in raw_dir
+        raw_dir: Folder with source audio files
+        converted_dir: Folder for the converted WAV files
+        sample_rate: Target sample rate (None keeps the original sample rate and channels)
+        overwrite: Convert even if the output is already up to date
+
+    Returns:
+        str: 'converted', 'copied' or 'skipped'
+    """
+    src_path = os.path.join(raw_dir, filename)
+    wav_path = os.path.join(converted_dir, os.path.splitext(filename)[0] + '.wav')
+    if not overwrite and is_up_to_date(src_path, wav_path):
+        return 'skipped'
+
+    if filename.lower().endswith('.wav'):
+        metadata = read_audio_metadata(src_path)
+        if sample_rate is None or (metadata['sample_rate'] == sample_rate and metadata['channels'] == 1
+                                   and metadata['bit_depth'] == 16):
+            shutil.copy2(src_path, wav_path)
+            return 'copied'
+
+    # Write to a temporary file first, so an interrupted conversion never looks up to date
+    tmp_path = wav_path + '.part'
+    command = ['ffmpeg', '-nostdin', '-loglevel', 'error', '-y', '-threads', '1', '-i', src_path]
+    if sample_rate is not None:
+        command += ['-ac', '1', '-ar', str(sample_rate)]
+    command += ['-c:a', 'pcm_s16le', '-f', 'wav', tmp_path]
+    try:
+        subprocess.run(command, check=True, capture_output=True)
+    except subprocess.CalledProcessError as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise RuntimeError(f"ffmpeg failed for {filename}: {e.stderr.decode(errors='replace').strip()}") from e
+    os.replace(tmp_path, wav_path)
+    return 'converted'
+
+def _profiled_convert(filename, raw_dir, converted_dir, sample_rate, overwrite):
+    """convert_to_wav, recorded as a 'conversion' event when profiling is enabled."""
+    with get_profiler().stage('conversion', file=filename) as event:
+        event['result'] = convert_to_wav(filename, raw_dir, converted_dir, sample_rate, overwrite)
+    return event['result']
 
 def convert_m4a_to_wav(filename):
-    m4a_path = os.path.join(RAW_DATA_DIR, filename)
-    wav_path = os.path.join(CONVERTED_DATA_DIR, os.path.splitext(filename)[0] + '.wav')
-    audio = AudioSegment.from_file(m4a_path, format='m4a')
-    audio.export(wav_path, format='wav')
-    
-
-def main():
-    for filename in os.listdir(RAW_DATA_DIR):
-        if filename.lower().endswith('.m4a'):
-            convert_m4a_to_wav(filename)
-        elif filename.lower().endswith('.wav'):
-            src_path = os.path.join(RAW_DATA_DIR, filename)
-            dst_path = os.path.join(CONVERTED_DATA_DIR, filename)
-            shutil.copy2(src_path, dst_path)
+    convert_to_wav(filename)
+
+
+def main(raw_dir=RAW_DATA_DIR, converted_dir=CONVERTED_DATA_DIR, max_workers=None,
+         sample_rate=TARGET_SAMPLE_RATE, overwrite=False):
+    """
+    Convert all supported audio files in raw_dir to WAV files in converted_dir.
+
+    Each conversion runs in its own ffmpeg process; at most max_workers (default: number of CPUs)
+    run at the same time. Outputs that are already up to date are skipped.
+    """
+    if shutil.which('ffmpeg') is None:
+        raise RuntimeError("ffmpeg not found, install it first (see README)")
+    os.makedirs(converted_dir, exist_ok=True)
+    filenames = sorted(f for f in os.listdir(raw_dir) if f.lower().endswith(SOURCE_EXTENSIONS))
+
+    counts = {'converted': 0, 'copied': 0, 'skipped': 0, 'failed': 0}
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        futures = {filename: executor.submit(_profiled_convert, filename, raw_dir, converted_dir, sample_rate,
+                                             overwrite)
+                   for filename in filenames}
+        for filename, future in futures.items():
+            try:
+                counts[future.result()] += 1
+            except Exception as e:
+                print(f"Error converting {filename}: {e}")
+                counts['failed'] += 1
+
+    print(f"Converted {counts['converted']}, copied {counts['copied']}, skipped {counts['skipped']} (up to date), "
+          f"failed {counts['failed']} of {len(filenames)} files")
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
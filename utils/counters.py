@@ -1,7 +1,11 @@
 import os
-import librosa
 import re
 
+try:
+    from utils.audio_metadata import AUDIO_EXTENSIONS, scan_audio_metadata
+except ImportError:  # Run as a script from within utils/
+    from audio_metadata import AUDIO_EXTENSIONS, scan_audio_metadata
+
 def count_total_words(folder_path):
     """
     Count the total number of words and punctuation symbols across all .txt files in a folder.
@@ -40,6 +44,7 @@ def count_total_words(folder_path):
 def get_total_audio_duration(folder_path):
     """
     Calculate the total duration of all audio files in a folder.
+    Only the file headers are read (see audio_metadata.py).
     
     Args:
         folder_path (str): Path to the folder containing audio files
@@ -47,25 +52,15 @@ def get_total_audio_duration(folder_path):
     Returns:
         float: Total duration in seconds across all audio files
     """
-    total_duration = 0.0
-    
     # Check if folder exists
     if not os.path.exists(folder_path):
         print(f"Folder {folder_path} does not exist")
         return 0.0
     
-    # Audio file extensions to look for
-    audio_extensions = ['.wav', '.mp3', '.m4a', '.flac', '.ogg', '.aac']
-    
-    # Iterate through all files in the folder
-    for filename in os.listdir(folder_path):
-        file_ext = os.path.splitext(filename)[1].lower()
-        if file_ext in audio_extensions:
-            file_path = os.path.join(folder_path, filename)
-            try:
-                duration = librosa.get_duration(path=file_path)
-                total_duration += duration
-            except Exception as e:
-                print(f"Error reading {filename}: {e}")
+    # Read durations from the file headers, in parallel
+    metadata = scan_audio_metadata(folder_path, extensions=AUDIO_EXTENSIONS)
+    failed = metadata[metadata['error'].notna()]
+    for filename, error in zip(failed['filename'], failed['error']):
+        print(f"Error reading {filename}: {error}")
     
-    return total_duration 
\ No newline at end of file
+    return float(metadata.loc[metadata['error'].isna(), 'duration'].sum())
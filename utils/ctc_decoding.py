@@ -0,0 +1,138 @@
+"""
+Decoding of CTC logits (wav2vec2 and similar models).
+
+- ctc_greedy_decode: greedy decoding of a whole batch with numpy. The argmax, collapsing
+  of repeated tokens and removal of blanks/special tokens are done on the (batch, frames)
+  id matrix at once; only the final join of the surviving tokens is per item.
+- BeamDecoder: beam search with an optional n-gram language model (KenLM .arpa/.bin),
+  using pyctcdecode (optional dependency: pip install pyctcdecode kenlm).
+- LogitsCache: the log-probabilities of every segment on disk (float16 .npy, keyed by
+  the audio hash, model, revision and precision). With a cache, re-decoding with other
+  beam/LM settings does not run the acoustic model again.
+"""
+
+import os
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+try:
+    from utils.transcript_cache import cache_key
+except ImportError:  # Run as a script from within utils/
+    from transcript_cache import cache_key
+
+CTC_LOGITS_DIR = os.path.join('output', 'ctc_logits')
+WORD_DELIMITER = '|'
+
+
+def log_softmax(logits: np.ndarray) -> np.ndarray:
+    """Log-probabilities over the last axis."""
+    logits = logits.astype(np.float32, copy=False)
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    return shifted - np.log(np.exp(shifted).sum(axis=-1, keepdims=True))
+
+
+def ctc_greedy_decode(logits: np.ndarray, lengths: Sequence[int], vocab: Sequence[str], blank_id: int,
+                      special_ids: Sequence[int] = (), word_delimiter: str = WORD_DELIMITER) -> List[str]:
+    """
+    Greedy CTC decoding of a batch.
+
+    Args:
+        logits: (batch, frames, vocabulary) logits or log-probabilities
+        lengths: Number of valid frames per item (frames beyond it are padding)
+        vocab: Token string per id
+        blank_id: Id of the CTC blank (the pad token for wav2vec2)
+        special_ids: Ids that are dropped from the output (bos, eos, unk, ...)
+        word_delimiter: Token that separates words
+
+    Returns:
+        list: Transcription per item
+    """
+    ids = logits.argmax(axis=-1)
+    frames = np.arange(ids.shape[1])
+    valid = frames[None, :] < np.asarray(lengths)[:, None]
+    # A token is emitted where it differs from the previous frame (collapse repeats)...
+    changed = np.ones_like(ids, dtype=bool)
+    changed[:, 1:] = ids[:, 1:] != ids[:, :-1]
+    # ...and is not a blank or special token
+    keep = valid & changed & ~np.isin(ids, [blank_id, *special_ids])
+
+    vocab = np.asarray([token.replace(word_delimiter, ' ') if token else '' for token in vocab], dtype=object)
+    return [' '.join(''.join(vocab[row_ids[row_keep]]).split()) for row_ids, row_keep in zip(ids, keep)]
+
+
+class BeamDecoder:
+    """CTC beam search with an optional KenLM n-gram language model (pyctcdecode)."""
+
+    def __init__(self, decoder, beam_width: int = 100, settings: Optional[dict] = None,
+                 special_tokens: Sequence[str] = ()):
+        self._decoder = decoder
+        self.beam_width = beam_width
+        self._settings = settings or {}
+        self.special_tokens = set(special_tokens)
+
+    @classmethod
+    def build(cls, vocab: Sequence[str], blank_id: int, lm_path: Optional[str] = None, alpha: float = 0.5,
+              beta: float = 1.0, beam_width: int = 100, special_tokens: Sequence[str] = (),
+              word_delimiter: str = WORD_DELIMITER) -> 'BeamDecoder':
+        """
+        Build a decoder for a model's vocabulary (token string per id), like transformers'
+        Wav2Vec2ProcessorWithLM: the blank is the empty label and the word delimiter a space.
+        """
+        try:
+            from pyctcdecode import build_ctcdecoder
+        except ImportError as e:
+            raise ImportError("Beam search decoding requires pyctcdecode (and kenlm for a language model): "
+                              "pip install pyctcdecode kenlm") from e
+        labels = ['' if token_id == blank_id else ' ' if token == word_delimiter else token
+                  for token_id, token in enumerate(vocab)]
+        decoder = build_ctcdecoder(labels, kenlm_model_path=lm_path, alpha=alpha, beta=beta)
+        settings = {'lm': os.path.basename(lm_path) if lm_path else None, 'alpha': alpha, 'beta': beta}
+        return cls(decoder, beam_width, settings, special_tokens)
+
+    def settings(self) -> dict:
+        """Decoder settings (part of the transcription cache key)."""
+        return {**self._settings, 'beam_width': self.beam_width}
+
+    def decode(self, log_probs: Sequence[np.ndarray]) -> List[str]:
+        """Decode (frames, vocabulary) log-probability matrices, one per item (valid frames only)."""
+        texts = [self._decoder.decode(item, beam_width=self.beam_width) for item in log_probs]
+        return [' '.join(word for word in text.split() if word not in self.special_tokens) for text in texts]
+
+
+class LogitsCache:
+    """Log-probabilities of CTC models on disk, one float16 .npy file per segment."""
+
+    def __init__(self, cache_dir: str = CTC_LOGITS_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(audio_digest: str, model_name: str, revision: Optional[str], precision: str = 'fp32') -> str:
+        """Cache key of the logits of one segment."""
+        return cache_key(audio_digest, model_name, revision, {'logits': True, 'precision': precision})
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.npy")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return the cached (frames, vocabulary) log-probabilities, or None on a miss."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return np.load(path).astype(np.float32)
+
+    def put(self, key: str, log_probs: np.ndarray) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, log_probs.astype(np.float16))
+        os.replace(tmp_path, path)
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses}
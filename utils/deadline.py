@@ -0,0 +1,61 @@
+"""
+Per-segment deadlines for transcription.
+
+A Deadline is a plain monotonic-clock budget, so it can be created and checked from
+any thread or process (unlike signal.alarm, which only works in the main thread).
+The budget is relative to the audio duration: a segment of d seconds gets
+max(MIN_TIMEOUT, RTF_BUDGET * d) seconds of processing time.
+
+In-process, the budget only bounds HuggingFace generate, which stops decoding
+cooperatively (output that was stopped is cut short, so the batch is retried or marked
+as timed out). Nothing else is interrupted: a CTC forward pass or a stuck torch op runs
+to completion, and a batch that finishes late with complete output is kept and logged
+as late. Only worker pools (transcribe_pool.py) enforce a hard timeout: they kill and
+replace a worker that is still busy HARD_KILL_FACTOR times past its deadline.
+"""
+
+import time
+
+RTF_BUDGET = 2.0  # allowed seconds of processing per second of audio
+MIN_TIMEOUT = 10.0  # seconds, lower bound for very short segments
+HARD_KILL_FACTOR = 1.5  # a worker is killed after HARD_KILL_FACTOR * budget seconds
+
+
+def segment_budget(duration: float, rtf_budget: float = RTF_BUDGET, min_timeout: float = MIN_TIMEOUT) -> float:
+    """
+    Return the processing budget in seconds for audio of the given duration.
+
+    Args:
+        duration: Audio duration in seconds
+        rtf_budget: Allowed real-time factor (processing time / audio time)
+        min_timeout: Minimum budget in seconds
+
+    Returns:
+        Budget in seconds
+    """
+    return max(min_timeout, rtf_budget * duration)
+
+
+class Deadline:
+    """A point in time by which a piece of work should be finished."""
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.start = time.monotonic()
+
+    @classmethod
+    def for_audio(cls, duration: float, rtf_budget: float = RTF_BUDGET, min_timeout: float = MIN_TIMEOUT) -> "Deadline":
+        """Create a deadline for audio of the given duration (see segment_budget)."""
+        return cls(segment_budget(duration, rtf_budget, min_timeout))
+
+    def elapsed(self) -> float:
+        """Seconds since the deadline was created."""
+        return time.monotonic() - self.start
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline, never negative."""
+        return max(0.0, self.budget - self.elapsed())
+
+    def expired(self, factor: float = 1.0) -> bool:
+        """True if more than factor * budget seconds have passed."""
+        return self.elapsed() >= factor * self.budget
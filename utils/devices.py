@@ -0,0 +1,52 @@
+"""
+CPU cores and compute devices.
+
+Dependency-free (torch is only imported when a device is actually selected), so modules
+that only need to count or split cores, such as diarization, can import this without
+loading the ASR stack.
+"""
+
+import os
+from typing import List
+
+DEVICE_ENV = 'ASR_DEVICE'
+
+
+def available_cores() -> List[int]:
+    """Return the CPU cores this process is allowed to run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def split_cores(cores: List[int], n_parts: int) -> List[List[int]]:
+    """
+    Split a list of cores into n_parts disjoint, contiguous sets of (nearly) equal size.
+    Every part gets at least one core; parts share cores only if there are fewer cores than parts.
+    """
+    if n_parts <= len(cores):
+        base, extra = divmod(len(cores), n_parts)
+        parts, start = [], 0
+        for i in range(n_parts):
+            size = base + (1 if i < extra else 0)
+            parts.append(cores[start:start + size])
+            start += size
+        return parts
+    return [[cores[i % len(cores)]] for i in range(n_parts)]
+
+
+def select_device(cpu: bool = False) -> str:
+    """
+    Return the device to run models on: 'cpu' if cpu is True, otherwise the ASR_DEVICE
+    environment variable if set, else cuda, mps or cpu, whichever is available first.
+    """
+    if cpu:
+        return 'cpu'
+    if os.environ.get(DEVICE_ENV):
+        return os.environ[DEVICE_ENV]
+    import torch
+    if torch.cuda.is_available():
+        return 'cuda'
+    if torch.backends.mps.is_available():
+        return 'mps'
+    return 'cpu'
@@ -0,0 +1,355 @@
+"""
+Speaker diarization with pyannote: cached, chunked and parallel over recordings.
+
+- Results are cached as RTTM files in output/diarization_cache/, keyed by the hash of the
+  decoded audio, the model and the diarization settings. Re-segmenting a recording (other
+  chunk lengths, smart or fixed cuts) or renaming it does not run the model again.
+- Recordings longer than chunk_length + overlap are diarized in overlapping chunks, so memory
+  and time per model call stay bounded. The speakers of each chunk are linked to the speakers
+  of the recording by matching their embeddings (returned by pyannote) with the running
+  centroids of the speakers found so far (Hungarian assignment on cosine distance, so two
+  speakers of one chunk never merge); each chunk contributes the turns in its part of the
+  overlaps up to the midpoint.
+- diarize_recordings runs several recordings at once in worker processes, each pinned to its
+  own CPU cores with the matching number of torch threads.
+
+The pipeline is loaded from the HuggingFace hub (requires the token in .secrets/hf_api_key.txt)
+or from a local folder or config.yaml, e.g. for offline runs.
+"""
+
+import os
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from utils.audio_io import TARGET_SAMPLE_RATE, load_audio
+    from utils.model_registry import get_registry
+    from utils.profiling import get_profiler
+    from utils.chunking import window_offsets
+    from utils.transcript_cache import audio_hash, cache_key
+    from utils.devices import available_cores, select_device, split_cores
+except ImportError:  # Run as a script from within utils/
+    from audio_io import TARGET_SAMPLE_RATE, load_audio
+    from model_registry import get_registry
+    from profiling import get_profiler
+    from chunking import window_offsets
+    from transcript_cache import audio_hash, cache_key
+    from devices import available_cores, select_device, split_cores
+
+DIARIZATION_MODEL = "pyannote/speaker-diarization-3.1"
+HF_API_KEY_PATH = os.path.join('.secrets', 'hf_api_key.txt')
+DIARIZATION_CACHE_DIR = os.path.join('output', 'diarization_cache')
+CHUNK_LENGTH = 600.0  # seconds per chunk of long recordings
+CHUNK_OVERLAP = 30.0  # seconds shared by consecutive chunks
+SPEAKER_LINK_DISTANCE = 0.6  # max cosine distance between the embeddings of one speaker in two chunks
+MERGE_GAP = 0.01  # seconds; turns of a speaker cut at a chunk boundary are joined again
+THREADS_PER_WORKER = 4
+
+SpeakerSegments = Dict[str, List[Tuple[float, float]]]
+
+
+def read_auth_token(path=HF_API_KEY_PATH):
+    """Read the HuggingFace API key from .secrets/hf_api_key.txt"""
+    with open(path, 'r') as file:
+        return file.read().strip()
+
+
+def load_diarization_pipeline(model=DIARIZATION_MODEL, cpu=True):
+    """
+    Load the pyannote speaker diarization pipeline, from the hub (requires the HuggingFace token
+    for first use) or from a local folder with a config.yaml (or the path of the config.yaml itself).
+    """
+    import torch
+    from pyannote.audio import Pipeline
+
+    if os.path.isdir(model):
+        pipeline = Pipeline.from_pretrained(os.path.join(model, 'config.yaml'))
+    elif os.path.isfile(model):
+        pipeline = Pipeline.from_pretrained(model)
+    else:
+        pipeline = Pipeline.from_pretrained(model, use_auth_token=read_auth_token())
+    pipeline.to(torch.device(select_device(cpu)))
+    return pipeline
+
+
+def get_diarization_pipeline(model=DIARIZATION_MODEL, cpu=True):
+    """Return the diarization pipeline, loading it on first use and keeping it warm in the model registry."""
+    return get_registry().get(('diarization', model, cpu), lambda: load_diarization_pipeline(model, cpu))
+
+
+def write_rttm(path: str, uri: str, speaker_segments: SpeakerSegments) -> None:
+    """Write speaker turns as an RTTM file."""
+    uri = '_'.join(uri.split()) or 'audio'
+    turns = sorted((start, end, speaker) for speaker, segments in speaker_segments.items() for start, end in segments)
+    with open(path, 'w', encoding='utf-8') as f:
+        for start, end, speaker in turns:
+            f.write(f"SPEAKER {uri} 1 {start:.3f} {end - start:.3f} <NA> <NA> {speaker} <NA> <NA>\n")
+
+
+def read_rttm(path: str) -> SpeakerSegments:
+    """Read the speaker turns of an RTTM file (speaker label -> list of (start, end) in seconds)."""
+    speaker_segments = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) < 8 or fields[0] != 'SPEAKER':
+                continue
+            start, duration = float(fields[3]), float(fields[4])
+            speaker_segments.setdefault(fields[7], []).append((start, start + duration))
+    return speaker_segments
+
+
+class DiarizationCache:
+    """Diarization results on disk, one RTTM file per audio hash, model and settings."""
+
+    def __init__(self, cache_dir: str = DIARIZATION_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(audio_digest: str, model: str, settings: dict) -> str:
+        return cache_key(audio_digest, os.path.basename(os.path.normpath(model)), None, settings)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.rttm")
+
+    def get(self, key: str) -> Optional[SpeakerSegments]:
+        """Return the cached speaker turns, or None on a miss."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return read_rttm(path)
+
+    def put(self, key: str, uri: str, speaker_segments: SpeakerSegments) -> None:
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        write_rttm(tmp_path, uri, speaker_segments)
+        os.replace(tmp_path, self._path(key))
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+def _run_pipeline(pipeline, audio: np.ndarray, **kwargs):
+    """Run the pipeline on a mono float32 array at TARGET_SAMPLE_RATE."""
+    import torch
+
+    waveform = torch.from_numpy(np.ascontiguousarray(audio, dtype=np.float32)).unsqueeze(0)
+    return pipeline({"waveform": waveform, "sample_rate": TARGET_SAMPLE_RATE}, **kwargs)
+
+
+def speaker_segments_of(annotation, offset: float = 0.0, mapping: Optional[dict] = None,
+                        keep: Tuple[float, float] = (0.0, np.inf)) -> SpeakerSegments:
+    """
+    Collect the turns of each speaker of a pyannote annotation.
+
+    Args:
+        offset: Seconds added to all times (start of a chunk in the recording)
+        mapping: Optional local speaker label -> recording speaker label
+        keep: Only the parts of turns within this (start, end) interval (after the offset) are kept
+    """
+    speaker_segments = {}
+    for turn, _, speaker in annotation.itertracks(yield_label=True):
+        start, end = max(turn.start + offset, keep[0]), min(turn.end + offset, keep[1])
+        if end > start:
+            label = mapping.get(speaker, speaker) if mapping else speaker
+            speaker_segments.setdefault(label, []).append((start, end))
+    return speaker_segments
+
+
+def link_speakers(chunks: Sequence[Tuple[List[str], np.ndarray, List[float]]],
+                  num_speakers: Optional[int] = None, max_distance: float = SPEAKER_LINK_DISTANCE) -> List[dict]:
+    """
+    Link the speakers of consecutive chunks to speakers of the whole recording.
+
+    Args:
+        chunks: Per chunk, its speaker labels, their embeddings (one row per label) and their speech durations
+        num_speakers: Number of speakers in the recording (None: unknown)
+        max_distance: Speakers farther (cosine distance) from every known speaker are new speakers,
+            as long as fewer than num_speakers speakers are known
+
+    Returns:
+        list: Per chunk, a dict mapping its labels to recording labels (SPEAKER_00, SPEAKER_01, ...)
+    """
+    centroids: List[np.ndarray] = []  # Duration-weighted sum of the embeddings of each speaker
+    speech: List[float] = []
+    mappings = []
+    for labels, embeddings, durations in chunks:
+        embeddings = np.asarray(embeddings, dtype=np.float64)[:len(labels)]
+        valid = [i for i in range(len(labels)) if np.all(np.isfinite(embeddings[i])) and embeddings[i].any()]
+        mapping = {}
+
+        if centroids and valid:
+            from scipy.optimize import linear_sum_assignment
+
+            local = embeddings[valid] / np.linalg.norm(embeddings[valid], axis=1, keepdims=True)
+            known = np.stack(centroids) / np.linalg.norm(np.stack(centroids), axis=1, keepdims=True)
+            distances = 1.0 - local @ known.T
+            full = num_speakers is not None and len(centroids) >= num_speakers
+            for row, column in zip(*linear_sum_assignment(distances)):
+                if distances[row, column] <= max_distance or full:
+                    mapping[valid[row]] = int(column)
+
+        for i in valid:
+            if i in mapping:
+                continue
+            if num_speakers is None or len(centroids) < num_speakers:
+                centroids.append(np.zeros(embeddings.shape[1]))
+                speech.append(0.0)
+                mapping[i] = len(centroids) - 1
+            else:  # More local speakers than num_speakers: join the closest known speaker
+                known = np.stack(centroids) / np.linalg.norm(np.stack(centroids), axis=1, keepdims=True)
+                mapping[i] = int(np.argmax(known @ (embeddings[i] / np.linalg.norm(embeddings[i]))))
+        for i, speaker in mapping.items():
+            centroids[speaker] += durations[i] * embeddings[i]
+            speech[speaker] += durations[i]
+
+        # Speakers without an embedding (too little speech) go to the main speaker so far
+        main_speaker = int(np.argmax(speech)) if speech else 0
+        mappings.append({label: f"SPEAKER_{mapping.get(i, main_speaker):02d}" for i, label in enumerate(labels)})
+    return mappings
+
+
+def merge_adjacent(speaker_segments: SpeakerSegments, max_gap: float = MERGE_GAP) -> SpeakerSegments:
+    """Join consecutive turns of a speaker that are at most max_gap seconds apart."""
+    merged = {}
+    for speaker, segments in speaker_segments.items():
+        turns = []
+        for start, end in sorted(segments):
+            if turns and start - turns[-1][1] <= max_gap:
+                turns[-1] = (turns[-1][0], max(turns[-1][1], end))
+            else:
+                turns.append((start, end))
+        merged[speaker] = turns
+    return merged
+
+
+def diarize_chunked(pipeline, audio: np.ndarray, num_speakers: Optional[int] = 2,
+                    chunk_length: float = CHUNK_LENGTH, overlap: float = CHUNK_OVERLAP) -> SpeakerSegments:
+    """
+    Diarize a long recording in overlapping chunks and link the speakers across chunks (see link_speakers).
+
+    Returns:
+        dict: Speaker label -> list of (start, end) tuples in seconds
+    """
+    offsets = window_offsets(len(audio), chunk_length, overlap)
+    chunk_results = []
+    for start, end in offsets:
+        kwargs = {'max_speakers': num_speakers} if num_speakers else {}
+        annotation, embeddings = _run_pipeline(pipeline, audio[start:end], return_embeddings=True, **kwargs)
+        labels = annotation.labels()
+        durations = [annotation.label_duration(label) for label in labels]
+        chunk_results.append((annotation, (labels, embeddings, durations)))
+
+    mappings = link_speakers([result for _, result in chunk_results], num_speakers)
+    speaker_segments = {}
+    for i, ((start, end), (annotation, _), mapping) in enumerate(zip(offsets, chunk_results, mappings)):
+        # Each chunk keeps its turns up to the middle of the overlaps with its neighbours
+        keep_start = start / TARGET_SAMPLE_RATE + overlap / 2 if i > 0 else 0.0
+        keep_end = end / TARGET_SAMPLE_RATE - overlap / 2 if i < len(offsets) - 1 else np.inf
+        chunk_segments = speaker_segments_of(annotation, start / TARGET_SAMPLE_RATE, mapping, (keep_start, keep_end))
+        for speaker, segments in chunk_segments.items():
+            speaker_segments.setdefault(speaker, []).extend(segments)
+    return merge_adjacent(speaker_segments)
+
+
+def diarize_audio(audio: np.ndarray, num_speakers: Optional[int] = 2, model: str = DIARIZATION_MODEL,
+                  cpu: bool = True, chunk_length: Optional[float] = CHUNK_LENGTH, overlap: float = CHUNK_OVERLAP,
+                  cache_dir: Optional[str] = DIARIZATION_CACHE_DIR, uri: str = 'audio') -> SpeakerSegments:
+    """
+    Diarize a recording, using the cache and chunking long recordings.
+
+    Args:
+        audio: Mono float32 array at TARGET_SAMPLE_RATE
+        num_speakers: Number of speakers in the recording
+        model: Hub name or local path of the pipeline
+        cpu: Run on CPU (default); False uses the best available device (cuda, mps)
+        chunk_length: Recordings longer than chunk_length + overlap seconds are diarized in chunks
+            (None: never)
+        overlap: Seconds of overlap between chunks
+        cache_dir: Folder of the RTTM cache (None: no cache)
+        uri: Recording name written in the RTTM file
+
+    Returns:
+        dict: Speaker label -> list of (start, end) tuples in seconds
+    """
+    duration = len(audio) / TARGET_SAMPLE_RATE
+    chunked = chunk_length is not None and duration > chunk_length + overlap
+    settings = {'num_speakers': num_speakers, 'chunk_length': chunk_length if chunked else None,
+                'overlap': overlap if chunked else None}
+    cache = DiarizationCache(cache_dir) if cache_dir else None
+    key = cache.key(audio_hash(audio), model, settings) if cache else None
+    if cache is not None:
+        speaker_segments = cache.get(key)
+        if speaker_segments is not None:
+            get_profiler().record('diarization', model=model, file=uri, audio_s=duration, cached=True)
+            return speaker_segments
+
+    pipeline = get_diarization_pipeline(model, cpu)
+    with get_profiler().stage('diarization', model=model, file=uri, audio_s=duration, cached=False) as event:
+        if chunked:
+            speaker_segments = diarize_chunked(pipeline, audio, num_speakers, chunk_length, overlap)
+            event['chunks'] = len(window_offsets(len(audio), chunk_length, overlap))
+        else:
+            speaker_segments = speaker_segments_of(_run_pipeline(pipeline, audio, num_speakers=num_speakers))
+    if cache is not None:
+        cache.put(key, uri, speaker_segments)
+    return speaker_segments
+
+
+def _init_worker(core_queue) -> None:
+    """Worker process: pin to a set of cores and use as many torch threads."""
+    import torch
+
+    core_ids = core_queue.get()
+    if core_ids and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, core_ids)
+    torch.set_num_threads(max(1, len(core_ids)))
+
+
+def _diarize_file(path: str, **kwargs) -> SpeakerSegments:
+    uri = os.path.splitext(os.path.basename(path))[0]
+    return diarize_audio(load_audio(path), uri=uri, **kwargs)
+
+
+def diarize_recordings(paths: Sequence[str], num_workers: Optional[int] = None, num_speakers: Optional[int] = 2,
+                       model: str = DIARIZATION_MODEL, cpu: bool = True, chunk_length: Optional[float] = CHUNK_LENGTH,
+                       overlap: float = CHUNK_OVERLAP,
+                       cache_dir: Optional[str] = DIARIZATION_CACHE_DIR) -> Dict[str, SpeakerSegments]:
+    """
+    Diarize recordings in parallel worker processes (see diarize_audio for the other arguments).
+
+    Args:
+        paths: Audio files
+        num_workers: Worker processes (default: one per THREADS_PER_WORKER cores; always 1 on a GPU)
+
+    Returns:
+        dict: Path -> speaker label -> list of (start, end) tuples in seconds
+    """
+    kwargs = dict(num_speakers=num_speakers, model=model, cpu=cpu, chunk_length=chunk_length, overlap=overlap,
+                  cache_dir=cache_dir)
+    cores = available_cores()
+    if select_device(cpu) != 'cpu':
+        num_workers = 1
+    num_workers = min(num_workers or max(1, len(cores) // THREADS_PER_WORKER), len(paths))
+    if num_workers <= 1:
+        return {path: _diarize_file(path, **kwargs) for path in paths}
+
+    ctx = mp.get_context('spawn')
+    core_queue = ctx.Queue()
+    for core_set in split_cores(cores, num_workers):
+        core_queue.put(core_set)
+    with ProcessPoolExecutor(max_workers=num_workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(core_queue,)) as executor:
+        futures = {path: executor.submit(_diarize_file, path, **kwargs) for path in paths}
+        results = {}
+        for path, future in futures.items():
+            results[path] = future.result()
+            print(f"Diarized {os.path.basename(path)}")
+    return results
@@ -0,0 +1,145 @@
+"""
+Registry of warm, lazily loaded models.
+
+Models (ASR pipelines, Voxtral, the pyannote diarization pipeline) are loaded on
+first use and kept in memory, so repeated calls from the notebook or a service do
+not reload multi-GB weights. At most max_models models are kept, and optionally
+no more than memory_budget bytes of parameters; the least recently used model is
+evicted first. Load times and hit/miss counts are available via metrics().
+"""
+
+import gc
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+DEFAULT_MAX_MODELS = 2
+
+
+def estimate_model_bytes(model: Any, _depth: int = 0, _seen: Optional[set] = None) -> int:
+    """
+    Estimate the memory used by a model's parameters and buffers.
+    Handles torch modules, HF pipelines and pyannote pipelines (which hold torch modules
+    as attributes, up to two levels deep) and tuples of these.
+    """
+    _seen = set() if _seen is None else _seen
+    if id(model) in _seen:
+        return 0
+    _seen.add(id(model))
+    if isinstance(model, (tuple, list)):
+        return sum(estimate_model_bytes(part, _depth, _seen) for part in model)
+    if hasattr(model, 'parameters') and hasattr(model, 'buffers'):
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    if _depth < 2 and hasattr(model, '__dict__'):
+        return sum(estimate_model_bytes(value, _depth + 1, _seen) for value in vars(model).values())
+    return 0
+
+
+class ModelRegistry:
+    """Keeps recently used models in memory with count- and memory-budgeted LRU eviction."""
+
+    def __init__(self, max_models: int = DEFAULT_MAX_MODELS, memory_budget: Optional[int] = None):
+        self.max_models = max_models
+        self.memory_budget = memory_budget
+        self._models = OrderedDict()  # key -> (model, size in bytes)
+        self._lock = threading.RLock()
+        self._metrics = {'hits': 0, 'misses': 0, 'evictions': 0, 'loads': {}}
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Return the model for key, calling loader() to load it on first use.
+
+        Args:
+            key: Identifier of the model, e.g. ('asr', model_name, cpu)
+            loader: Function without arguments that loads and returns the model
+        """
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self._metrics['hits'] += 1
+                return self._models[key][0]
+
+            self._metrics['misses'] += 1
+            # Make room before loading, so the old and new weights are not in memory at the same time
+            while self._models and len(self._models) >= self.max_models:
+                self.evict(next(iter(self._models)))
+            start = time.perf_counter()
+            model = loader()
+            load_seconds = time.perf_counter() - start
+            size = estimate_model_bytes(model)
+            self._metrics['loads'][str(key)] = {'seconds': round(load_seconds, 3), 'bytes': size}
+            print(f"Loaded {key} in {load_seconds:.1f} s ({size / 1e9:.2f} GB)")
+
+            self._models[key] = (model, size)
+            self._evict(keep=key)
+            return model
+
+    def _evict(self, keep: Hashable) -> None:
+        """Evict least recently used models until the count and memory budgets are respected."""
+        def over_budget():
+            if len(self._models) > self.max_models:
+                return True
+            if self.memory_budget is not None:
+                return sum(size for _, size in self._models.values()) > self.memory_budget
+            return False
+
+        while over_budget():
+            oldest = next(iter(self._models))
+            if oldest == keep:
+                break
+            self.evict(oldest)
+
+    def evict(self, key: Hashable) -> None:
+        """Remove a model from the registry and free its memory."""
+        with self._lock:
+            entry = self._models.pop(key, None)
+            if entry is None:
+                return
+            self._metrics['evictions'] += 1
+        if hasattr(entry[0], 'unload'):
+            entry[0].unload()
+        del entry
+        gc.collect()
+        try:
+            import torch
+            torch.mps.empty_cache() if torch.backends.mps.is_available() else None
+            torch.cuda.empty_cache() if torch.cuda.is_available() else None
+        except ImportError:
+            pass
+
+    def clear(self) -> None:
+        """Evict all models."""
+        for key in list(self._models):
+            self.evict(key)
+
+    def loaded(self) -> list:
+        """Keys of the models currently in memory, least recently used first."""
+        return list(self._models)
+
+    def metrics(self) -> dict:
+        """Return hit/miss/eviction counts, load times and the memory held by warm models."""
+        with self._lock:
+            return {
+                **{k: v for k, v in self._metrics.items() if k != 'loads'},
+                'loads': dict(self._metrics['loads']),
+                'loaded': [str(key) for key in self._models],
+                'loaded_bytes': sum(size for _, size in self._models.values()),
+            }
+
+
+_registry = ModelRegistry()
+
+
+def get_registry() -> ModelRegistry:
+    """Return the process-wide model registry."""
+    return _registry
+
+
+def configure_registry(max_models: int = DEFAULT_MAX_MODELS, memory_budget: Optional[int] = None) -> ModelRegistry:
+    """Replace the process-wide registry (evicting all warm models) with a new configuration."""
+    global _registry
+    _registry.clear()
+    _registry = ModelRegistry(max_models=max_models, memory_budget=memory_budget)
+    return _registry
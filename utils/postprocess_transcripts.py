@@ -7,10 +7,26 @@ cleaned folder structure without modifying the original files.
 """
 
 import os
-import re
+import json
 import shutil
+import hashlib
 from pathlib import Path
-from typing import List, Set
+from typing import Dict, List, Optional, Set
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from utils.text_normalizer import HYPOTHESIS_FILLERS, HYPOTHESIS_PUNCTUATION, clean_hypothesis
+except ImportError:  # Run as a script from within utils/
+    from text_normalizer import HYPOTHESIS_FILLERS, HYPOTHESIS_PUNCTUATION, clean_hypothesis
+
+# Bump when the cleaning logic changes, so incremental runs reprocess everything
+CLEANER_VERSION = 1
+MANIFEST_NAME = '.clean_manifest.json'
+
+
+def _file_digest(path: Path) -> str:
+    """SHA-256 of a file's contents."""
+    return hashlib.sha256(path.read_bytes()).hexdigest()
 
 
 class TranscriptCleaner:
@@ -18,12 +34,10 @@ class TranscriptCleaner:
     
     def __init__(self):
         # Common Dutch fillers, hesitations, and unknown words
-        self.fillers = {
-            'uh', 'um', 'hè', 'huh', 'hm', 'hmm', 'eh', 'euh', 'uhm', 'oh', 'ehm'
-            }
+        self.fillers = set(HYPOTHESIS_FILLERS)
         
         # Punctuation to remove
-        self.punctuation = r'[.,!?;:()\[\]{}"\'-]'
+        self.punctuation = HYPOTHESIS_PUNCTUATION
         
     def clean_text(self, text: str) -> str:
         """
@@ -39,43 +53,23 @@ class TranscriptCleaner:
         Returns:
             Cleaned text string
         """
-        # Remove unknown tokens (independent, sentence boundaries, or embedded)
-        text = re.sub(r'\[UNK\]', '', text)
-        
-        # Convert to lowercase
-        text = text.lower()
-
-        # Remove punctuation
-        text = re.sub(self.punctuation, '', text)
-        
-        # Remove leading and trailing whitespace
-        text = text.strip()
-        
-        # Split into words
-        words = text.split()
-        
-        # Remove fillers
-        cleaned_words = []
-        for word in words:
-            # Skip if it's a filler
-            if word not in self.fillers:
-                cleaned_words.append(word)
-        
-        # Join words back together
-        cleaned_text = ' '.join(cleaned_words)
-        
-        # Remove extra whitespace
-        cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
-        
-        return cleaned_text.strip()
+        return clean_hypothesis(text, self.fillers)
+    
+    def config_version(self) -> str:
+        """Identifier of the cleaning configuration (cleaner version, fillers and punctuation)."""
+        payload = json.dumps([CLEANER_VERSION, sorted(self.fillers), self.punctuation])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
     
-    def process_file(self, input_path: str, output_path: str) -> None:
+    def process_file(self, input_path: str, output_path: str) -> bool:
         """
         Process a single transcript file.
         
         Args:
             input_path: Path to input transcript file (READ ONLY)
             output_path: Path to output cleaned transcript file (NEW FILE)
+            
+        Returns:
+            True if the file was processed successfully
         """
         try:
             # Read from original file (READ ONLY)
@@ -91,18 +85,39 @@ class TranscriptCleaner:
             # Write cleaned content to NEW file
             with open(output_path, 'w', encoding='utf-8') as f:
                 f.write(cleaned_content)
+            return True
                 
         except Exception as e:
             print(f"Error processing {input_path}: {e}")
+            return False
+    
+    def _process_files(self, jobs: List[tuple], max_workers: Optional[int]) -> List[bool]:
+        """Process (input_path, output_path) pairs, in a process pool unless max_workers is 1."""
+        if max_workers == 1 or len(jobs) < 2:
+            results = [self.process_file(src, dst) for src, dst in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(self.process_file, [src for src, _ in jobs], [dst for _, dst in jobs],
+                                            chunksize=64))
+        print(f"Completed processing {len(jobs)} files")
+        return results
     
-    def process_directory(self, input_dir: str, output_dir: str) -> None:
+    def process_directory(self, input_dir: str, output_dir: str, incremental: bool = False,
+                          max_workers: Optional[int] = None) -> None:
         """
         Process all transcript files in a directory and its subdirectories.
-        Creates a completely new folder structure for cleaned transcripts.
+        By default, creates a completely new folder structure for cleaned transcripts.
+        
+        In incremental mode, a manifest in the output directory records the modification time,
+        size and hash of every source file and the cleaner configuration. Only new or changed
+        files are reprocessed, outputs without a source file in input_dir are removed, and everything
+        is reprocessed if the cleaner configuration changed.
         
         Args:
             input_dir: Input directory containing transcript files (READ ONLY)
             output_dir: Output directory for cleaned transcripts (NEW FOLDER)
+            incremental: Only process new or changed files instead of rebuilding the output directory
+            max_workers: Number of worker processes (default: number of CPUs, 1 = no pool)
         """
         input_path = Path(input_dir)
         output_path = Path(output_dir)
@@ -111,6 +126,10 @@ class TranscriptCleaner:
         if not input_path.exists():
             raise FileNotFoundError(f"Input directory '{input_dir}' does not exist")
         
+        if incremental:
+            self._process_directory_incremental(input_path, output_path, max_workers)
+            return
+        
         # Remove output directory if it exists (to ensure clean start)
         if output_path.exists():
             print(f"Removing existing output directory: {output_dir}")
@@ -126,24 +145,75 @@ class TranscriptCleaner:
         print(f"Reading from: {input_dir}")
         print(f"Writing cleaned files to: {output_dir}")
         
-        processed_count = 0
-        for txt_file in txt_files:
-            # Calculate relative path from input directory
-            relative_path = txt_file.relative_to(input_path)
-            
-            # Create corresponding output path
-            output_file = output_path / relative_path
-            
-            # Process the file (READ from original, WRITE to new location)
-            self.process_file(str(txt_file), str(output_file))
-            processed_count += 1
-            
-            if processed_count % 100 == 0:
-                print(f"Processed {processed_count} files...")
+        # Process the files (READ from original, WRITE to new location)
+        jobs = [(str(txt_file), str(output_path / txt_file.relative_to(input_path))) for txt_file in txt_files]
+        self._process_files(jobs, max_workers)
         
-        print(f"Completed processing {processed_count} files")
         print(f"Cleaned transcripts saved to: {output_dir}")
         print("Original transcripts remain unchanged.")
+    
+    def _process_directory_incremental(self, input_path: Path, output_path: Path,
+                                       max_workers: Optional[int]) -> None:
+        """Incremental variant of process_directory, see its docstring."""
+        output_path.mkdir(parents=True, exist_ok=True)
+        manifest_path = output_path / MANIFEST_NAME
+        version = self.config_version()
+        
+        manifest: Dict[str, dict] = {}
+        if manifest_path.exists():
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('config_version') == version:
+                manifest = saved.get('files', {})
+            else:
+                print("Cleaner configuration changed - reprocessing all files")
+        
+        jobs, pending_entries, unchanged = [], {}, 0
+        current = set()
+        for txt_file in input_path.rglob('*.txt'):
+            relative_path = txt_file.relative_to(input_path).as_posix()
+            current.add(relative_path)
+            output_file = output_path / relative_path
+            stat = txt_file.stat()
+            entry = manifest.get(relative_path)
+            if entry and output_file.exists():
+                if entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                    unchanged += 1
+                    continue
+                digest = _file_digest(txt_file)
+                if entry['sha256'] == digest:
+                    # Touched but not modified
+                    entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                    unchanged += 1
+                    continue
+            else:
+                digest = _file_digest(txt_file)
+            jobs.append((str(txt_file), str(output_file)))
+            pending_entries[str(txt_file)] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': digest}
+        
+        # Remove outputs whose source file vanished; compared with the output directory itself, so
+        # orphans are also found when the manifest was reset (first run, configuration change)
+        outputs = {txt_file.relative_to(output_path).as_posix() for txt_file in output_path.rglob('*.txt')}
+        removed = 0
+        for relative_path in sorted(outputs - current):
+            (output_path / relative_path).unlink()
+            removed += 1
+        for relative_path in set(manifest) - current:
+            del manifest[relative_path]
+        
+        print(f"Found {len(current)} transcript files: {len(jobs)} new or changed, {unchanged} unchanged, "
+              f"{removed} removed")
+        
+        results = self._process_files(jobs, max_workers)
+        for (src, _), success in zip(jobs, results):
+            if success:
+                manifest[Path(src).relative_to(input_path).as_posix()] = pending_entries[src]
+        
+        tmp_path = manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'config_version': version, 'files': manifest}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+        print(f"Cleaned transcripts saved to: {output_path}")
 
 
 def main():
@@ -160,8 +230,8 @@ def main():
     # Create cleaner instance
     cleaner = TranscriptCleaner()
     
-    # Process all transcripts
-    cleaner.process_directory(input_dir, output_dir)
+    # Process new or changed transcripts
+    cleaner.process_directory(input_dir, output_dir, incremental=True)
 
 
 if __name__ == "__main__":
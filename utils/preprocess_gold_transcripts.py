@@ -1,6 +1,9 @@
 import os
-import re
-import string
+
+try:
+    from utils.text_normalizer import normalize_gold_lines
+except ImportError:  # Run as a script from within utils/
+    from text_normalizer import normalize_gold_lines
 
 def process_gold_transcripts(reference_folder=os.path.join('data', 'reference_transcripts_beatrix')):
     """
@@ -21,12 +24,6 @@ def process_gold_transcripts(reference_folder=os.path.join('data', 'reference_tr
     os.makedirs(normalized_dir, exist_ok=True)
     os.makedirs(normalized_clean_dir, exist_ok=True)
 
-    fillers = [r'\buh\b', r'\beh\b', r'\behm\b', r'\boh\b']
-    fillers_pattern = re.compile('|'.join(fillers), re.IGNORECASE)
-    punctuation_pattern = re.compile(f'[{re.escape(string.punctuation)}]')
-    whitespace_pattern = re.compile(r'\s+')  # one or more whitespace
-    space_before_period_pattern = re.compile(r'\s+\.$')
-
     for fname in os.listdir(ortho_dir):
         if not fname.endswith('.txt'):
             continue
@@ -35,33 +32,13 @@ def process_gold_transcripts(reference_folder=os.path.join('data', 'reference_tr
         with open(src_path, 'r', encoding='utf-8') as f:
             lines = f.readlines()
 
-        # Strip leading whitespace from all lines
-        stripped_lines = [line.lstrip() for line in lines]
-
-        # 1. Write to orthographic_clean: remove leading whitespace and fillers
-        clean_lines = [fillers_pattern.sub('', line) for line in stripped_lines]
-        # Remove whitespace before a final period
-        clean_lines = [space_before_period_pattern.sub('.', l) for l in clean_lines]
-        # Collapse all whitespace to a single space and strip leading/trailing whitespace
-        clean_lines = [whitespace_pattern.sub(' ', l).strip() + ('\n' if l.endswith('\n') else '') for l in clean_lines]
-        clean_path = os.path.join(ortho_clean_dir, fname)
-        with open(clean_path, 'w', encoding='utf-8') as f:
-            f.writelines(clean_lines)
-
-        # 2. Write to normalized: keep fillers, remove punctuation, lowercase
-        norm_lines = [punctuation_pattern.sub('', line).lower() for line in stripped_lines]
-        # Collapse all whitespace to a single space and strip leading/trailing whitespace
-        norm_lines = [whitespace_pattern.sub(' ', l).strip() + ('\n' if l.endswith('\n') else '') for l in norm_lines]
-        norm_path = os.path.join(normalized_dir, fname)
-        with open(norm_path, 'w', encoding='utf-8') as f:
-            f.writelines(norm_lines)
+        # All three variants are produced in a single pass over the lines
+        clean_lines, norm_lines, norm_clean_lines = normalize_gold_lines(lines)
 
-        # 3. Write to normalized_clean: remove fillers, punctuation, lowercase
-        norm_clean_lines = [punctuation_pattern.sub('', fillers_pattern.sub('', line)).lower() for line in stripped_lines]
-        # Collapse all whitespace to a single space and strip leading/trailing whitespace
-        norm_clean_lines = [whitespace_pattern.sub(' ', l).strip() + ('\n' if l.endswith('\n') else '') for l in norm_clean_lines]
-        norm_clean_path = os.path.join(normalized_clean_dir, fname)
-        with open(norm_clean_path, 'w', encoding='utf-8') as f:
-            f.writelines(norm_clean_lines)
+        for out_dir, out_lines in ((ortho_clean_dir, clean_lines),
+                                   (normalized_dir, norm_lines),
+                                   (normalized_clean_dir, norm_clean_lines)):
+            with open(os.path.join(out_dir, fname), 'w', encoding='utf-8') as f:
+                f.writelines(out_lines)
 
     print(f"Processed files from: {ortho_dir}\n  Orthographic_clean: {ortho_clean_dir}\n  Normalized: {normalized_dir}\n  Normalized_clean: {normalized_clean_dir}") 
\ No newline at end of file
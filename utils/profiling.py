@@ -0,0 +1,167 @@
+"""
+Per-stage profiling and real-time-factor instrumentation.
+
+Pipeline stages (conversion, decoding, diarization, transcription, evaluation) record
+one structured event per unit of work through the process-wide profiler:
+
+    with get_profiler().stage('transcribe', model=model_name, audio_s=duration) as event:
+        ...
+        event['tokens'] = n_tokens
+
+Every event has the stage, wall time (seconds), peak RSS of the process (MB), pid and
+timestamp, plus the fields passed by the stage. Events with audio_s get a real-time
+factor (rtf = model_s or wall_s / audio_s). Events are appended as JSON lines, so
+worker processes can share one log.
+
+Profiling is off unless enabled with configure_profiler() or the ASR_PROFILE_LOG
+environment variable; configure_profiler() sets the variable as well, so worker
+processes started afterwards log to the same file. Summaries:
+
+    python utils/profiling.py [output/profile.jsonl]
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+PROFILE_LOG = os.path.join('output', 'profile.jsonl')
+PROFILE_ENV = 'ASR_PROFILE_LOG'
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class Profiler:
+    """Appends timing events of pipeline stages to a JSONL log (no-op when path is None)."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def record(self, stage: str, **fields) -> None:
+        """Write one event for stage, with the given fields."""
+        if not self.enabled:
+            return
+        event = {'stage': stage, **fields}
+        audio_s = event.get('audio_s')
+        busy_s = event.get('model_s', event.get('wall_s'))
+        if audio_s and busy_s is not None and 'rtf' not in event:
+            event['rtf'] = busy_s / audio_s
+        event.update(peak_rss_mb=round(peak_rss_mb(), 1), pid=os.getpid(),
+                     timestamp=datetime.now().isoformat(timespec='milliseconds'))
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+    @contextmanager
+    def stage(self, stage: str, **fields):
+        """
+        Time the body of a with-block and record it as one event.
+        Yields the event fields as a dict, so the body can add fields (e.g. tokens).
+        """
+        if not self.enabled:
+            yield fields
+            return
+        start = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            fields.setdefault('wall_s', time.perf_counter() - start)
+            self.record(stage, **fields)
+
+
+_profiler = Profiler(os.environ.get(PROFILE_ENV) or None)
+
+
+def get_profiler() -> Profiler:
+    """Return the process-wide profiler."""
+    return _profiler
+
+
+def configure_profiler(path: Optional[str] = PROFILE_LOG) -> Profiler:
+    """Enable profiling to path (or disable it with None), also for worker processes started afterwards."""
+    global _profiler
+    _profiler = Profiler(path)
+    if path is None:
+        os.environ.pop(PROFILE_ENV, None)
+    else:
+        os.environ[PROFILE_ENV] = path
+    return _profiler
+
+
+def latency_percentiles(values: Sequence[float], percentiles: Sequence[int] = (50, 95, 99)) -> Dict[str, Optional[float]]:
+    """Percentiles (p50, p95, p99 by default) of latencies in seconds; None if there are none."""
+    if len(values) == 0:
+        return {f'p{p}': None for p in percentiles}
+    return {f'p{p}': round(float(value), 4)
+            for p, value in zip(percentiles, np.percentile(np.asarray(values, dtype=float), percentiles))}
+
+
+def load_profile(path: str = PROFILE_LOG) -> pd.DataFrame:
+    """Read a profile log into a DataFrame (one row per event)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return pd.DataFrame([json.loads(line) for line in f if line.strip()])
+
+
+def _total(values: pd.Series) -> float:
+    """Sum that is NaN (instead of 0) if a stage never reported the field."""
+    return values.sum(min_count=1)
+
+
+def summarize_profile(profile: Union[str, pd.DataFrame] = PROFILE_LOG) -> pd.DataFrame:
+    """
+    Summarize a profile per stage and model.
+
+    Returns:
+        DataFrame with the number of events, total audio and wall time, overall real-time factor
+        (total model or wall time / total audio), median and p95 per-event wall time, tokens
+        per second and maximum peak RSS
+    """
+    df = load_profile(profile) if isinstance(profile, str) else profile.copy()
+    for column in ('model', 'audio_s', 'wall_s', 'model_s', 'decode_s', 'tokens'):
+        if column not in df:
+            df[column] = None
+    df['model'] = df['model'].fillna('-')
+    df['busy_s'] = df['model_s'].fillna(df['wall_s'])
+
+    grouped = df.groupby(['stage', 'model'])
+    summary = grouped.agg(events=('wall_s', 'size'), audio_s=('audio_s', _total), wall_s=('wall_s', _total),
+                          busy_s=('busy_s', _total), decode_s=('decode_s', _total), tokens=('tokens', _total),
+                          wall_p50=('wall_s', 'median'), wall_p95=('wall_s', lambda s: s.quantile(0.95)),
+                          peak_rss_mb=('peak_rss_mb', 'max'))
+    summary['rtf'] = summary['busy_s'] / summary['audio_s'].where(summary['audio_s'] > 0)
+    summary['tokens_per_s'] = summary['tokens'] / summary['busy_s'].where(summary['busy_s'] > 0)
+    return summary.drop(columns='busy_s').reset_index()
+
+
+def write_profile_parquet(profile_path: str = PROFILE_LOG, output_path: Optional[str] = None) -> str:
+    """Convert a JSONL profile log to Parquet (requires pyarrow or fastparquet)."""
+    output_path = output_path or os.path.splitext(profile_path)[0] + '.parquet'
+    load_profile(profile_path).to_parquet(output_path, index=False)
+    return output_path
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else PROFILE_LOG
+    with pd.option_context('display.max_columns', None, 'display.width', 200, 'display.float_format', '{:.3f}'.format):
+        print(summarize_profile(path).to_string(index=False))
@@ -0,0 +1,124 @@
+"""
+Reduced-precision CPU inference for the HuggingFace pipeline models (Whisper, wav2vec2).
+
+Precisions:
+- fp32: the default, unchanged weights
+- int8: dynamic quantization of all nn.Linear layers (weights stored as int8, activations
+  quantized on the fly), applied to the fp32 model each time it is loaded
+- bf16: weights and activations in bfloat16 (fast on CPUs with AVX512-BF16/AMX, slow elsewhere)
+
+Transcripts of a reduced-precision run go to <model>-<precision> folders, so they are
+evaluated as separate models; compare_precisions reports the WER difference with fp32.
+"""
+
+import os
+import platform
+from typing import List
+
+import pandas as pd
+import torch
+
+PRECISIONS = ('fp32', 'int8', 'bf16')
+
+
+def check_precision(precision: str, cpu: bool = True) -> None:
+    """Raise a ValueError for unknown precisions and for int8 on a GPU."""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision {precision!r}, expected one of {', '.join(PRECISIONS)}")
+    if precision == 'int8' and not cpu:
+        raise ValueError("Dynamic int8 quantization is only supported on CPU")
+
+
+def _select_quantized_engine() -> None:
+    """Use qnnpack on ARM (e.g. Apple silicon), where fbgemm/x86 are not available."""
+    engines = torch.backends.quantized.supported_engines
+    if platform.machine().lower() in ('arm64', 'aarch64') and 'qnnpack' in engines:
+        torch.backends.quantized.engine = 'qnnpack'
+
+
+def quantize_dynamic_int8(model: torch.nn.Module) -> torch.nn.Module:
+    """Return a copy of model with all nn.Linear layers dynamically quantized to int8."""
+    _select_quantized_engine()
+    return torch.ao.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_quantized_pipeline(model_name: str, **pipeline_kwargs):
+    """
+    Load an ASR pipeline with a dynamically int8-quantized model on CPU.
+
+    The fp32 model is loaded and quantized on every load; quantizing takes seconds and is
+    deterministic. Quantized modules are not cached on disk: unpickling them would run
+    arbitrary code from the cache and break across torch/transformers versions.
+    """
+    from transformers import pipeline
+
+    transcriber = pipeline("automatic-speech-recognition", model=model_name, device="cpu", **pipeline_kwargs)
+    transcriber.model = quantize_dynamic_int8(transcriber.model)
+    return transcriber
+
+
+def load_pipeline(model_name: str, precision: str = 'fp32', device: str = 'cpu', **pipeline_kwargs):
+    """Load an ASR pipeline in the given precision (see PRECISIONS) on device."""
+    from transformers import pipeline
+
+    check_precision(precision, cpu=device == 'cpu')
+    if precision == 'int8':
+        return load_quantized_pipeline(model_name, **pipeline_kwargs)
+    if precision == 'bf16':
+        pipeline_kwargs['torch_dtype'] = torch.bfloat16
+    return pipeline("automatic-speech-recognition", model=model_name, device=device, **pipeline_kwargs)
+
+
+def precision_deltas(summary: pd.DataFrame, asr_path: str, model_list: List[str],
+                     precisions=('int8', 'bf16')) -> pd.DataFrame:
+    """
+    WER differences between reduced-precision and fp32 runs in a summarize_results table.
+
+    Rows of the table are named '<asr folder>/<model folder>' (see evaluate_models), so the
+    runs of a model are looked up as '<basename of asr_path>/<model>[-<precision>]'.
+    Raises a ValueError if no pair of fp32 and reduced-precision runs is found.
+    """
+    folder = os.path.basename(os.path.normpath(asr_path))
+    rows = []
+    for model_name in model_list:
+        base = f"{folder}/{model_name.split('/')[-1]}"
+        if base not in summary.index:
+            continue
+        for precision in precisions:
+            name = f"{base}-{precision}"
+            if name not in summary.index:
+                continue
+            row = {'model': model_name, 'precision': precision}
+            for metric in ('corpus_wer', 'mean_utterance_wer'):
+                row[f'{metric}_fp32'] = summary.loc[base, metric]
+                row[metric] = summary.loc[name, metric]
+                row[f'{metric}_delta'] = row[metric] - row[f'{metric}_fp32']
+            rows.append(row)
+    if not rows:
+        raise ValueError(f"No fp32 and {'/'.join(precisions)} runs of {', '.join(model_list)} found in "
+                         f"{asr_path} (evaluated: {', '.join(map(str, summary.index)) or 'none'})")
+    return pd.DataFrame(rows)
+
+
+def compare_precisions(ref_path: str, asr_path: str, model_list: List[str],
+                       precisions=('int8', 'bf16')) -> pd.DataFrame:
+    """
+    Compare the WER of reduced-precision runs with the fp32 run of the same models.
+
+    Args:
+        ref_path: Folder with reference transcripts
+        asr_path: Folder with one subfolder per model (<model> for fp32, <model>-<precision> otherwise)
+        model_list: HuggingFace model names
+        precisions: Precisions to compare with fp32
+
+    Returns:
+        DataFrame with one row per model and precision: corpus WER and mean per-utterance WER
+        of both runs and their differences (positive = worse than fp32)
+    """
+    try:
+        from utils.wer_evaluator import evaluate_models, summarize_results
+    except ImportError:  # Run as a script from within utils/
+        from wer_evaluator import evaluate_models, summarize_results
+
+    summary = summarize_results(evaluate_models(ref_path, asr_path))
+    return precision_deltas(summary, asr_path, model_list, precisions)
@@ -1,76 +1,180 @@
+"""
+Build evaluation subsets of Mozilla Common Voice.
+
+- select_clips: reads only the needed columns of a Common Voice TSV (validated.tsv, ...)
+  and filters them with vectorized predicates on any column (age, gender, accents, ...).
+- create_orthographic_files: writes one reference transcript per selected clip.
+- copy_audio_from_transcripts: puts the audio of every transcript in a folder next to
+  the other segments. The clips folder is listed once into a basename -> path index, and
+  the clips are hard-linked (or symlinked, or copied as a fallback) with a thread pool.
+- build_subset: both steps for one selection, straight from the TSV.
+"""
+
 import os
+import csv
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
 import pandas as pd
-import shutil
-from pathlib import Path
-
-def create_orthographic_files(tsv_path, n_rows=None, seed=None):
-    # Read the TSV file
-    df = pd.read_csv(tsv_path, sep='\t')
-    
-    # Filter for sixties
-    df = df[df['age'] == 'sixties']
-    
-    # Set seed if provided
-    if seed is not None:
+
+try:
+    from utils.audio_io import LINK_MODES, link_or_copy
+except ImportError:  # Run as a script from within utils/
+    from audio_io import LINK_MODES, link_or_copy
+
+MOZILLA_TSV = os.path.join('data', 'mozilla_cv', 'validated.tsv')
+MOZILLA_CLIPS_DIR = os.path.join('data', 'mozilla_cv', 'clips')
+MOZILLA_ORTHOGRAPHIC_DIR = os.path.join('data', 'reference_transcripts_mozilla', 'orthographic')
+MOZILLA_SEGMENTS_DIR = os.path.join('output', 'segments_mozilla')
+
+
+def _column_mask(column: pd.Series, predicate) -> pd.Series:
+    """
+    Boolean mask of a column for one filter: a callable is applied to the whole column,
+    a list/tuple/set matches any of its values and anything else must be equal.
+    """
+    if callable(predicate):
+        return predicate(column).fillna(False).astype(bool)
+    if isinstance(predicate, (list, tuple, set, frozenset)):
+        return column.isin(predicate)
+    return column == predicate
+
+
+def select_clips(tsv_path: str = MOZILLA_TSV, n_rows: Optional[int] = None, seed: Optional[int] = None,
+                 **filters) -> pd.DataFrame:
+    """
+    Select clips from a Common Voice TSV file.
+
+    Args:
+        tsv_path: Path to a Common Voice TSV file
+        n_rows: Number of clips to sample (all matching clips if None)
+        seed: Random seed for the sample
+        **filters: Column predicates, e.g. age='sixties', gender=['male', 'female'] or
+            accents=lambda s: s.str.contains('Vlaams', na=False). None values are ignored.
+
+    Returns:
+        DataFrame with the path and sentence of the selected clips
+    """
+    filters = {column: predicate for column, predicate in filters.items() if predicate is not None}
+    columns = list(dict.fromkeys(['path', 'sentence', *filters]))
+    # Sentences may contain quotes, so the TSV is read without quote handling
+    df = pd.read_csv(tsv_path, sep='\t', usecols=columns, dtype=str, quoting=csv.QUOTE_NONE,
+                     keep_default_na=False, na_values=[''])
+
+    mask = pd.Series(True, index=df.index)
+    for column, predicate in filters.items():
+        mask &= _column_mask(df[column], predicate)
+    df = df[mask]
+
+    if n_rows is not None or seed is not None:
         df = df.sample(n=min(n_rows, len(df)) if n_rows else len(df), random_state=seed)
-    elif n_rows is not None:
-        df = df.sample(n=min(n_rows, len(df)))
-    
-    output_dir = os.path.join('data', 'reference_transcripts_mozilla', 'orthographic')
+    return df[['path', 'sentence']].reset_index(drop=True)
+
+
+def create_orthographic_files(tsv_path, n_rows=None, seed=None, output_dir=MOZILLA_ORTHOGRAPHIC_DIR,
+                              age='sixties', **filters):
+    """
+    Write one transcript (<clip>.txt) per selected clip of a Common Voice TSV file.
+
+    Args:
+        tsv_path: Path to a Common Voice TSV file
+        n_rows: Number of clips to sample (all matching clips if None)
+        seed: Random seed for the sample
+        output_dir: Folder for the transcripts
+        age: Age group to select (None for all ages)
+        **filters: Other column predicates, see select_clips
+
+    Returns:
+        DataFrame with the path and sentence of the selected clips
+    """
+    df = select_clips(tsv_path, n_rows, seed, age=age, **filters)
+    os.makedirs(output_dir, exist_ok=True)
+
+    for path, sentence in zip(df['path'], df['sentence']):
+        filename = os.path.splitext(path)[0] + '.txt'
+        with open(os.path.join(output_dir, filename), 'w', encoding='utf-8') as f:
+            f.write(sentence)
+
+    print(f"Wrote {len(df)} transcripts to {output_dir}")
+    return df
+
+
+def index_audio(audio_folder_path: str) -> Dict[str, str]:
+    """Map the basename (without extension) of every file in a folder to its path, listing it once."""
+    with os.scandir(audio_folder_path) as entries:
+        return {os.path.splitext(entry.name)[0]: entry.path for entry in entries if entry.is_file()}
+
+
+def link_clips(clip_names: List[str], audio_index: Dict[str, str], output_dir: str = MOZILLA_SEGMENTS_DIR,
+               mode: str = 'link', workers: int = 8) -> List[str]:
+    """
+    Link or copy the audio of clip_names (basenames without extension) to output_dir.
+
+    Returns:
+        list: Filenames of the audio files placed in output_dir
+    """
     os.makedirs(output_dir, exist_ok=True)
-    
-    for _, row in df.iterrows():
-        filename = row['path'].replace('.mp3', '.txt')
-        filepath = os.path.join(output_dir, filename)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(row['sentence'])
-
-def copy_audio_from_transcripts(transcript_folder_path, audio_folder_path):
+    found = []
+    for name in clip_names:
+        if name in audio_index:
+            found.append(audio_index[name])
+        else:
+            print(f"Warning: Audio file not found for clip: {name}")
+
+    def place(src):
+        filename = os.path.basename(src)
+        return filename, link_or_copy(src, os.path.join(output_dir, filename), mode)
+
+    # Linking and copying is I/O bound, so threads suffice
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        placed = list(executor.map(place, found))
+
+    methods = pd.Series([method for _, method in placed], dtype=object).value_counts().to_dict()
+    print(f"Placed {len(placed)} audio files in {output_dir} ({methods})")
+    return [filename for filename, _ in placed]
+
+
+def copy_audio_from_transcripts(transcript_folder_path, audio_folder_path, output_dir=MOZILLA_SEGMENTS_DIR,
+                                mode='link', workers=8):
     """
-    Create a list of all transcripts in a folder and copy corresponding audio files.
-    
+    Create a list of all transcripts in a folder and link or copy the corresponding audio files.
+
     Args:
         transcript_folder_path (str): Path to folder containing transcript files
         audio_folder_path (str): Path to folder containing audio files
-    
+        output_dir (str): Folder for the audio files
+        mode (str): 'link' (hard link, falling back to symlink and copy), 'hardlink', 'symlink' or 'copy'
+        workers (int): Number of threads
+
     Returns:
-        list: List of transcript filenames that were processed
+        list: Filenames of the audio files placed in output_dir
     """
-    # Create output directory
-    output_dir = os.path.join('output', 'segments_mozilla')
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Get list of all transcript files
-    transcript_files = []
-    for filename in os.listdir(transcript_folder_path):
-        if filename.endswith('.txt'):
-            transcript_files.append(filename)
-    
-    print(f"Found {len(transcript_files)} transcript files")
-    
-    # Copy corresponding audio files
-    copied_files = []
-    for transcript_file in transcript_files:
-        # Get base filename without extension
-        base_filename = os.path.splitext(transcript_file)[0]
-        
-        # Look for audio files with the same base filename but different extensions
-        audio_found = False
-        for audio_file in os.listdir(audio_folder_path):
-            audio_base = os.path.splitext(audio_file)[0]
-            if audio_base == base_filename:
-                # Found matching audio file
-                audio_filepath = os.path.join(audio_folder_path, audio_file)
-                output_filepath = os.path.join(output_dir, audio_file)
-                shutil.copy2(audio_filepath, output_filepath)
-                copied_files.append(audio_file)
-                print(f"Copied: {audio_file}")
-                audio_found = True
-                break
-        
-        if not audio_found:
-            print(f"Warning: Audio file not found for transcript: {transcript_file}")
-    
-    print(f"Successfully copied {len(copied_files)} audio files to {output_dir}")
-    
\ No newline at end of file
+    transcript_names = [os.path.splitext(filename)[0] for filename in os.listdir(transcript_folder_path)
+                        if filename.endswith('.txt')]
+    print(f"Found {len(transcript_names)} transcript files")
+    return link_clips(transcript_names, index_audio(audio_folder_path), output_dir, mode, workers)
+
+
+def build_subset(tsv_path: str = MOZILLA_TSV, clips_dir: str = MOZILLA_CLIPS_DIR, n_rows: Optional[int] = None,
+                 seed: Optional[int] = None, transcript_dir: str = MOZILLA_ORTHOGRAPHIC_DIR,
+                 audio_dir: str = MOZILLA_SEGMENTS_DIR, mode: str = 'link', workers: int = 8,
+                 **filters) -> pd.DataFrame:
+    """
+    Build an evaluation subset: transcripts of the selected clips in transcript_dir and
+    their audio in audio_dir. The clips folder may also hold converted audio (e.g. .wav
+    files with the clip's basename).
+
+    Args:
+        filters: Column predicates, see select_clips (no age filter unless given)
+
+    Returns:
+        DataFrame with the path and sentence of the selected clips
+    """
+    df = create_orthographic_files(tsv_path, n_rows, seed, transcript_dir, **{'age': None, **filters})
+    clip_names = [os.path.splitext(path)[0] for path in df['path']]
+    link_clips(clip_names, index_audio(clips_dir), audio_dir, mode, workers)
+    return df
+
+
+if __name__ == "__main__":
+    build_subset(n_rows=500, seed=42, age='sixties')
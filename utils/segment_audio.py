@@ -1,34 +1,53 @@
-import os, torch
+import os
+import numpy as np
 from pydub import AudioSegment
-from pyannote.audio import Pipeline
+
+try:
+    from utils.audio_io import TARGET_SAMPLE_RATE, load_audio
+    from utils.segment_store import SEGMENT_STORE_DIR, write_recording
+    from utils.chunking import smart_chunks
+    from utils.diarization import (DIARIZATION_MODEL, DIARIZATION_CACHE_DIR, CHUNK_LENGTH, diarize_audio,
+                                   diarize_recordings)
+except ImportError:  # Run as a script from within utils/
+    from audio_io import TARGET_SAMPLE_RATE, load_audio
+    from segment_store import SEGMENT_STORE_DIR, write_recording
+    from chunking import smart_chunks
+    from diarization import (DIARIZATION_MODEL, DIARIZATION_CACHE_DIR, CHUNK_LENGTH, diarize_audio,
+                             diarize_recordings)
 
 DATA_DIR = 'data'
 OUTPUT_DIR = 'output'
 MAX_SEGMENT_LENGTH = 30 * 1000  # 30 seconds in milliseconds
 
-# Read API key from .secrets/hf_api_key.txt
-with open(os.path.join('.secrets', 'hf_api_key.txt'), 'r') as file:
-    AUTH_TOKEN = file.read().strip()
-
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-# Initialize pyannote speaker diarization pipeline (requires HuggingFace token for first use)
-pipeline = Pipeline.from_pretrained("pyannote/speaker-diarization-3.1", use_auth_token=AUTH_TOKEN)  # Set your HF token if needed
+def diarize(audio_input, num_speakers=2, model=DIARIZATION_MODEL, cpu=True, chunk_length=CHUNK_LENGTH,
+            cache_dir=DIARIZATION_CACHE_DIR):
+    """
+    Run speaker diarization and collect the turns of each speaker (see diarization.diarize_audio:
+    results are cached per audio hash and long recordings are diarized in chunks).
 
-pipeline.to(torch.device("mps"))
+    Args:
+        audio_input: Path to an audio file, or a mono float32 array at TARGET_SAMPLE_RATE
+        num_speakers: Number of speakers in the recording
 
-def segment_audio_file(file_path, output_dir):
-    audio = AudioSegment.from_file(file_path)
-    basename = os.path.splitext(os.path.basename(file_path))[0]
-    # Diarization with two speakers
-    diarization = pipeline(file_path, num_speakers=2)
-    # Collect segments by speaker
-    speaker_segments = {}
-    for turn, _, speaker in diarization.itertracks(yield_label=True):
-        if speaker not in speaker_segments:
-            speaker_segments[speaker] = []
-        speaker_segments[speaker].append((turn.start, turn.end))
-    # For each speaker, segment their speech into max 30s chunks
+    Returns:
+        dict: Speaker label -> list of (start, end) tuples in seconds
+    """
+    uri = 'audio'
+    if isinstance(audio_input, str):
+        uri = os.path.splitext(os.path.basename(audio_input))[0]
+        audio_input = load_audio(audio_input)
+    return diarize_audio(audio_input, num_speakers, model, cpu, chunk_length, cache_dir=cache_dir, uri=uri)
+
+def chunk_speaker_turns(speaker_segments):
+    """
+    Cut each speaker turn into chunks of at most MAX_SEGMENT_LENGTH.
+
+    Returns:
+        list: (speaker, seg_idx, chunk_start_ms, chunk_end_ms) tuples
+    """
+    chunks = []
     for speaker, segments in speaker_segments.items():
         seg_idx = 0
         for start, end in segments:
@@ -36,15 +55,70 @@ def segment_audio_file(file_path, output_dir):
             end_ms = int(end * 1000)
             for chunk_start in range(start_ms, end_ms, MAX_SEGMENT_LENGTH):
                 chunk_end = min(chunk_start + MAX_SEGMENT_LENGTH, end_ms)
-                segment = audio[chunk_start:chunk_end]
-                segment.export(os.path.join(output_dir, f"{basename}_{speaker}_seg_{seg_idx}.wav"), format="wav")
+                chunks.append((speaker, seg_idx, chunk_start, chunk_end))
                 seg_idx += 1
+    return chunks
+
+def chunk_turns(speaker_segments, audio=None, sr=TARGET_SAMPLE_RATE, smart=False):
+    """
+    Chunk speaker turns with the fixed MAX_SEGMENT_LENGTH cuts of chunk_speaker_turns, or with smart_chunks
+    (merge short turns, split long turns on silence, see chunking.py) if smart is True. Smart chunks have
+    other boundaries and segment IDs, so write them to a separate folder from existing segments and
+    reference transcripts.
+    """
+    if smart:
+        return smart_chunks(speaker_segments, audio, sr, max_length=MAX_SEGMENT_LENGTH / 1000)
+    return chunk_speaker_turns(speaker_segments)
+
+def segment_offsets(audio, basename, num_speakers=2, smart=False):
+    """
+    Diarize decoded audio and cut it into chunks of at most MAX_SEGMENT_LENGTH.
+
+    Args:
+        audio: Mono float32 array at TARGET_SAMPLE_RATE
+        basename: Recording name, used as prefix of the segment IDs
+
+    Returns:
+        list: (segment_id, speaker, start_sample, end_sample) tuples
+    """
+    speaker_segments = diarize_audio(audio, num_speakers, uri=basename)
+    return [(f"{basename}_{speaker}_seg_{seg_idx}", speaker,
+             chunk_start * TARGET_SAMPLE_RATE // 1000, chunk_end * TARGET_SAMPLE_RATE // 1000)
+            for speaker, seg_idx, chunk_start, chunk_end in chunk_turns(speaker_segments, audio, smart=smart)]
+
+def segment_audio_to_store(file_path, store_dir=SEGMENT_STORE_DIR, num_speakers=2, dtype='float32'):
+    """
+    Segment a recording into a memory-mapped segment store (see segment_store.py) instead of WAV files.
+    The recording is decoded once and stored as one array, plus an index of segment offsets.
+    """
+    audio = load_audio(file_path)
+    basename = os.path.splitext(os.path.basename(file_path))[0]
+    write_recording(store_dir, basename, audio, segment_offsets(audio, basename, num_speakers), dtype=dtype)
+
+def audio_samples(audio):
+    """Mono float32 samples of a pydub AudioSegment, scaled to [-1, 1]."""
+    samples = np.array(audio.set_channels(1).get_array_of_samples(), dtype=np.float32)
+    return samples / float(1 << (8 * audio.sample_width - 1))
+
+def segment_audio_file(file_path, output_dir, smart=False, speaker_segments=None):
+    audio = AudioSegment.from_file(file_path)
+    basename = os.path.splitext(os.path.basename(file_path))[0]
+    # Diarization with two speakers, unless already done (see diarize_recordings)
+    if speaker_segments is None:
+        speaker_segments = diarize(file_path, num_speakers=2)
+    # Cut each speaker's turns into chunks of max 30s (smart: packed and split at quiet points)
+    samples = audio_samples(audio) if smart else None
+    for speaker, seg_idx, chunk_start, chunk_end in chunk_turns(speaker_segments, samples, audio.frame_rate, smart):
+        segment = audio[chunk_start:chunk_end]
+        segment.export(os.path.join(output_dir, f"{basename}_{speaker}_seg_{seg_idx}.wav"), format="wav")
 
 def main():
-    for filename in os.listdir(DATA_DIR):
-        if filename.lower().endswith(('.wav', '.mp3', '.flac', '.ogg', '.m4a')):
-            file_path = os.path.join(DATA_DIR, filename)
-            segment_audio_file(file_path, OUTPUT_DIR)
+    file_paths = [os.path.join(DATA_DIR, filename) for filename in sorted(os.listdir(DATA_DIR))
+                  if filename.lower().endswith(('.wav', '.mp3', '.flac', '.ogg', '.m4a'))]
+    # Diarize all recordings in parallel worker processes first (cached per audio hash)
+    diarizations = diarize_recordings(file_paths, num_speakers=2)
+    for file_path in file_paths:
+        segment_audio_file(file_path, OUTPUT_DIR, speaker_segments=diarizations[file_path])
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""
+Memory-mapped segment store.
+
+Instead of one WAV file per segment, a store keeps per source recording:
+- <recording>.npy: the decoded recording as one contiguous mono array (float32 or int16)
+- <recording>.index.tsv: one line per segment with segment_id, speaker, start and end sample
+
+Reading a segment is a slice of a memory-mapped array: no decoding, no per-segment
+file open, and only the pages that are actually used are read from disk. With the
+default float32 dtype, segments are zero-copy views.
+"""
+
+import os
+import csv
+from collections.abc import Mapping
+from typing import Iterator, List, NamedTuple, Tuple
+
+import numpy as np
+
+try:
+    from utils.audio_io import TARGET_SAMPLE_RATE
+except ImportError:  # Run as a script from within utils/
+    from audio_io import TARGET_SAMPLE_RATE
+
+SEGMENT_STORE_DIR = os.path.join('output', 'segment_store')
+INDEX_SUFFIX = '.index.tsv'
+INDEX_COLUMNS = ['segment_id', 'speaker', 'start', 'end']
+
+
+class SegmentEntry(NamedTuple):
+    """Location of one segment in a store (start and end are sample offsets)."""
+    recording_id: str
+    segment_id: str
+    speaker: str
+    start: int
+    end: int
+
+
+def write_recording(store_dir: str, recording_id: str, audio: np.ndarray,
+                    segments: List[Tuple[str, str, int, int]], dtype: str = 'float32') -> None:
+    """
+    Write a recording and its segment index to a store.
+
+    Args:
+        store_dir: Folder of the store
+        recording_id: Name of the recording (used for the file names)
+        audio: Decoded mono float32 audio at TARGET_SAMPLE_RATE
+        segments: (segment_id, speaker, start_sample, end_sample) tuples
+        dtype: 'float32' (zero-copy reads) or 'int16' (half the disk space)
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    if dtype == 'int16':
+        data = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    else:
+        data = np.ascontiguousarray(audio, dtype=np.float32)
+    np.save(os.path.join(store_dir, f"{recording_id}.npy"), data)
+
+    with open(os.path.join(store_dir, f"{recording_id}{INDEX_SUFFIX}"), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, delimiter='\t')
+        writer.writerow(INDEX_COLUMNS)
+        writer.writerows(segments)
+
+
+class SegmentStore(Mapping):
+    """
+    Read-only view of a segment store, usable as a mapping from segment ID to audio.
+
+    Arrays are memory-mapped on first access. Segments of float32 stores are returned as
+    zero-copy views; int16 stores are converted to float32 unless as_float is False.
+    """
+
+    def __init__(self, store_dir: str = SEGMENT_STORE_DIR, as_float: bool = True):
+        self.store_dir = store_dir
+        self.as_float = as_float
+        self.sample_rate = TARGET_SAMPLE_RATE
+        self._arrays = {}
+        self._entries = {}
+        for filename in sorted(os.listdir(store_dir)):
+            if filename.endswith(INDEX_SUFFIX):
+                recording_id = filename[:-len(INDEX_SUFFIX)]
+                with open(os.path.join(store_dir, filename), 'r', newline='', encoding='utf-8') as f:
+                    for row in csv.DictReader(f, delimiter='\t'):
+                        self._entries[row['segment_id']] = SegmentEntry(
+                            recording_id, row['segment_id'], row['speaker'], int(row['start']), int(row['end']))
+
+    def recording(self, recording_id: str) -> np.ndarray:
+        """The memory-mapped array of a whole recording."""
+        array = self._arrays.get(recording_id)
+        if array is None:
+            array = np.load(os.path.join(self.store_dir, f"{recording_id}.npy"), mmap_mode='r')
+            self._arrays[recording_id] = array
+        return array
+
+    def entry(self, segment_id: str) -> SegmentEntry:
+        """Index entry (recording, speaker, sample offsets) of a segment."""
+        return self._entries[segment_id]
+
+    def __getitem__(self, segment_id: str) -> np.ndarray:
+        entry = self._entries[segment_id]
+        segment = self.recording(entry.recording_id)[entry.start:entry.end]
+        if self.as_float and segment.dtype == np.int16:
+            return segment.astype(np.float32) / 32768.0
+        return segment
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def entries(self) -> List[SegmentEntry]:
+        """All index entries, ordered by recording and segment."""
+        return list(self._entries.values())
+
+    def duration(self, segment_id: str) -> float:
+        """Duration of a segment in seconds, from the index only."""
+        entry = self._entries[segment_id]
+        return (entry.end - entry.start) / self.sample_rate
+
+    def total_duration(self) -> float:
+        """Total duration of all segments in seconds, from the index only."""
+        return sum(entry.end - entry.start for entry in self._entries.values()) / self.sample_rate
@@ -0,0 +1,213 @@
+"""
+In-memory pipeline from diarization to transcription.
+
+Each source recording is decoded once into a mono float32 array at 16 kHz. The
+diarization runs on that array, segments are slices (views) of it, and the ASR
+models receive the slices directly as numpy input. This skips the segment WAV
+export (segment_audio.py), the mono check (check_mono.py) and the re-decoding of
+every segment (transcribe.py). Recordings go through decode -> segment -> transcribe
+one at a time, so only one recording is held in memory. Segment WAVs can still be
+written as a side effect.
+
+Transcripts use the same names as the file-based pipeline:
+output/transcripts/<model>/<recording>_<speaker>_seg_<idx>.txt
+"""
+
+import os
+import json
+from datetime import datetime
+from typing import Mapping
+
+import numpy as np
+
+try:
+    from utils.audio_io import TARGET_SAMPLE_RATE, load_audio, write_wav
+    from utils.segment_audio import segment_offsets
+    from utils.segment_store import SEGMENT_STORE_DIR, SegmentStore
+    from utils.deadline import Deadline
+    from utils.profiling import get_profiler
+    from utils.transcribe import (OUTPUT_TRANSCRIPT_DIR, AUDIO_EXTENSIONS, get_transcriber, transcribe_within,
+                                  write_transcript, record_timeout, record_late, write_timeout_report, profile_batch)
+except ImportError:  # Run as a script from within utils/
+    from audio_io import TARGET_SAMPLE_RATE, load_audio, write_wav
+    from segment_audio import segment_offsets
+    from segment_store import SEGMENT_STORE_DIR, SegmentStore
+    from deadline import Deadline
+    from profiling import get_profiler
+    from transcribe import (OUTPUT_TRANSCRIPT_DIR, AUDIO_EXTENSIONS, get_transcriber, transcribe_within,
+                            write_transcript, record_timeout, record_late, write_timeout_report, profile_batch)
+
+CONVERTED_DATA_DIR = os.path.join('data', 'converted')
+STREAM_MANIFEST = '.stream_manifest.json'
+
+
+def stream_segments(file_path, num_speakers=2, export_dir=None):
+    """
+    Decode a recording once, diarize it and yield its segments as views on the decoded audio.
+
+    Args:
+        file_path: Path to the source recording
+        num_speakers: Number of speakers for the diarization
+        export_dir: If given, also write each segment as a WAV file to this folder
+
+    Yields:
+        (segment_id, audio) tuples, where audio is a mono float32 array at TARGET_SAMPLE_RATE
+    """
+    with get_profiler().stage('decode', file=os.path.basename(file_path)) as event:
+        audio = load_audio(file_path)
+        event['audio_s'] = len(audio) / TARGET_SAMPLE_RATE
+    basename = os.path.splitext(os.path.basename(file_path))[0]
+
+    for segment_id, _, start, end in segment_offsets(audio, basename, num_speakers=num_speakers):
+        segment = audio[start:end]
+        if export_dir is not None:
+            write_wav(os.path.join(export_dir, f"{segment_id}.wav"), segment)
+        yield segment_id, segment
+
+
+def _read_manifest(output_transcript_dir):
+    """Recordings that were fully transcribed by transcribe_recordings, per model output folder."""
+    path = os.path.join(output_transcript_dir, STREAM_MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return {model: set(recordings) for model, recordings in json.load(f).items()}
+
+
+def _write_manifest(output_transcript_dir, manifest):
+    path = os.path.join(output_transcript_dir, STREAM_MANIFEST)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({model: sorted(recordings) for model, recordings in manifest.items()}, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def transcribe_recordings(model_list, cpu=True, recordings_dir=None, output_transcript_dir=None,
+                          batch_size=1, num_speakers=2, export_dir=None):
+    """
+    Diarize and transcribe full recordings without intermediate files.
+
+    Recordings are processed one at a time: decoded, diarized and cut into segments (views on
+    the decoded audio), transcribed by each model, then released, so memory is bounded by one
+    recording. A manifest in output_transcript_dir (.stream_manifest.json) records the recordings
+    each model has finished; recordings that all models have finished are skipped before decoding.
+
+    Args:
+        model_list: List of HuggingFace model names
+        cpu: Run the models on CPU
+        recordings_dir: Folder with source recordings (default: data/converted)
+        output_transcript_dir: Folder for transcripts (default: output/transcripts)
+        batch_size: Number of segments per forward pass
+        num_speakers: Number of speakers for the diarization
+        export_dir: If given, also write the segments as WAV files to this folder
+    """
+    if recordings_dir is None:
+        recordings_dir = CONVERTED_DATA_DIR
+    if output_transcript_dir is None:
+        output_transcript_dir = OUTPUT_TRANSCRIPT_DIR
+    if export_dir is not None:
+        os.makedirs(export_dir, exist_ok=True)
+    os.makedirs(output_transcript_dir, exist_ok=True)
+
+    timeout_info = {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'timeouts': {model_name: [] for model_name in model_list}
+    }
+    manifest = _read_manifest(output_transcript_dir)
+
+    for filename in sorted(os.listdir(recordings_dir)):
+        if not filename.lower().endswith(AUDIO_EXTENSIONS):
+            continue
+        todo = [model_name for model_name in model_list
+                if filename not in manifest.get(model_name.split('/')[-1], ())]
+        if not todo:
+            print(f"Skipping {filename} - already transcribed")
+            continue
+
+        segments = dict(stream_segments(os.path.join(recordings_dir, filename), num_speakers=num_speakers,
+                                        export_dir=export_dir))
+        print(f"Segmented {filename}")
+        for model_name in todo:
+            output_name = model_name.split('/')[-1]
+            _transcribe_model(model_name, segments, os.path.join(output_transcript_dir, output_name),
+                              cpu, batch_size, timeout_info)
+            manifest.setdefault(output_name, set()).add(filename)
+        _write_manifest(output_transcript_dir, manifest)
+
+    write_timeout_report(timeout_info)
+
+
+def transcribe_store(model_list, store_dir=SEGMENT_STORE_DIR, cpu=True, output_transcript_dir=None, batch_size=1):
+    """
+    Transcribe all segments of a memory-mapped segment store (see segment_store.py).
+    Segments are read as slices of the stored recordings, without any decoding.
+    """
+    transcribe_arrays(model_list, SegmentStore(store_dir), cpu=cpu, output_transcript_dir=output_transcript_dir,
+                      batch_size=batch_size)
+
+
+def transcribe_arrays(model_list, segments: Mapping[str, np.ndarray], cpu=True, output_transcript_dir=None,
+                      batch_size=1):
+    """
+    Transcribe in-memory segments with each model in model_list.
+
+    Args:
+        model_list: List of HuggingFace model names
+        segments: Mapping of segment ID to mono float32 audio at TARGET_SAMPLE_RATE
+        cpu: Run the models on CPU
+        output_transcript_dir: Folder for transcripts (default: output/transcripts)
+        batch_size: Number of segments per forward pass
+    """
+    if output_transcript_dir is None:
+        output_transcript_dir = OUTPUT_TRANSCRIPT_DIR
+
+    timeout_info = {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'timeouts': {model_name: [] for model_name in model_list}
+    }
+    for model_name in model_list:
+        _transcribe_model(model_name, segments, os.path.join(output_transcript_dir, model_name.split('/')[-1]),
+                          cpu, batch_size, timeout_info)
+    write_timeout_report(timeout_info)
+
+
+def _transcribe_model(model_name, segments: Mapping[str, np.ndarray], model_output_dir, cpu, batch_size, timeout_info):
+    """Transcribe the segments without a transcript in model_output_dir with one model."""
+    os.makedirs(model_output_dir, exist_ok=True)
+    pending = [segment_id for segment_id in segments
+               if not os.path.exists(os.path.join(model_output_dir, f"{segment_id}.txt"))]
+    if not pending:
+        return
+    # Sort by length so that segments of similar duration end up in the same batch
+    pending.sort(key=lambda segment_id: len(segments[segment_id]))
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+    backend = get_transcriber(model_name, cpu=cpu)
+    while batches:
+        batch = batches.pop(0)
+        duration = sum(len(segments[segment_id]) for segment_id in batch) / TARGET_SAMPLE_RATE
+        deadline = Deadline.for_audio(duration)
+        transcriptions, status = transcribe_within(backend, [segments[segment_id] for segment_id in batch], deadline)
+
+        if status == 'interrupted':
+            if len(batch) > 1:
+                print(f"Timeout while transcribing batch of {len(batch)} segments - retrying one by one")
+                batches[:0] = [[segment_id] for segment_id in batch]
+                continue
+            print(f"Timeout while transcribing {batch[0]} - moving to next segment")
+            record_timeout(timeout_info, model_name, f"{batch[0]}.wav", duration, deadline.elapsed())
+            write_transcript(model_output_dir, f"{batch[0]}.wav", 'None')
+            continue
+
+        if status == 'late':
+            record_late(timeout_info, model_name, [f"{segment_id}.wav" for segment_id in batch], duration,
+                        deadline.elapsed())
+        profile_batch(backend, [segments[segment_id] for segment_id in batch], transcriptions,
+                      deadline.elapsed(), segment_ids=batch)
+        for segment_id, transcription in zip(batch, transcriptions):
+            write_transcript(model_output_dir, f"{segment_id}.wav", transcription)
+            print(f"Transcribed {segment_id} using {model_name}")
+
+
+if __name__ == "__main__":
+    transcribe_recordings(["openai/whisper-small"])
@@ -0,0 +1,346 @@
+"""
+Real-time streaming transcription with incremental partial results.
+
+Audio is consumed in small chunks (from a file read at real-time pace, or raw 16 kHz
+16-bit mono PCM from a pipe) and split into utterances by an energy endpointer:
+
+- frames (20 ms) louder than an adaptive threshold (a multiple of the running noise
+  floor, at least MIN_SPEECH_RMS) are speech; MIN_SPEECH of speech starts an utterance
+- END_SILENCE of silence ends it, and utterances are cut at MAX_UTTERANCE, so the cost
+  of every model call (and with it the latency) stays bounded
+- while an utterance is open, the audio so far is re-transcribed every PARTIAL_INTERVAL
+  seconds (partial results); partials are skipped when processing lags more than MAX_LAG
+  behind the audio, so a slow model falls back to final results only
+- when the utterance ends it is transcribed once more (final result)
+
+Any model of transcribe_segments can be used (Whisper or wav2vec2, loaded once through
+the model registry). Every result carries its latency: for finals the time from the
+arrival of the utterance's last speech to the final text (endpointing wait plus model
+time), for partials the time from the arrival of the newest audio. Percentiles are
+reported at the end of the stream.
+
+Usage:
+    python utils/streaming.py data/converted/recording.wav --model openai/whisper-small
+    ffmpeg -i recording.m4a -f s16le -ac 1 -ar 16000 - | python utils/streaming.py - --model openai/whisper-small
+"""
+
+import sys
+import time
+import bisect
+import argparse
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from utils.audio_io import TARGET_SAMPLE_RATE, load_audio
+    from utils.chunking import frame_rms
+    from utils.profiling import get_profiler, latency_percentiles
+    from utils.transcribe import get_transcriber, transcribe_batch
+except ImportError:  # Run as a script from within utils/
+    from audio_io import TARGET_SAMPLE_RATE, load_audio
+    from chunking import frame_rms
+    from profiling import get_profiler, latency_percentiles
+    from transcribe import get_transcriber, transcribe_batch
+
+CHUNK_LENGTH = 0.1  # seconds of audio per chunk read from the source
+ENDPOINT_FRAME = 0.02  # seconds
+MIN_SPEECH = 0.1  # seconds of speech that start an utterance
+END_SILENCE = 0.6  # seconds of silence that end an utterance
+MAX_UTTERANCE = 15.0  # seconds; longer utterances are cut
+PRE_ROLL = 0.2  # seconds of audio kept before the detected speech start
+MIN_SPEECH_RMS = 0.01
+SPEECH_RATIO = 3.0  # speech is SPEECH_RATIO times louder than the noise floor
+NOISE_FLOOR_DECAY = 0.95
+PARTIAL_INTERVAL = 1.0  # seconds of new audio between partial results
+MAX_LAG = 1.0  # seconds behind the audio after which partial results are skipped
+
+
+def file_source(path: str, chunk_length: float = CHUNK_LENGTH, realtime: bool = True,
+                sr: int = TARGET_SAMPLE_RATE) -> Iterator[Tuple[np.ndarray, float]]:
+    """
+    Yield (chunk, arrival time) pairs of an audio file. With realtime=True the chunks are
+    released at the pace they would arrive from a microphone, and the arrival time is the
+    time the chunk would have arrived (so a consumer that falls behind sees its lag).
+    """
+    audio = load_audio(path, sr)
+    step = max(1, int(chunk_length * sr))
+    start = time.perf_counter()
+    for offset in range(0, len(audio), step):
+        chunk = audio[offset:offset + step]
+        if realtime:
+            arrival = start + (offset + len(chunk)) / sr
+            time.sleep(max(0.0, arrival - time.perf_counter()))
+        else:
+            arrival = time.perf_counter()
+        yield chunk, arrival
+
+
+def pipe_source(stream: BinaryIO, chunk_length: float = CHUNK_LENGTH,
+                sr: int = TARGET_SAMPLE_RATE) -> Iterator[Tuple[np.ndarray, float]]:
+    """Yield (chunk, arrival time) pairs of raw 16-bit mono PCM at sample rate sr read from stream."""
+    n_bytes = max(1, int(chunk_length * sr)) * 2
+    remainder = b''
+    while True:
+        data = stream.read(n_bytes)
+        if not data:
+            break
+        data = remainder + data
+        usable = len(data) - len(data) % 2
+        remainder = data[usable:]
+        yield np.frombuffer(data[:usable], dtype='<i2').astype(np.float32) / 32768.0, time.perf_counter()
+
+
+class EnergyEndpointer:
+    """Detects utterance starts and ends in a stream of audio from the frame energy."""
+
+    def __init__(self, sr: int = TARGET_SAMPLE_RATE, frame_length: float = ENDPOINT_FRAME,
+                 min_speech: float = MIN_SPEECH, end_silence: float = END_SILENCE,
+                 max_utterance: float = MAX_UTTERANCE, min_rms: float = MIN_SPEECH_RMS,
+                 speech_ratio: float = SPEECH_RATIO):
+        self.sr = sr
+        self.frame_length = frame_length
+        self.frame = max(1, int(round(frame_length * sr)))
+        self.min_speech_frames = max(1, int(round(min_speech / frame_length)))
+        self.end_silence_frames = max(1, int(round(end_silence / frame_length)))
+        self.max_utterance_frames = max(1, int(round(max_utterance / frame_length)))
+        self.min_rms = min_rms
+        self.speech_ratio = speech_ratio
+        self.noise_floor: Optional[float] = None
+        self.in_utterance = False
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._frame_index = 0
+        self._speech_run = 0
+        self._silence_run = 0
+        self._start_frame = 0
+        self._last_speech_frame = 0
+
+    def process(self, chunk: np.ndarray) -> List[Tuple[str, int]]:
+        """
+        Feed the next samples of the stream.
+
+        Returns:
+            list: ('start' | 'end', sample index) events, in stream order. A start is the first
+            frame of the speech run that triggered it; an end is the end of the last speech frame
+            (or the cut point of an utterance that reached max_utterance).
+        """
+        audio = np.concatenate([self._pending, np.asarray(chunk, dtype=np.float32)])
+        n_frames = len(audio) // self.frame
+        self._pending = audio[n_frames * self.frame:]
+        if n_frames == 0:
+            return []
+        rms = frame_rms(audio[:n_frames * self.frame], self.sr, self.frame_length, self.frame_length)
+
+        events = []
+        for value in rms:
+            index = self._frame_index
+            self._frame_index += 1
+            if self.noise_floor is None:
+                self.noise_floor = float(value)
+            is_speech = value > max(self.min_rms, self.speech_ratio * self.noise_floor)
+            if not is_speech:
+                self.noise_floor = NOISE_FLOOR_DECAY * self.noise_floor + (1 - NOISE_FLOOR_DECAY) * float(value)
+
+            if not self.in_utterance:
+                self._speech_run = self._speech_run + 1 if is_speech else 0
+                if self._speech_run >= self.min_speech_frames:
+                    self.in_utterance = True
+                    self._start_frame = index - self._speech_run + 1
+                    self._last_speech_frame = index
+                    self._silence_run = 0
+                    events.append(('start', self._start_frame * self.frame))
+                continue
+
+            if is_speech:
+                self._last_speech_frame = index
+                self._silence_run = 0
+            else:
+                self._silence_run += 1
+            if self._silence_run >= self.end_silence_frames:
+                self.in_utterance = False
+                self._speech_run = 0
+                events.append(('end', (self._last_speech_frame + 1) * self.frame))
+            elif index + 1 - self._start_frame >= self.max_utterance_frames:
+                # Cut a long utterance and continue with a new one right away
+                events.append(('end', (index + 1) * self.frame))
+                events.append(('start', (index + 1) * self.frame))
+                self._start_frame = index + 1
+        return events
+
+    def flush(self) -> List[Tuple[str, int]]:
+        """End of stream: close an open utterance."""
+        if not self.in_utterance:
+            return []
+        self.in_utterance = False
+        return [('end', (self._last_speech_frame + 1) * self.frame)]
+
+
+class StreamingTranscriber:
+    """
+    Turns a stream of audio chunks into partial and final transcripts per utterance.
+
+    Args:
+        backend: ASR backend (see transcribe.get_transcriber)
+        endpointer: Utterance detection (default: EnergyEndpointer())
+        partial_interval: Seconds of new utterance audio between partial results (None: finals only)
+        max_lag: Partial results are skipped while processing lags more than max_lag seconds
+        pre_roll: Seconds of audio before a detected start that are included in the utterance
+    """
+
+    def __init__(self, backend, endpointer: Optional[EnergyEndpointer] = None,
+                 partial_interval: Optional[float] = PARTIAL_INTERVAL, max_lag: float = MAX_LAG,
+                 pre_roll: float = PRE_ROLL, sr: int = TARGET_SAMPLE_RATE):
+        self.backend = backend
+        self.endpointer = endpointer or EnergyEndpointer(sr)
+        self.partial_interval = partial_interval
+        self.max_lag = max_lag
+        self.pre_roll = int(pre_roll * sr)
+        self.sr = sr
+        self.results: List[dict] = []
+        self.skipped_partials = 0
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._buffer_start = 0  # Stream sample index of _buffer[0]
+        self._utterance_start: Optional[int] = None
+        self._utterance = 0
+        self._last_partial = 0
+        self._chunk_ends: List[int] = []  # Stream sample index after each chunk...
+        self._arrivals: List[float] = []  # ...and its arrival time
+
+    @property
+    def _stream_end(self) -> int:
+        return self._buffer_start + len(self._buffer)
+
+    def _arrival_of(self, sample: int) -> float:
+        """Arrival time of the chunk that contained sample."""
+        i = min(bisect.bisect_left(self._chunk_ends, sample), len(self._arrivals) - 1)
+        return self._arrivals[i]
+
+    def _transcribe(self, kind: str, start: int, end: int, reference_arrival: float) -> dict:
+        audio = self._buffer[start - self._buffer_start:end - self._buffer_start]
+        model_start = time.perf_counter()
+        text = transcribe_batch(self.backend, [audio])[0]
+        now = time.perf_counter()
+        result = {'type': kind, 'utterance': self._utterance, 'start_s': round(start / self.sr, 3),
+                  'end_s': round(end / self.sr, 3), 'text': text, 'model_s': round(now - model_start, 4),
+                  'latency_s': round(now - reference_arrival, 4)}
+        self.results.append(result)
+        if kind == 'final':
+            get_profiler().record('stream', model=self.backend.model_name, segment=self._utterance,
+                                  audio_s=(end - start) / self.sr, model_s=now - model_start,
+                                  latency_s=now - reference_arrival)
+        return result
+
+    def _trim(self, keep_from: int) -> None:
+        """Drop buffered audio before stream sample keep_from, and the arrival times of those chunks."""
+        keep_from = max(self._buffer_start, min(keep_from, self._stream_end))
+        self._buffer = self._buffer[keep_from - self._buffer_start:]
+        self._buffer_start = keep_from
+        drop = max(0, bisect.bisect_left(self._chunk_ends, keep_from) - 1)
+        del self._chunk_ends[:drop], self._arrivals[:drop]
+
+    def _handle(self, events: List[Tuple[str, int]]) -> List[dict]:
+        results = []
+        for kind, sample in events:
+            if kind == 'start':
+                self._utterance_start = max(self._buffer_start, sample - self.pre_roll)
+                self._last_partial = sample
+            elif self._utterance_start is not None:
+                # Latency of a final: from the arrival of the utterance's last speech
+                results.append(self._transcribe('final', self._utterance_start, sample, self._arrival_of(sample)))
+                self._utterance += 1
+                self._utterance_start = None
+                self._trim(sample)
+        return results
+
+    def feed(self, chunk: np.ndarray, arrival: Optional[float] = None) -> List[dict]:
+        """Process the next chunk of audio; returns the partial and final results it produced."""
+        arrival = time.perf_counter() if arrival is None else arrival
+        self._buffer = np.concatenate([self._buffer, np.asarray(chunk, dtype=np.float32)])
+        self._chunk_ends.append(self._stream_end)
+        self._arrivals.append(arrival)
+
+        results = self._handle(self.endpointer.process(chunk))
+        if self._utterance_start is None:
+            self._trim(self._stream_end - self.pre_roll)  # Keep only the pre-roll between utterances
+        elif (self.partial_interval is not None
+              and self._stream_end - self._last_partial >= self.partial_interval * self.sr):
+            self._last_partial = self._stream_end
+            if time.perf_counter() - arrival > self.max_lag:
+                self.skipped_partials += 1
+            else:
+                results.append(self._transcribe('partial', self._utterance_start, self._stream_end, arrival))
+        return results
+
+    def flush(self) -> List[dict]:
+        """End of stream: finalize an open utterance."""
+        return self._handle(self.endpointer.flush())
+
+    def latency_summary(self) -> dict:
+        """Latency percentiles of the final and partial results."""
+        finals = [r for r in self.results if r['type'] == 'final']
+        partials = [r for r in self.results if r['type'] == 'partial']
+        audio_s = sum(r['end_s'] - r['start_s'] for r in finals)
+        model_s = sum(r['model_s'] for r in self.results)
+        return {'utterances': len(finals), 'partials': len(partials), 'skipped_partials': self.skipped_partials,
+                'final_latency_s': latency_percentiles([r['latency_s'] for r in finals]),
+                'partial_latency_s': latency_percentiles([r['latency_s'] for r in partials]),
+                'model_s': latency_percentiles([r['model_s'] for r in self.results]),
+                'rtf': round(model_s / audio_s, 4) if audio_s else None}
+
+
+def stream_transcribe(source: Iterable[Tuple[np.ndarray, float]], model_name: str, cpu: bool = True,
+                      on_result: Optional[Callable[[dict], None]] = None, **kwargs) -> StreamingTranscriber:
+    """
+    Transcribe a stream of (chunk, arrival time) pairs (see file_source and pipe_source).
+
+    Args:
+        source: Audio chunks (mono float32 at TARGET_SAMPLE_RATE) with their arrival times
+        model_name: HuggingFace model name
+        cpu: Whether to run on CPU
+        on_result: Called with every partial and final result as soon as it is available
+        **kwargs: Options of StreamingTranscriber
+
+    Returns:
+        The StreamingTranscriber, with all results and the latency summary
+    """
+    streamer = StreamingTranscriber(get_transcriber(model_name, cpu=cpu), **kwargs)
+    for chunk, arrival in source:
+        for result in streamer.feed(chunk, arrival):
+            if on_result is not None:
+                on_result(result)
+    for result in streamer.flush():
+        if on_result is not None:
+            on_result(result)
+    return streamer
+
+
+def print_result(result: dict) -> None:
+    """Show partial results on one updating line and final results on their own lines."""
+    line = f"[{result['start_s']:7.2f}-{result['end_s']:7.2f}] {result['text']}"
+    if result['type'] == 'partial':
+        print(f"\r... {line}", end='', flush=True)
+    else:
+        print(f"\r{line}  ({result['latency_s']:.2f} s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Real-time streaming transcription")
+    parser.add_argument('input', help="Audio file, or '-' for raw 16 kHz 16-bit mono PCM on stdin")
+    parser.add_argument('--model', default='openai/whisper-small')
+    parser.add_argument('--gpu', action='store_true', help='Run the model on the GPU')
+    parser.add_argument('--no-realtime', action='store_true', help='Read the file as fast as possible')
+    parser.add_argument('--partial-interval', type=float, default=PARTIAL_INTERVAL,
+                        help='Seconds between partial results (0 for final results only)')
+    args = parser.parse_args()
+
+    if args.input == '-':
+        source = pipe_source(sys.stdin.buffer)
+    else:
+        source = file_source(args.input, realtime=not args.no_realtime)
+    streamer = stream_transcribe(source, args.model, cpu=not args.gpu, on_result=print_result,
+                                 partial_interval=args.partial_interval or None)
+    print(streamer.latency_summary())
+
+
+if __name__ == "__main__":
+    main()
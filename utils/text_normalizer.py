@@ -0,0 +1,95 @@
+"""
+Text normalization shared by the transcript cleaner and the gold transcript preprocessing.
+
+Patterns are compiled and translation tables are built once at import. Punctuation
+is removed with str.translate instead of a regex, whitespace is collapsed with
+split/join, and the filler regex runs once per line for all variants that need it.
+
+Two normalizations are provided:
+- clean_hypothesis: ASR outputs (postprocess_transcripts.py). Removes [UNK], lowercases,
+  removes punctuation and drops whole words that are fillers.
+- normalize_gold_line: reference transcripts (preprocess_gold_transcripts.py). Produces the
+  orthographic_clean, normalized and normalized_clean variants of a line in a single pass.
+"""
+
+import re
+import string
+from typing import Iterable, List, Tuple
+
+# Fillers, hesitations and unknown tokens in ASR outputs (matched as whole words after cleaning)
+HYPOTHESIS_FILLERS = frozenset({'uh', 'um', 'hè', 'huh', 'hm', 'hmm', 'eh', 'euh', 'uhm', 'oh', 'ehm'})
+HYPOTHESIS_PUNCTUATION = '.,!?;:()[]{}"\'-'
+UNKNOWN_TOKEN = '[UNK]'
+
+# Fillers in the reference transcripts (matched case-insensitively at word boundaries)
+GOLD_FILLERS = ('uh', 'eh', 'ehm', 'oh')
+GOLD_PUNCTUATION = string.punctuation
+
+_HYPOTHESIS_TABLE = str.maketrans('', '', HYPOTHESIS_PUNCTUATION)
+_GOLD_TABLE = str.maketrans('', '', GOLD_PUNCTUATION)
+_GOLD_FILLERS_PATTERN = re.compile(r'\b(?:' + '|'.join(GOLD_FILLERS) + r')\b', re.IGNORECASE)
+_SPACE_BEFORE_PERIOD_PATTERN = re.compile(r'\s+\.$')
+
+
+def clean_hypothesis(text: str, fillers: frozenset = HYPOTHESIS_FILLERS) -> str:
+    """
+    Clean an ASR output by removing [UNK] tokens, capitalisation, punctuation,
+    leading/trailing and repeated whitespace, and fillers.
+
+    Args:
+        text: Input text string
+        fillers: Words to drop (after lowercasing and punctuation removal)
+
+    Returns:
+        Cleaned text string
+    """
+    words = text.replace(UNKNOWN_TOKEN, '').lower().translate(_HYPOTHESIS_TABLE).split()
+    return ' '.join([word for word in words if word not in fillers])
+
+
+def normalize_gold_line(line: str) -> Tuple[str, str, str]:
+    """
+    Produce the three normalized variants of one line of a reference transcript.
+
+    - orthographic_clean: fillers removed, no whitespace before a final period
+    - normalized: fillers kept, punctuation removed, lowercased
+    - normalized_clean: fillers and punctuation removed, lowercased
+
+    All variants have leading whitespace stripped, single spaces between words, and keep
+    the line's trailing newline (if any).
+
+    Args:
+        line: One line of an orthographic reference transcript
+
+    Returns:
+        (orthographic_clean, normalized, normalized_clean) tuple
+    """
+    stripped = line.lstrip()
+    newline = '\n' if stripped.endswith('\n') else ''
+
+    without_fillers = _GOLD_FILLERS_PATTERN.sub('', stripped)
+    orthographic = without_fillers
+    if orthographic.endswith('.') or orthographic.endswith('.\n'):
+        orthographic = _SPACE_BEFORE_PERIOD_PATTERN.sub('.', orthographic)
+
+    return (
+        ' '.join(orthographic.split()) + newline,
+        ' '.join(stripped.translate(_GOLD_TABLE).lower().split()) + newline,
+        ' '.join(without_fillers.translate(_GOLD_TABLE).lower().split()) + newline,
+    )
+
+
+def normalize_gold_lines(lines: Iterable[str]) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Normalize all lines of a reference transcript.
+
+    Returns:
+        (orthographic_clean, normalized, normalized_clean) lists of lines
+    """
+    ortho_clean, normalized, normalized_clean = [], [], []
+    for line in lines:
+        o, n, nc = normalize_gold_line(line)
+        ortho_clean.append(o)
+        normalized.append(n)
+        normalized_clean.append(nc)
+    return ortho_clean, normalized, normalized_clean
@@ -1,10 +1,28 @@
 import os
-import torch
-import gc
-import signal
+import time
 import json
+import librosa
+import soundfile as sf
 from datetime import datetime
-from transformers import pipeline, VoxtralForConditionalGeneration, AutoProcessor
+
+try:
+    from utils.deadline import Deadline, segment_budget
+    from utils.audio_io import TARGET_SAMPLE_RATE, load_audio
+    from utils.transcript_cache import audio_hash, cache_key
+    from utils.model_registry import get_registry
+    from utils.profiling import get_profiler
+    from utils.quantization import check_precision
+    from utils.asr_backends import LONGFORM_WINDOW, LONGFORM_OVERLAP, backend_for
+    from utils.vad import dropped_segments
+except ImportError:  # Run as a script from within utils/
+    from deadline import Deadline, segment_budget
+    from audio_io import TARGET_SAMPLE_RATE, load_audio
+    from transcript_cache import audio_hash, cache_key
+    from model_registry import get_registry
+    from profiling import get_profiler
+    from quantization import check_precision
+    from asr_backends import LONGFORM_WINDOW, LONGFORM_OVERLAP, backend_for
+    from vad import dropped_segments
 
 # Ugly, but solves the issue of ffmpeg not being found for now
 # Add common ffmpeg installation paths to PATH
@@ -20,19 +38,164 @@ for path in ffmpeg_paths:
         os.environ['PATH'] = path + ':' + os.environ['PATH']
 
 SEGMENTS_DIR = os.path.join('output', 'segments')
-TRANSCRIPT_TIMEOUT = 60 # seconds
+CONVERTED_DATA_DIR = os.path.join('data', 'converted')
 OUTPUT_TRANSCRIPT_DIR = os.path.join('output', 'transcripts')
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac', '.ogg', '.m4a')
 
 os.makedirs(OUTPUT_TRANSCRIPT_DIR, exist_ok=True)
 os.environ["PATH"] += os.pathsep + os.path.join("opt", "homebrew", "bin")
 
-class TimeoutError(Exception):
-    pass
+def get_audio_duration(audio_path):
+    """
+    Return the duration of an audio file in seconds, reading only the header where possible.
+    """
+    try:
+        return sf.info(audio_path).duration
+    except Exception:
+        # Compressed formats like m4a are not supported by soundfile
+        return librosa.get_duration(path=audio_path)
+
+def bucket_by_duration(audio_paths, batch_size):
+    """
+    Group audio files into batches of similar duration, so that padding within a batch is minimal.
+
+    Args:
+        audio_paths (list): Paths to the audio files
+        batch_size (int): Maximum number of files per batch
+
+    Returns:
+        list: List of batches (lists of audio paths), shortest files first
+    """
+    durations = {path: get_audio_duration(path) for path in audio_paths}
+    ordered = sorted(audio_paths, key=lambda path: durations[path])
+    return [ordered[i:i + batch_size] for i in range(0, len(ordered), batch_size)]
+
+def pending_segments(segments_dir, model_output_dir, include_existing=False):
+    """
+    Return paths of audio segments in segments_dir that have no transcript in model_output_dir yet
+    (or all audio segments if include_existing is True).
+    """
+    pending = []
+    for filename in os.listdir(segments_dir):
+        if filename.lower().endswith(AUDIO_EXTENSIONS):
+            # Check if transcription already exists
+            output_path = os.path.join(model_output_dir, f"{os.path.splitext(filename)[0]}.txt")
+            if os.path.exists(output_path) and not include_existing:
+                continue
+            pending.append(os.path.join(segments_dir, filename))
+    return pending
+
+def write_dropped_transcripts(segments_dir, model_output_dir):
+    """
+    Write an empty transcript for every segment the VAD pre-filter dropped from segments_dir
+    (see utils/vad.py), so each reference keeps a hypothesis.
+    """
+    dropped = dropped_segments(segments_dir)
+    for segment_id in dropped:
+        write_transcript(model_output_dir, f"{segment_id}.wav", '')
+    if dropped:
+        print(f"{len(dropped)} segments without speech (VAD) get an empty transcript")
+
+def model_output_name(model_name, precision='fp32'):
+    """Name of a model's transcript folder; reduced-precision runs get a -<precision> suffix."""
+    name = model_name.split('/')[-1]
+    return name if precision == 'fp32' else f"{name}-{precision}"
+
+def load_transcriber(model_name, cpu=True, precision='fp32'):
+    """
+    Load an ASR model and return its backend (see utils/asr_backends.py).
+    Pipeline models can be loaded with int8 or bf16 weights (see utils/quantization.py).
+    """
+    return backend_for(model_name, cpu=cpu, precision=precision)
+
+def get_transcriber(model_name, cpu=True, precision='fp32'):
+    """
+    Return the backend of a model, loading it on first use and keeping it warm
+    in the model registry for later calls.
+    """
+    key = ('asr', model_name, cpu) if precision == 'fp32' else ('asr', model_name, cpu, precision)
+    return get_registry().get(key, lambda: load_transcriber(model_name, cpu=cpu, precision=precision))
+
+def transcribe_batch(backend, audio_inputs, max_time=None):
+    """
+    Transcribe a batch of audio in a single forward pass.
+
+    Args:
+        backend: ASR backend (see get_transcriber)
+        audio_inputs: Audio file paths, or mono float32 arrays sampled at TARGET_SAMPLE_RATE
+        max_time: Optional time budget in seconds; generation stops (cooperatively) once it is exceeded
 
-def timeout_handler(signum, frame):
-    raise TimeoutError("Transcription took too long")
+    Returns:
+        list: Transcriptions, in the same order as audio_inputs
+    """
+    return backend.transcribe(audio_inputs, max_time=max_time)
 
-def transcribe_segments(model_list, cpu=True, segments_dir=None, output_transcript_dir=None):
+def transcribe_within(backend, audio_inputs, deadline):
+    """
+    Transcribe a batch within a deadline (see utils/deadline.py).
+
+    Returns:
+        tuple: (transcriptions, status); status is 'ok', 'late' if the batch finished after its
+        deadline with complete output (e.g. a CTC forward pass, which cannot be interrupted), or
+        'interrupted' if generation was stopped at the deadline, so the output is cut short
+    """
+    transcriptions = transcribe_batch(backend, audio_inputs, max_time=deadline.remaining())
+    if getattr(backend, 'interrupted', False):
+        return transcriptions, 'interrupted'
+    return transcriptions, 'late' if deadline.expired() else 'ok'
+
+def decode_batch(paths):
+    """Decode a batch of audio files; returns the arrays and the decode time of each file in seconds."""
+    arrays, decode_s = [], []
+    for path in paths:
+        start = time.perf_counter()
+        arrays.append(load_audio(path))
+        decode_s.append(time.perf_counter() - start)
+    return arrays, decode_s
+
+def profile_batch(backend, audio_inputs, transcriptions, elapsed, durations=None, segment_ids=None, decode_s=None,
+                  **fields):
+    """
+    Record one 'transcribe' profiling event per item of a batch (see utils/profiling.py).
+    The model time of the batch is divided over its items in proportion to their audio duration;
+    decode_s optionally gives the decode time of each item.
+    """
+    profiler = get_profiler()
+    if not profiler.enabled:
+        return
+    if durations is None:
+        durations = [get_audio_duration(audio) if isinstance(audio, str) else len(audio) / TARGET_SAMPLE_RATE
+                     for audio in audio_inputs]
+    if segment_ids is None:
+        segment_ids = [os.path.basename(audio) if isinstance(audio, str) else None for audio in audio_inputs]
+    if decode_s is None:
+        decode_s = [None] * len(audio_inputs)
+    total = sum(durations) or 1.0
+    for segment_id, duration, item_decode_s, transcription in zip(segment_ids, durations, decode_s, transcriptions):
+        profiler.record('transcribe', model=backend.model_name, segment=segment_id, audio_s=duration,
+                        decode_s=item_decode_s, model_s=elapsed * duration / total, batch_size=len(audio_inputs),
+                        tokens=backend.count_tokens(transcription), **fields)
+
+def transcribe_segments(model_list, cpu=True, segments_dir=None, output_transcript_dir=None, batch_size=1,
+                        cache=None, precision='fp32'):
+    """
+    Transcribe all audio segments with each model in model_list.
+
+    Segments are grouped into batches of similar duration (batch_size files per forward pass).
+    Existing transcripts are skipped, so an interrupted run can be resumed.
+    If a TranscriptCache is given, every segment is looked up by the hash of its audio, the model
+    and the generation settings instead; only cache misses are transcribed, and all transcripts
+    are (re)written, so renamed segments are reused and changed settings never give stale outputs.
+    Each batch gets a deadline relative to its audio duration (see utils/deadline.py). If generation
+    is stopped at the deadline, the files of the batch are retried one by one before being marked
+    as timed out. Batches that finish late with complete output (CTC models cannot be interrupted)
+    are kept and listed as late in the timeout report; only transcribe_segments_pool enforces a
+    hard timeout.
+    With precision 'int8' or 'bf16', pipeline models run with reduced-precision weights on CPU
+    (see utils/quantization.py) and write to <model>-<precision> transcript folders.
+    Segments that the VAD pre-filter dropped from segments_dir (utils/vad.py) get an empty transcript.
+    """
+    check_precision(precision, cpu)
     # Use provided directories or fall back to defaults
     if segments_dir is None:
         segments_dir = SEGMENTS_DIR
@@ -46,78 +209,187 @@ def transcribe_segments(model_list, cpu=True, segments_dir=None, output_transcri
     }
     
     for model_name in model_list:
-        if model_name != "mistralai/Voxtral-Mini-3B-2507":
-            transcriber = pipeline("automatic-speech-recognition", 
-                                model=model_name, device="cpu" if cpu else "mps",
-                                generate_kwargs = {"language":"<|nl|>"})
-        else:
-            processor = AutoProcessor.from_pretrained(model_name)
-            transcriber = VoxtralForConditionalGeneration.from_pretrained(model_name, torch_dtype=torch.bfloat16, device_map="mps")
+        backend = get_transcriber(model_name, cpu=cpu, precision=precision)
             
-        model_output_dir = os.path.join(output_transcript_dir, model_name.split('/')[-1])
+        model_output_dir = os.path.join(output_transcript_dir, model_output_name(model_name, precision))
         os.makedirs(model_output_dir, exist_ok=True)
             
         # Initialize timeout list for this model
         timeout_info['timeouts'][model_name] = []
 
-        for filename in os.listdir(segments_dir):
-            if filename.lower().endswith(('.wav', '.mp3', '.flac', '.ogg', '.m4a')):
-                # Check if transcription already exists
-                output_path = os.path.join(model_output_dir, f"{os.path.splitext(filename)[0]}.txt")
-                if os.path.exists(output_path):
-                    #print(f"Skipping {filename} - already transcribed with {model_name}")
-                    continue
+        write_dropped_transcripts(segments_dir, model_output_dir)
+        # Collect files that have not been transcribed yet
+        pending = pending_segments(segments_dir, model_output_dir, include_existing=cache is not None)
+        cache_keys, cache_hits = {}, 0
+        if cache is not None:
+            revision = backend.revision()
+            settings = backend.generation_settings()
+            if precision != 'fp32':
+                settings['precision'] = precision
+
+        durations = {path: get_audio_duration(path) for path in pending}
+        batches = bucket_by_duration(pending, batch_size) if batch_size > 1 else [[path] for path in pending]
+        while batches:
+            batch = batches.pop(0)
 
-                #print("Currently transcribing: ", filename)
-                audio_path = os.path.join(segments_dir, filename)
-                
-                # Set timeout for 60 seconds
-                signal.signal(signal.SIGALRM, timeout_handler)
-                signal.alarm(TRANSCRIPT_TIMEOUT)
-                
-                try:
-                    if model_name != "mistralai/Voxtral-Mini-3B-2507":
-                        result = transcriber(audio_path, generate_kwargs={"language":"nl"})
-                        transcription = result["text"]
+            # Decode outside the model call, so the profile separates decode and model time
+            arrays, decode_s = decode_batch(batch)
+            if cache is not None:
+                # Look segments up by the hash of the decoded audio, so each file is decoded once
+                misses = []
+                for i, (path, audio) in enumerate(zip(batch, arrays)):
+                    key = cache_key(audio_hash(audio), model_name, revision, settings)
+                    transcription = cache.get(key)
+                    if transcription is None:
+                        cache_keys[path] = key
+                        misses.append(i)
                     else:
-                        inputs = processor.apply_transcrition_request(language="nl", 
-                                                  audio=audio_path, 
-                                                  model_id=model_name)
-                        inputs = inputs.to("mps", dtype=torch.bfloat16)
-
-                        outputs = transcriber.generate(**inputs, max_new_tokens=500)
-                        transcription = processor.batch_decode(outputs[:, inputs.input_ids.shape[1]:], skip_special_tokens=True)[0]
-                        
-                    
-                    with open(output_path, 'w') as f:
-                        f.write(transcription)
-                    print(f"Transcribed {filename} using {model_name}")
-                except TimeoutError:
-                    print(f"Timeout while transcribing {filename} - moving to next file")
-                    timeout_info['timeouts'][model_name].append(filename)
-                    # Create a file with 'None' for timeout cases
-                    with open(output_path, 'w') as f:
-                        f.write('None')
+                        write_transcript(model_output_dir, os.path.basename(path), transcription)
+                        cache_hits += 1
+                if not misses:
+                    continue
+                batch = [batch[i] for i in misses]
+                arrays = [arrays[i] for i in misses]
+                decode_s = [decode_s[i] for i in misses]
+            filenames = [os.path.basename(path) for path in batch]
+
+            # Deadline relative to the audio duration of the batch
+            deadline = Deadline.for_audio(sum(durations[path] for path in batch))
+            transcriptions, status = transcribe_within(backend, arrays, deadline)
+
+            if status == 'interrupted':
+                if len(batch) > 1:
+                    print(f"Timeout while transcribing batch of {len(batch)} files - retrying files one by one")
+                    batches[:0] = [[path] for path in batch]
                     continue
-                finally:
-                    signal.alarm(0)  # Disable the alarm
+                filename = filenames[0]
+                print(f"Timeout while transcribing {filename} - moving to next file")
+                record_timeout(timeout_info, model_name, batch[0], durations[batch[0]], deadline.elapsed())
+                # Create a file with 'None' for timeout cases
+                write_transcript(model_output_dir, filename, 'None')
+                continue
+
+            if status == 'late':
+                print(f"Batch of {len(batch)} files finished {deadline.elapsed() - deadline.budget:.1f} s late")
+                record_late(timeout_info, model_name, batch, sum(durations[path] for path in batch),
+                            deadline.elapsed())
+            profile_batch(backend, batch, transcriptions, deadline.elapsed(),
+                          durations=[durations[path] for path in batch], decode_s=decode_s, precision=precision)
+            for path, filename, transcription in zip(batch, filenames, transcriptions):
+                write_transcript(model_output_dir, filename, transcription)
+                if cache is not None:
+                    cache.put(cache_keys[path], model_name, transcription)
+                print(f"Transcribed {filename} using {model_name}")
+        if cache is not None:
+            print(f"{cache_hits} of {len(pending)} segments found in cache for {model_name}")
+
+    write_timeout_report(timeout_info)
+    if cache is not None:
+        print(f"\nCache statistics: {cache.stats()}")
+
+def transcribe_longform(model_list, cpu=True, recordings_dir=None, output_transcript_dir=None, batch_size=8,
+                        window=LONGFORM_WINDOW, overlap=LONGFORM_OVERLAP, timestamps=False):
+    """
+    Transcribe full recordings without diarization or segmentation (long-form mode).
+
+    Each recording in recordings_dir (default: data/converted) is decoded once and transcribed
+    in overlapping windows of `window` seconds, batch_size windows per forward pass. Transcripts
+    are written to <output_transcript_dir>/<model>/<recording>.txt, and with timestamps=True the
+    timestamped chunks to <recording>.timestamps.json. Existing transcripts are skipped.
+    Each recording gets a deadline relative to its audio duration; recordings whose generation
+    was stopped at the deadline are marked with 'None' as for segments, late ones are kept.
+    """
+    if recordings_dir is None:
+        recordings_dir = CONVERTED_DATA_DIR
+    if output_transcript_dir is None:
+        output_transcript_dir = OUTPUT_TRANSCRIPT_DIR
+
+    timeout_info = {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'timeouts': {}
+    }
+
+    for model_name in model_list:
+        model_output_dir = os.path.join(output_transcript_dir, model_name.split('/')[-1])
+        os.makedirs(model_output_dir, exist_ok=True)
+        timeout_info['timeouts'][model_name] = []
+
+        pending = sorted(pending_segments(recordings_dir, model_output_dir))
+        if not pending:
+            continue
+        backend = get_transcriber(model_name, cpu=cpu)
+        for path in pending:
+            filename = os.path.basename(path)
+            decode_start = time.perf_counter()
+            audio = load_audio(path)
+            decode_s = time.perf_counter() - decode_start
+            duration = len(audio) / TARGET_SAMPLE_RATE
+            deadline = Deadline.for_audio(duration)
+            # Generation gets the time left of the recording's deadline, so both use the same budget
+            text, chunks = backend.transcribe_long(audio, batch_size=batch_size, window=window, overlap=overlap,
+                                                   timestamps=timestamps, max_time=deadline.remaining())
+
+            if backend.interrupted:
+                print(f"Timeout while transcribing {filename} - moving to next file")
+                record_timeout(timeout_info, model_name, path, duration, deadline.elapsed())
+                write_transcript(model_output_dir, filename, 'None')
+                continue
+            if deadline.expired():
+                record_late(timeout_info, model_name, [path], duration, deadline.elapsed())
+
+            get_profiler().record('transcribe_longform', model=model_name, segment=filename, audio_s=duration,
+                                  decode_s=decode_s, model_s=deadline.elapsed(), batch_size=batch_size,
+                                  tokens=backend.count_tokens(text))
+            write_transcript(model_output_dir, filename, text)
+            if chunks is not None:
+                timestamps_path = os.path.join(model_output_dir, f"{os.path.splitext(filename)[0]}.timestamps.json")
+                with open(timestamps_path, 'w') as f:
+                    json.dump(chunks, f, indent=1, ensure_ascii=False)
+            print(f"Transcribed {filename} ({duration:.0f} s) using {model_name}")
+
+    write_timeout_report(timeout_info)
+
+def write_transcript(model_output_dir, filename, transcription):
+    """Write the transcription of an audio file to <model_output_dir>/<basename>.txt"""
+    output_path = os.path.join(model_output_dir, f"{os.path.splitext(filename)[0]}.txt")
+    with open(output_path, 'w') as f:
+        f.write(transcription)
+
+def record_timeout(timeout_info, model_name, audio_path, duration, elapsed):
+    """Add a timed-out file, with its audio duration and the time spent on it, to timeout_info."""
+    timeout_info['timeouts'].setdefault(model_name, []).append({
+        'file': os.path.basename(audio_path),
+        'duration': round(duration, 3),
+        'elapsed': round(elapsed, 3),
+        'budget': round(segment_budget(duration), 3),
+    })
 
-        #Clear cache/memory after each model
-        del transcriber
-        gc.collect()
-        torch.mps.empty_cache() if torch.backends.mps.is_available() else None
+def record_late(timeout_info, model_name, audio_paths, duration, elapsed):
+    """Add a batch that finished after its deadline (its output was kept) to timeout_info['late']."""
+    timeout_info.setdefault('late', {}).setdefault(model_name, []).append({
+        'files': [os.path.basename(path) for path in audio_paths],
+        'duration': round(duration, 3),
+        'elapsed': round(elapsed, 3),
+        'budget': round(segment_budget(duration), 3),
+    })
 
-    # Save timeout information
-    timeout_file = os.path.join('output', 'timeout_files.json')
+def write_timeout_report(timeout_info, timeout_file=os.path.join('output', 'timeout_files.json')):
+    """Save timeout information to timeout_files.json and print a summary."""
     with open(timeout_file, 'w') as f:
         json.dump(timeout_info, f, indent=4)
     
     # Print summary of timeouts
     print("\nTimeout Summary:")
     print("===============")
-    for model, files in timeout_info['timeouts'].items():
-        if files:
+    for model, timeouts in timeout_info['timeouts'].items():
+        if timeouts:
             print(f"\nModel: {model}")
             print("Files that timed out:")
-            for file in files:
-                print(f"- {file}") 
\ No newline at end of file
+            for timeout in timeouts:
+                print(f"- {timeout['file']} ({timeout['duration']:.1f} s audio, {timeout['elapsed']:.1f} s elapsed)")
+    for model, batches in timeout_info.get('late', {}).items():
+        print(f"\nModel: {model}")
+        print("Batches that finished late (transcripts kept):")
+        for batch in batches:
+            print(f"- {len(batch['files'])} files ({batch['duration']:.1f} s audio, {batch['elapsed']:.1f} s elapsed, "
+                  f"budget {batch['budget']:.1f} s)")
@@ -0,0 +1,287 @@
+"""
+Multi-process CPU worker pool for transcription.
+
+Each worker process pins itself to a disjoint set of CPU cores, limits torch to
+that many threads, loads its model once and then pulls batches of segment paths
+from a shared queue. Several models can be run concurrently, each on its own
+set of cores. Transcripts are written to the same layout as transcribe_segments:
+output/transcripts/<model>/<segment>.txt
+
+Every batch gets a deadline relative to its audio duration (see utils/deadline.py).
+Workers stop decoding cooperatively when the budget is used up; a worker that is
+still busy well past its deadline (e.g. stuck in a torch op) is killed and replaced.
+"""
+
+import os
+import time
+import queue
+import multiprocessing as mp
+from datetime import datetime
+from itertools import count
+from typing import Dict
+
+import torch
+
+try:
+    from utils.transcribe import (SEGMENTS_DIR, OUTPUT_TRANSCRIPT_DIR, load_transcriber, transcribe_within,
+                                  get_audio_duration, bucket_by_duration, pending_segments, write_transcript,
+                                  record_timeout, record_late, write_timeout_report, profile_batch, model_output_name,
+                                  write_dropped_transcripts, decode_batch)
+    from utils.deadline import Deadline, HARD_KILL_FACTOR
+    from utils.quantization import check_precision
+    from utils.devices import available_cores, split_cores
+except ImportError:  # Run as a script from within utils/
+    from transcribe import (SEGMENTS_DIR, OUTPUT_TRANSCRIPT_DIR, load_transcriber, transcribe_within,
+                            get_audio_duration, bucket_by_duration, pending_segments, write_transcript,
+                            record_timeout, record_late, write_timeout_report, profile_batch, model_output_name,
+                            write_dropped_transcripts, decode_batch)
+    from deadline import Deadline, HARD_KILL_FACTOR
+    from quantization import check_precision
+    from devices import available_cores, split_cores
+
+CHECK_INTERVAL = 1.0  # seconds between checks of the worker deadlines
+CORES_PER_WORKER = 4  # default cores (torch threads) per worker; every worker holds its own copy of the model
+
+
+def _worker(worker_id, model_name, cpu, core_ids, task_queue, result_queue, model_output_dir, precision='fp32'):
+    """Worker process: load the model once, then transcribe batches until a None sentinel arrives."""
+    if core_ids and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, core_ids)
+    torch.set_num_threads(max(1, len(core_ids)))
+
+    backend = load_transcriber(model_name, cpu=cpu, precision=precision)
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        task_id, batch, budget = task
+        result_queue.put(('start', model_name, worker_id, task_id, 0.0))
+        arrays, decode_s = decode_batch(batch)
+        deadline = Deadline(budget)
+        transcriptions, status = transcribe_within(backend, arrays, deadline)
+        if status == 'interrupted':
+            result_queue.put(('timeout', model_name, worker_id, task_id, deadline.elapsed()))
+            continue
+        profile_batch(backend, batch, transcriptions, deadline.elapsed(), decode_s=decode_s,
+                      worker=worker_id, precision=precision)
+        for audio_path, transcription in zip(batch, transcriptions):
+            write_transcript(model_output_dir, os.path.basename(audio_path), transcription)
+        result_queue.put(('late' if status == 'late' else 'done', model_name, worker_id, task_id, deadline.elapsed()))
+
+
+class _ModelRun:
+    """Book-keeping of the tasks and workers of one model in the pool."""
+
+    def __init__(self, ctx, model_name, cpu, model_output_dir, durations, precision='fp32'):
+        self.ctx = ctx
+        self.model_name = model_name
+        self.cpu = cpu
+        self.precision = precision
+        self.model_output_dir = model_output_dir
+        self.durations = durations
+        self.task_queue = ctx.Queue()
+        self.tasks = {}  # task_id -> batch
+        self.in_flight = {}  # worker_id -> (task_id, Deadline)
+        self.workers = {}  # worker_id -> (process, cores)
+        self.stats = {'files': 0, 'audio_seconds': 0.0, 'busy_seconds': 0.0, 'timeouts': 0, 'restarts': 0}
+        self.finished = False
+
+    def submit(self, task_id, batch):
+        self.tasks[task_id] = batch
+        budget = Deadline.for_audio(sum(self.durations[path] for path in batch)).budget
+        self.task_queue.put((task_id, batch, budget))
+
+    def start_worker(self, worker_id, cores, result_queue):
+        process = self.ctx.Process(target=_worker,
+                                   args=(worker_id, self.model_name, self.cpu, cores, self.task_queue,
+                                         result_queue, self.model_output_dir, self.precision))
+        process.start()
+        self.workers[worker_id] = (process, cores)
+
+    def stop_workers(self):
+        for _ in self.workers:
+            self.task_queue.put(None)
+        for process, _ in self.workers.values():
+            process.join()
+        self.finished = True
+
+
+def transcribe_segments_pool(model_list, num_workers=None, concurrent_models=1, cpu=True,
+                             segments_dir=None, output_transcript_dir=None, batch_size=1,
+                             precision='fp32') -> Dict[str, dict]:
+    """
+    Transcribe segments with a pool of worker processes per model.
+
+    The available cores are divided over the models that run concurrently, and each model's
+    cores are divided over its workers (torch.set_num_threads = number of cores of the worker).
+    Every worker loads its own copy of the model, so memory grows with the number of workers
+    (roughly 1 GB per worker for whisper-small and 3 GB for whisper-medium in fp32); by default
+    a model gets one worker per CORES_PER_WORKER cores.
+
+    Args:
+        model_list: List of HuggingFace model names
+        num_workers: Worker processes per model (default: one per CORES_PER_WORKER cores of the model's core set)
+        concurrent_models: Number of models that run at the same time on disjoint core sets
+        cpu: Run the models on CPU
+        segments_dir: Folder with audio segments (default: output/segments)
+        output_transcript_dir: Folder for transcripts (default: output/transcripts)
+        batch_size: Number of segments per forward pass
+        precision: 'fp32', 'int8' or 'bf16' (see utils/quantization.py)
+
+    Returns:
+        Dictionary mapping model names to throughput statistics
+    """
+    check_precision(precision, cpu)
+    if segments_dir is None:
+        segments_dir = SEGMENTS_DIR
+    if output_transcript_dir is None:
+        output_transcript_dir = OUTPUT_TRANSCRIPT_DIR
+
+    ctx = mp.get_context('spawn')
+    summary = {}
+    timeout_info = {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'timeouts': {}
+    }
+    cores = available_cores()
+    task_ids, worker_ids = count(), count()
+
+    for group_start in range(0, len(model_list), concurrent_models):
+        group = model_list[group_start:group_start + concurrent_models]
+        result_queue = ctx.Queue()
+        runs = {}
+        group_start_time = time.perf_counter()
+
+        for model_name, core_set in zip(group, split_cores(cores, len(group))):
+            model_output_dir = os.path.join(output_transcript_dir, model_output_name(model_name, precision))
+            os.makedirs(model_output_dir, exist_ok=True)
+            timeout_info['timeouts'][model_name] = []
+
+            write_dropped_transcripts(segments_dir, model_output_dir)
+            pending = pending_segments(segments_dir, model_output_dir)
+            durations = {path: get_audio_duration(path) for path in pending}
+            run = _ModelRun(ctx, model_name, cpu, model_output_dir, durations, precision)
+            runs[model_name] = run
+            summary[model_name] = run.stats
+            batches = bucket_by_duration(pending, batch_size) if batch_size > 1 else [[path] for path in pending]
+            if not batches:
+                run.finished = True
+                continue
+
+            for batch in batches:
+                run.submit(next(task_ids), batch)
+            n_workers = min(num_workers or max(1, len(core_set) // CORES_PER_WORKER), len(batches))
+            for worker_cores in split_cores(core_set, n_workers):
+                run.start_worker(next(worker_ids), worker_cores, result_queue)
+            print(f"Started {n_workers} workers for {model_name} on cores {core_set}")
+
+        last_check = time.perf_counter()
+        while not all(run.finished for run in runs.values()):
+            # Check deadlines on every iteration (not only when the queue is idle), so a stuck
+            # worker is killed even while the other workers keep reporting
+            if time.perf_counter() - last_check >= CHECK_INTERVAL:
+                _check_workers(runs, result_queue, worker_ids, timeout_info, task_ids)
+                last_check = time.perf_counter()
+            try:
+                kind, model_name, worker_id, task_id, elapsed = result_queue.get(timeout=CHECK_INTERVAL)
+            except queue.Empty:
+                continue
+
+            run = runs[model_name]
+            if task_id not in run.tasks or worker_id not in run.workers:
+                # Stale message of a worker that was killed after sending it; its task was handled already
+                continue
+            if kind == 'start':
+                run.in_flight[worker_id] = (task_id, Deadline.for_audio(
+                    sum(run.durations[path] for path in run.tasks[task_id])))
+                continue
+
+            run.in_flight.pop(worker_id, None)
+            batch = run.tasks.pop(task_id)
+            if kind in ('done', 'late'):
+                if kind == 'late':
+                    record_late(timeout_info, model_name, batch, sum(run.durations[path] for path in batch), elapsed)
+                run.stats['files'] += len(batch)
+                run.stats['audio_seconds'] += sum(run.durations[path] for path in batch)
+                run.stats['busy_seconds'] += elapsed
+                for audio_path in batch:
+                    print(f"Transcribed {os.path.basename(audio_path)} using {model_name}")
+            else:
+                _handle_timeout(run, batch, elapsed, timeout_info, task_ids)
+
+            if not run.tasks and not run.finished:
+                run.stop_workers()
+
+        wall_seconds = time.perf_counter() - group_start_time
+        for model_name in group:
+            summary[model_name]['wall_seconds'] = wall_seconds
+
+    write_timeout_report(timeout_info)
+    print_throughput_summary(summary)
+    return summary
+
+
+def _handle_timeout(run, batch, elapsed, timeout_info, task_ids):
+    """Retry the files of a timed-out batch one by one, or record a timed-out single file as 'None'."""
+    if len(batch) > 1:
+        print(f"Timeout while transcribing batch of {len(batch)} files - retrying files one by one")
+        for audio_path in batch:
+            run.submit(next(task_ids), [audio_path])
+        return
+    audio_path = batch[0]
+    print(f"Timeout while transcribing {os.path.basename(audio_path)} - moving to next file")
+    record_timeout(timeout_info, run.model_name, audio_path, run.durations[audio_path], elapsed)
+    write_transcript(run.model_output_dir, os.path.basename(audio_path), 'None')
+    run.stats['timeouts'] += 1
+
+
+def _check_workers(runs, result_queue, worker_ids, timeout_info, task_ids):
+    """Kill workers that are stuck past their hard deadline and replace workers that died."""
+    for run in runs.values():
+        if run.finished:
+            continue
+        for worker_id, (process, cores) in list(run.workers.items()):
+            in_flight = run.in_flight.get(worker_id)
+            stuck = in_flight is not None and in_flight[1].expired(HARD_KILL_FACTOR)
+            if process.is_alive() and not stuck:
+                continue
+            if stuck:
+                print(f"Worker {worker_id} for {run.model_name} exceeded its deadline - restarting it")
+                process.terminate()
+            process.join()
+            del run.workers[worker_id]
+            if in_flight is not None:
+                task_id, deadline = run.in_flight.pop(worker_id)
+                batch = run.tasks.pop(task_id, None)
+                if batch is not None:
+                    _handle_timeout(run, batch, deadline.elapsed(), timeout_info, task_ids)
+            elif not stuck and process.exitcode != 0 and not run.in_flight and not any(
+                    p.is_alive() for p, _ in run.workers.values()):
+                # The worker died without a task (e.g. the model failed to load), give up on this model
+                print(f"All workers for {run.model_name} exited with {len(run.tasks)} batches left")
+                run.tasks.clear()
+                run.stop_workers()
+                break
+            run.stats['restarts'] += 1
+            run.start_worker(next(worker_ids), cores, result_queue)
+        if not run.finished and not run.tasks:
+            run.stop_workers()
+
+
+def print_throughput_summary(summary: Dict[str, dict]) -> None:
+    """Print files/s and real-time factor (processing time / audio time) per model."""
+    print("\nThroughput Summary:")
+    print("==================")
+    for model_name, stats in summary.items():
+        wall = stats.get('wall_seconds', 0.0)
+        files_per_second = stats['files'] / wall if wall > 0 else 0.0
+        rtf = wall / stats['audio_seconds'] if stats['audio_seconds'] > 0 else float('nan')
+        print(f"\nModel: {model_name}")
+        print(f"- Files transcribed: {stats['files']} (timeouts: {stats['timeouts']}, worker restarts: {stats['restarts']})")
+        print(f"- Audio: {stats['audio_seconds']:.1f} s, wall time: {wall:.1f} s")
+        print(f"- Throughput: {files_per_second:.2f} files/s, real-time factor: {rtf:.3f}")
+
+
+if __name__ == "__main__":
+    transcribe_segments_pool(["openai/whisper-small", "openai/whisper-medium"], concurrent_models=2)
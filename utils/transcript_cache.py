@@ -0,0 +1,107 @@
+"""
+Content-addressed cache for transcriptions.
+
+Entries are keyed by a hash of the decoded audio samples plus the model name, model
+revision and generation settings, so renamed or re-segmented files with identical
+audio are cache hits, while changed settings never reuse stale results. The cache
+is a single SQLite file with least-recently-used eviction once it grows beyond
+max_bytes.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional
+
+import numpy as np
+
+CACHE_PATH = os.path.join('output', 'transcript_cache.sqlite')
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+
+def audio_hash(audio: np.ndarray) -> str:
+    """Hash of the decoded audio samples (mono float32)."""
+    samples = np.ascontiguousarray(audio, dtype=np.float32)
+    return hashlib.blake2b(samples.tobytes(), digest_size=20).hexdigest()
+
+
+def cache_key(audio_digest: str, model_name: str, revision: Optional[str], generate_kwargs: dict) -> str:
+    """Combine the audio hash, model name, model revision and generation settings into a cache key."""
+    payload = json.dumps([audio_digest, model_name, revision, generate_kwargs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class TranscriptCache:
+    """SQLite-backed transcription cache with size-bounded LRU eviction and hit/miss statistics."""
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = MAX_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS transcripts ("
+            "key TEXT PRIMARY KEY, model TEXT, transcription TEXT, size INTEGER, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON transcripts (last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached transcription for key, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute("SELECT transcription FROM transcripts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE transcripts SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, model_name: str, transcription: str) -> None:
+        """Store a transcription and evict least recently used entries if the cache is too large."""
+        size = len(key) + len(transcription.encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transcripts (key, model, transcription, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, model_name, transcription, size, time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM transcripts").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM transcripts ORDER BY last_access").fetchall():
+            self._conn.execute("DELETE FROM transcripts WHERE key = ?", (key,))
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counts and the current number and size of entries."""
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM transcripts").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': entries,
+            'bytes': total,
+        }
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,402 @@
+"""
+Local transcription service for recordings that arrive one by one (e.g. from care sites).
+
+Clients POST audio to the service; requests are queued per model and a micro-batcher
+groups them into batches in front of the warm models used by transcribe_segments
+(the same model registry, so a model is loaded once per process):
+
+- a batch is started as soon as max_batch_size requests are waiting, or max_wait seconds
+  after its first request arrived, whichever comes first. A larger max_wait gives fuller
+  batches (throughput), a smaller one lower latency for sparse traffic.
+- batches of one model run one at a time in a dedicated thread, so the event loop keeps
+  accepting and decoding uploads while a model is busy.
+- every response carries its queue, model and total latency; GET /metrics reports
+  per-model queue depth, batch sizes, latency percentiles and real-time factor.
+
+Endpoints (aiohttp, over TCP or a Unix socket):
+    POST /transcribe?model=<name>   body: audio file (any format load_audio reads)
+    GET  /metrics
+    GET  /health
+
+Usage:
+    python utils/transcription_service.py serve --models openai/whisper-small --max-batch-size 8 --max-wait-ms 50
+    python utils/transcription_service.py submit recording1.wav recording2.wav
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    from utils.audio_io import TARGET_SAMPLE_RATE, decode_audio_bytes
+    from utils.deadline import Deadline
+    from utils.profiling import latency_percentiles
+    from utils.transcribe import get_transcriber, model_output_name, profile_batch, transcribe_within
+except ImportError:  # Run as a script from within utils/
+    from audio_io import TARGET_SAMPLE_RATE, decode_audio_bytes
+    from deadline import Deadline
+    from profiling import latency_percentiles
+    from transcribe import get_transcriber, model_output_name, profile_batch, transcribe_within
+
+SERVICE_HOST = '127.0.0.1'
+SERVICE_PORT = 8765
+MAX_BATCH_SIZE = 8
+MAX_WAIT = 0.05  # seconds
+METRICS_WINDOW = 1000  # requests kept for the latency percentiles
+
+
+@dataclass
+class Job:
+    """One queued transcription request."""
+    audio: np.ndarray
+    future: asyncio.Future
+    enqueued: float = field(default_factory=time.perf_counter)
+
+    @property
+    def duration(self) -> float:
+        return len(self.audio) / TARGET_SAMPLE_RATE
+
+
+class ServiceMetrics:
+    """Counters and recent latencies of one model's queue."""
+
+    def __init__(self, window: int = METRICS_WINDOW):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.batches = 0
+        self.audio_s = 0.0
+        self.model_s = 0.0
+        self.batch_sizes = deque(maxlen=window)
+        self.queue_s = deque(maxlen=window)
+        self.latency_s = deque(maxlen=window)
+
+    def record_batch(self, jobs: List[Job], queue_s: List[float], latency_s: List[float], model_s: float) -> None:
+        self.batches += 1
+        self.completed += len(jobs)
+        self.audio_s += sum(job.duration for job in jobs)
+        self.model_s += model_s
+        self.batch_sizes.append(len(jobs))
+        self.queue_s.extend(queue_s)
+        self.latency_s.extend(latency_s)
+
+    def snapshot(self, queue_depth: int = 0) -> dict:
+        return {'submitted': self.submitted, 'completed': self.completed, 'failed': self.failed,
+                'timeouts': self.timeouts, 'queue_depth': queue_depth, 'batches': self.batches,
+                'mean_batch_size': round(float(np.mean(self.batch_sizes)), 2) if self.batch_sizes else None,
+                'audio_s': round(self.audio_s, 2), 'model_s': round(self.model_s, 3),
+                'rtf': round(self.model_s / self.audio_s, 4) if self.audio_s else None,
+                'queue_s': latency_percentiles(self.queue_s),
+                'latency_s': latency_percentiles(self.latency_s)}
+
+
+class MicroBatcher:
+    """
+    Queue of transcription requests for one model, transcribed in dynamic batches.
+
+    Must be started (start()) from a running event loop; submit() then returns the result
+    of one request once its batch is done.
+    """
+
+    def __init__(self, backend, max_batch_size: int = MAX_BATCH_SIZE, max_wait: float = MAX_WAIT):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.metrics = ServiceMetrics()
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight: List[Job] = []  # jobs of the batch being transcribed
+        # One thread per model: batches of a model never run concurrently
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'asr-{backend.model_name}')
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        jobs = list(self._in_flight)
+        while self._queue is not None and not self._queue.empty():
+            jobs.append(self._queue.get_nowait())
+        self._fail(jobs, RuntimeError("Transcription service stopped"))
+        self._executor.shutdown(wait=True)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, audio: np.ndarray) -> dict:
+        """Queue mono float32 audio at TARGET_SAMPLE_RATE and wait for its transcription."""
+        job = Job(audio, asyncio.get_running_loop().create_future())
+        self.metrics.submitted += 1
+        await self._queue.put(job)
+        return await job.future
+
+    async def _next_batch(self) -> List[Job]:
+        """Wait for a first job, then collect more until the batch is full or max_wait has passed."""
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            getter = asyncio.ensure_future(self._queue.get())
+            await asyncio.wait({getter}, timeout=remaining)
+            if not getter.done():
+                getter.cancel()  # The job stays in the queue for the next batch
+                break
+            batch.append(getter.result())
+        return batch
+
+    def _transcribe(self, arrays: List[np.ndarray]):
+        """
+        Transcribe a batch within a deadline relative to its audio duration (runs in the model's thread).
+        A batch whose generation is stopped at the deadline is retried item by item; items that are
+        stopped again get 'None'. Batches that finish late with complete output are kept.
+        """
+        deadline = Deadline.for_audio(sum(len(audio) for audio in arrays) / TARGET_SAMPLE_RATE)
+        transcriptions, status = transcribe_within(self.backend, arrays, deadline)
+        if status != 'interrupted':
+            return transcriptions, [False] * len(arrays)
+        if len(arrays) == 1:
+            return ['None'], [True]
+        results = [self._transcribe([audio]) for audio in arrays]
+        return [texts[0] for texts, _ in results], [timed_out[0] for _, timed_out in results]
+
+    def _fail(self, jobs: List[Job], error: Exception) -> None:
+        """Fail the requests of jobs that are still waiting for their result."""
+        for job in jobs:
+            if not job.future.done():
+                job.future.set_exception(error)
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            self._in_flight = [job for job in batch if not job.future.done()]  # Skip requests whose client went away
+            if not self._in_flight:
+                continue
+            try:
+                await self._process(self._in_flight)
+            except Exception as e:
+                # Only this batch fails; the batcher keeps serving later requests
+                self.metrics.failed += sum(not job.future.done() for job in self._in_flight)
+                self._fail(self._in_flight, e)
+            # Left in place on cancellation, so stop() fails the requests of the interrupted batch
+            self._in_flight = []
+
+    async def _process(self, jobs: List[Job]) -> None:
+        """Transcribe one batch and resolve its requests."""
+        arrays = [job.audio for job in jobs]
+        start = time.perf_counter()
+        transcriptions, timed_out = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._transcribe, arrays)
+        end = time.perf_counter()
+        model_s = end - start
+        profile_batch(self.backend, arrays, transcriptions, model_s, service=True)
+
+        queue_s = [start - job.enqueued for job in jobs]
+        latency_s = [end - job.enqueued for job in jobs]
+        self.metrics.record_batch(jobs, queue_s, latency_s, model_s)
+        self.metrics.timeouts += sum(timed_out)
+        for job, text, timeout, waited, latency in zip(jobs, transcriptions, timed_out, queue_s, latency_s):
+            if not job.future.done():
+                job.future.set_result({'model': self.backend.model_name, 'text': text, 'timeout': timeout,
+                                       'audio_s': round(job.duration, 3), 'batch_size': len(jobs),
+                                       'queue_s': round(waited, 4), 'model_s': round(model_s, 4),
+                                       'latency_s': round(latency, 4)})
+
+
+class TranscriptionService:
+    """
+    Micro-batched transcription for a set of warm models.
+
+    Args:
+        model_list: HuggingFace model names (the first one is the default)
+        cpu: Whether to run on CPU
+        precision: Model precision, see utils/quantization.py
+        max_batch_size: Maximum number of requests per forward pass
+        max_wait: Maximum seconds the first request of a batch waits for more requests
+        backends: Optional {model name: backend} to use instead of loading models (e.g. a stub)
+    """
+
+    def __init__(self, model_list: List[str], cpu: bool = True, precision: str = 'fp32',
+                 max_batch_size: int = MAX_BATCH_SIZE, max_wait: float = MAX_WAIT, backends: Optional[dict] = None):
+        self.model_list = list(model_list)
+        self.cpu = cpu
+        self.precision = precision
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._backends = backends or {}
+        self.batchers: Dict[str, MicroBatcher] = {}
+
+    async def start(self) -> None:
+        """Load (or take from the registry) every model and start its batcher."""
+        loop = asyncio.get_running_loop()
+        for model_name in self.model_list:
+            backend = self._backends.get(model_name)
+            if backend is None:
+                backend = await loop.run_in_executor(None, get_transcriber, model_name, self.cpu, self.precision)
+            batcher = MicroBatcher(backend, self.max_batch_size, self.max_wait)
+            batcher.start()
+            self.batchers[model_name] = batcher
+            print(f"Serving {model_output_name(model_name, self.precision)}")
+
+    async def stop(self) -> None:
+        for batcher in self.batchers.values():
+            await batcher.stop()
+
+    async def transcribe(self, audio: np.ndarray, model: Optional[str] = None) -> dict:
+        """Transcribe mono float32 audio at TARGET_SAMPLE_RATE with model (default: the first model)."""
+        model = model or self.model_list[0]
+        if model not in self.batchers:
+            raise KeyError(model)
+        return await self.batchers[model].submit(audio)
+
+    def metrics(self) -> dict:
+        return {model_name: batcher.metrics.snapshot(batcher.queue_depth)
+                for model_name, batcher in self.batchers.items()}
+
+
+def create_app(service: TranscriptionService):
+    """aiohttp application serving the service; starts and stops it with the application."""
+    from aiohttp import web
+
+    async def transcribe(request):
+        model = request.query.get('model')
+        if model is not None and model not in service.model_list:
+            raise web.HTTPNotFound(text=f"Unknown model {model!r}")
+        data = await request.read()
+        if not data:
+            raise web.HTTPBadRequest(text="Empty request body, expected an audio file")
+        received = time.perf_counter()
+        try:
+            audio = await asyncio.get_running_loop().run_in_executor(None, decode_audio_bytes, data)
+        except Exception as e:
+            raise web.HTTPBadRequest(text=f"Could not decode audio: {e}")
+        decode_s = time.perf_counter() - received
+        result = await service.transcribe(audio, model)
+        return web.json_response({**result, 'decode_s': round(decode_s, 4)})
+
+    async def metrics(request):
+        return web.json_response(service.metrics())
+
+    async def health(request):
+        return web.json_response({'status': 'ok', 'models': service.model_list})
+
+    async def on_startup(app):
+        await service.start()
+
+    async def on_cleanup(app):
+        await service.stop()
+
+    app = web.Application(client_max_size=512 * 1024 ** 2)
+    app.add_routes([web.post('/transcribe', transcribe), web.get('/metrics', metrics), web.get('/health', health)])
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def serve(service: TranscriptionService, host: str = SERVICE_HOST, port: int = SERVICE_PORT,
+          socket_path: Optional[str] = None) -> None:
+    """Run the service until interrupted, on host:port or on a Unix socket."""
+    from aiohttp import web
+
+    if socket_path is not None:
+        web.run_app(create_app(service), path=socket_path)
+    else:
+        web.run_app(create_app(service), host=host, port=port)
+
+
+async def submit_files(paths: List[str], url: str = f'http://{SERVICE_HOST}:{SERVICE_PORT}',
+                       model: Optional[str] = None, socket_path: Optional[str] = None,
+                       concurrency: int = 16) -> List[dict]:
+    """
+    Client: send audio files to a running service, at most `concurrency` at a time.
+
+    Returns:
+        list: Service response per file (with the file path), in the order of paths
+    """
+    import aiohttp
+
+    connector = aiohttp.UnixConnector(path=socket_path) if socket_path else None
+    params = {'model': model} if model else {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def submit(session, path):
+        async with semaphore:
+            with open(path, 'rb') as f:
+                data = f.read()
+            async with session.post(f'{url}/transcribe', data=data, params=params) as response:
+                response.raise_for_status()
+                return {'path': path, **await response.json()}
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        return await asyncio.gather(*(submit(session, path) for path in paths))
+
+
+async def fetch_metrics(url: str = f'http://{SERVICE_HOST}:{SERVICE_PORT}', socket_path: Optional[str] = None) -> dict:
+    """Client: return the metrics of a running service."""
+    import aiohttp
+
+    connector = aiohttp.UnixConnector(path=socket_path) if socket_path else None
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async with session.get(f'{url}/metrics') as response:
+            response.raise_for_status()
+            return await response.json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve', help='Run the service')
+    serve_parser.add_argument('--models', default='openai/whisper-small', help='Comma-separated model names')
+    serve_parser.add_argument('--gpu', action='store_true', help='Run the models on the GPU')
+    serve_parser.add_argument('--precision', default='fp32', help='fp32, int8 or bf16')
+    serve_parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE)
+    serve_parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT * 1000)
+    serve_parser.add_argument('--host', default=SERVICE_HOST)
+    serve_parser.add_argument('--port', type=int, default=SERVICE_PORT)
+    serve_parser.add_argument('--socket', help='Unix socket path instead of host and port')
+
+    submit_parser = subparsers.add_parser('submit', help='Transcribe audio files with a running service')
+    submit_parser.add_argument('paths', nargs='+')
+    submit_parser.add_argument('--model', help='Model name (default: the first model of the service)')
+    submit_parser.add_argument('--url', default=f'http://{SERVICE_HOST}:{SERVICE_PORT}')
+    submit_parser.add_argument('--socket', help='Unix socket path of the service')
+    submit_parser.add_argument('--concurrency', type=int, default=16)
+
+    args = parser.parse_args()
+    if args.command == 'serve':
+        service = TranscriptionService([name for name in args.models.split(',') if name], cpu=not args.gpu,
+                                       precision=args.precision, max_batch_size=args.max_batch_size,
+                                       max_wait=args.max_wait_ms / 1000)
+        serve(service, args.host, args.port, args.socket)
+        return 0
+
+    url = 'http://localhost' if args.socket else args.url
+    for response in asyncio.run(submit_files(args.paths, url, args.model, args.socket, args.concurrency)):
+        print(f"{os.path.basename(response.pop('path'))}\t{response.pop('text')}\t{response}")
+    print(asyncio.run(fetch_metrics(url, args.socket)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
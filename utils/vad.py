@@ -0,0 +1,187 @@
+"""
+Voice activity detection (VAD) pre-filter for audio segments.
+
+Segments often start or end with long silences, and some contain no speech at all; every
+model would still process them (and Whisper tends to hallucinate text on silence). This
+stage runs before transcription:
+
+- speech frames are found with numpy on the whole segment at once: frames with an RMS energy
+  above an adaptive threshold (a multiple of the segment's noise floor, at least MIN_SPEECH_RMS
+  and at most a fraction of its loud frames) and the low zero-crossing rate of voiced speech
+  (stationary noise such as hiss crosses zero much more often); the speech from the first to
+  the last speech frame is kept, with PADDING on both sides
+- segments with less than MIN_SPEECH seconds of speech are dropped
+- leading and trailing silence of the other segments is trimmed (written as WAV files with
+  the same segment ID); segments without much to trim are copied unchanged
+
+A manifest (vad_manifest.tsv in the output folder) records per segment the original duration,
+the kept interval and whether it was kept, trimmed or dropped. transcribe_segments writes an
+empty transcript for dropped segments, so every reference still has a hypothesis; evaluate_models
+scores empty hypotheses as all words deleted (penalize_empty=True, the default), so speech missed
+by the VAD counts against the WER.
+
+Usage:
+    python utils/vad.py [segments_dir] [output_dir]
+    transcribe_segments(MODELS, segments_dir="output/segments_vad")
+"""
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import soundfile as sf
+
+try:
+    from utils.audio_io import TARGET_SAMPLE_RATE, link_or_copy, load_audio, write_wav
+    from utils.audio_metadata import AUDIO_EXTENSIONS
+    from utils.chunking import FRAME_LENGTH, HOP_LENGTH, frame_rms
+except ImportError:  # Run as a script from within utils/
+    from audio_io import TARGET_SAMPLE_RATE, link_or_copy, load_audio, write_wav
+    from audio_metadata import AUDIO_EXTENSIONS
+    from chunking import FRAME_LENGTH, HOP_LENGTH, frame_rms
+
+VAD_SEGMENTS_DIR = os.path.join('output', 'segments_vad')
+VAD_MANIFEST = 'vad_manifest.tsv'
+MIN_SPEECH_RMS = 0.005
+SPEECH_RATIO = 3.0  # speech frames are SPEECH_RATIO times louder than the noise floor
+NOISE_PERCENTILE = 10  # the quietest frames of a segment estimate its noise floor
+LOUD_PERCENTILE = 95
+LOUD_FRACTION = 0.1  # the threshold is at most this fraction of the loud frames (segments without pauses)
+MAX_VOICED_ZCR = 0.3  # zero crossings per sample; white noise has about 0.5, voiced speech below 0.2
+MIN_SPEECH = 0.2  # seconds of speech below which a segment is dropped
+PADDING = 0.2  # seconds of audio kept around the detected speech
+MIN_TRIM = 0.3  # seconds; segments with less silence to trim are kept unchanged
+
+
+def frame_zcr(audio: np.ndarray, sr: int = TARGET_SAMPLE_RATE, frame_length: float = FRAME_LENGTH,
+              hop_length: float = HOP_LENGTH) -> np.ndarray:
+    """Zero-crossing rate (crossings per sample) per frame, aligned with chunking.frame_rms."""
+    frame = max(1, int(round(frame_length * sr)))
+    hop = max(1, int(round(hop_length * sr)))
+    crossings = np.concatenate([[0], np.cumsum(np.signbit(audio[1:]) != np.signbit(audio[:-1]))])
+    starts = np.arange(max(1, (max(len(audio), frame) - frame) // hop + 1)) * hop
+    ends = np.minimum(starts + frame - 1, len(crossings) - 1)
+    return (crossings[ends] - crossings[np.minimum(starts, len(crossings) - 1)]) / frame
+
+
+def speech_frames(audio: np.ndarray, sr: int = TARGET_SAMPLE_RATE, min_rms: float = MIN_SPEECH_RMS,
+                  speech_ratio: float = SPEECH_RATIO) -> np.ndarray:
+    """Boolean speech mask per frame (HOP_LENGTH apart) of a mono signal."""
+    rms = frame_rms(audio, sr)
+    if len(audio) < 2:
+        return np.zeros(len(rms), dtype=bool)
+    noise_floor, loud = np.percentile(rms, [NOISE_PERCENTILE, LOUD_PERCENTILE])
+    threshold = max(min_rms, min(speech_ratio * noise_floor, LOUD_FRACTION * loud))
+    return (rms > threshold) & (frame_zcr(audio, sr) < MAX_VOICED_ZCR)
+
+
+def speech_bounds(audio: np.ndarray, sr: int = TARGET_SAMPLE_RATE, min_speech: float = MIN_SPEECH,
+                  padding: float = PADDING) -> Optional[Tuple[int, int]]:
+    """
+    Return the (start, end) samples of the speech in audio, including padding, or None if
+    it contains less than min_speech seconds of speech.
+    """
+    speech = speech_frames(audio, sr)
+    if speech.sum() * HOP_LENGTH < min_speech:
+        return None
+    frames = np.flatnonzero(speech)
+    hop = int(round(HOP_LENGTH * sr))
+    start = max(0, frames[0] * hop - int(padding * sr))
+    end = min(len(audio), (frames[-1] + 1) * hop + int(round(FRAME_LENGTH * sr)) + int(padding * sr))
+    return start, end
+
+
+def _read(path: str):
+    """Read a segment as (samples, sample rate); formats soundfile cannot read are decoded at 16 kHz."""
+    try:
+        return sf.read(path, dtype='float32')
+    except RuntimeError:
+        return load_audio(path), TARGET_SAMPLE_RATE
+
+
+def filter_segment(path: str, output_dir: str, min_speech: float = MIN_SPEECH, padding: float = PADDING,
+                   min_trim: float = MIN_TRIM) -> dict:
+    """Trim, keep or drop one segment; returns its manifest row."""
+    audio, sr = _read(path)
+    mono = audio.mean(axis=1) if audio.ndim > 1 else audio
+    segment_id = os.path.splitext(os.path.basename(path))[0]
+    row = {'segment_id': segment_id, 'source': os.path.basename(path), 'duration_s': round(len(mono) / sr, 3),
+           'start_s': None, 'end_s': None, 'status': 'dropped'}
+
+    bounds = speech_bounds(mono, sr, min_speech, padding)
+    if bounds is None:
+        # Remove the output of an earlier run, so the segment is not transcribed after all
+        for filename in {os.path.basename(path), f"{segment_id}.wav"}:
+            if os.path.lexists(os.path.join(output_dir, filename)):
+                os.remove(os.path.join(output_dir, filename))
+        return row
+    start, end = bounds
+    row.update(start_s=round(start / sr, 3), end_s=round(end / sr, 3))
+    if (len(mono) - (end - start)) / sr < min_trim:
+        # A copy, not a hard link: in-place rewrites downstream (e.g. check_mono) must not touch the source
+        link_or_copy(path, os.path.join(output_dir, os.path.basename(path)), mode='copy')
+        row['status'] = 'kept'
+    else:
+        write_wav(os.path.join(output_dir, f"{segment_id}.wav"), audio[start:end], sr)
+        row['status'] = 'trimmed'
+    return row
+
+
+def vad_filter_segments(segments_dir: str = os.path.join('output', 'segments'), output_dir: str = VAD_SEGMENTS_DIR,
+                        min_speech: float = MIN_SPEECH, padding: float = PADDING, min_trim: float = MIN_TRIM,
+                        max_workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Trim silence from all segments in segments_dir and drop segments without speech.
+
+    Args:
+        segments_dir: Folder with audio segments
+        output_dir: Folder for the filtered segments and the manifest
+        min_speech: Segments with less speech (seconds) are dropped
+        padding: Seconds of audio kept around the detected speech
+        min_trim: Segments with less silence (seconds) to trim are copied unchanged
+        max_workers: Number of worker processes (default: number of CPUs)
+
+    Returns:
+        The manifest: one row per segment with segment_id, source, duration_s, start_s, end_s
+        and status ('kept', 'trimmed' or 'dropped')
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = sorted(os.path.join(segments_dir, filename) for filename in os.listdir(segments_dir)
+                   if filename.lower().endswith(AUDIO_EXTENSIONS))
+    n = len(paths)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        rows = list(executor.map(filter_segment, paths, [output_dir] * n, [min_speech] * n, [padding] * n,
+                                 [min_trim] * n, chunksize=max(1, n // (4 * (os.cpu_count() or 1)))))
+
+    manifest = pd.DataFrame(rows, columns=['segment_id', 'source', 'duration_s', 'start_s', 'end_s', 'status'])
+    manifest.to_csv(os.path.join(output_dir, VAD_MANIFEST), sep='\t', index=False)
+
+    total = manifest['duration_s'].sum()
+    kept = (manifest['end_s'] - manifest['start_s']).sum()
+    counts = manifest['status'].value_counts().to_dict()
+    print(f"VAD: {counts} of {n} segments; audio reduced from {total:.0f} s to {kept:.0f} s "
+          f"({1 - kept / total if total else 0:.0%} less)")
+    return manifest
+
+
+def read_vad_manifest(segments_dir: str) -> Optional[pd.DataFrame]:
+    """The VAD manifest of a folder of filtered segments, or None if it was not filtered."""
+    path = os.path.join(segments_dir, VAD_MANIFEST)
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path, sep='\t', dtype={'segment_id': str})
+
+
+def dropped_segments(segments_dir: str) -> List[str]:
+    """IDs of the segments the VAD dropped from segments_dir (empty if it was not filtered)."""
+    manifest = read_vad_manifest(segments_dir)
+    if manifest is None:
+        return []
+    return manifest.loc[manifest['status'] == 'dropped', 'segment_id'].tolist()
+
+
+if __name__ == "__main__":
+    vad_filter_segments(*sys.argv[1:3])
@@ -0,0 +1,257 @@
+"""
+Vectorized Word Error Rate engine.
+
+References are tokenized once and words are mapped to integer IDs. Edit distances
+for many reference/hypothesis pairs are computed at once: the pairs are sorted by
+length, padded into (batch, length) integer arrays, and the Levenshtein matrices of
+the whole batch are filled row by row. Within a row, the insertion recurrence
+d[j] = min(t[j], d[j-1] + 1) is solved in one step as min.accumulate(t - j) + j.
+Only two rows of distances are kept, plus one byte per cell with the move that
+reached it; a backtrace over those moves, also vectorized over the batch, gives
+substitution, deletion and insertion counts. Chunks are limited to MAX_CELLS cells.
+
+Tokenization (split on whitespace) and tie-breaking match jiwer, which aligns with
+rapidfuzz's Levenshtein.editops: the common prefix and suffix of a pair are matched
+first, and among alignments of minimum cost the same one is chosen, so WER and
+substitution/deletion/insertion counts are identical to the jiwer path; see
+benchmarks/bench_wer.py and tests/test_wer_engine.py.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAX_CELLS = 1 << 26  # DP cells per chunk: one byte each for the backtrace (64 MB)
+HIT, SUBSTITUTION, DELETION, INSERTION = range(4)  # moves, also the columns of the counts
+
+
+@dataclass
+class Alignment:
+    """Edit operation counts of one reference/hypothesis pair."""
+    hits: int
+    substitutions: int
+    deletions: int
+    insertions: int
+
+    @property
+    def errors(self) -> int:
+        return self.substitutions + self.deletions + self.insertions
+
+    @property
+    def ref_words(self) -> int:
+        return self.hits + self.substitutions + self.deletions
+
+    @property
+    def wer(self) -> float:
+        return self.errors / self.ref_words if self.ref_words else float('nan')
+
+
+def _align_chunk(refs: List[np.ndarray], hyps: List[np.ndarray]) -> np.ndarray:
+    """Align one chunk of pairs; returns an (n_pairs, 4) array of hits, substitutions, deletions, insertions."""
+    b = len(refs)
+    n = np.array([len(r) for r in refs], dtype=np.int64)
+    m = np.array([len(h) for h in hyps], dtype=np.int64)
+    N, M = int(n.max()), int(m.max())
+
+    # Pad with IDs that never match, padding does not influence d[:n+1, :m+1]
+    R = np.full((b, N), -1, dtype=np.int32)
+    H = np.full((b, M), -2, dtype=np.int32)
+    for k in range(b):
+        R[k, :n[k]] = refs[k]
+        H[k, :m[k]] = hyps[k]
+
+    # Only two rows of the DP matrix are kept; the backtrace uses the move into every cell
+    # (HIT, SUBSTITUTION, DELETION or INSERTION), one byte per cell
+    cols = np.arange(M + 1, dtype=np.int32)
+    prev = np.tile(cols, (b, 1))
+    current = np.empty_like(prev)
+    t = np.empty((b, M + 1), dtype=np.int32)
+    moves = np.empty((b, N, M), dtype=np.uint8)
+    for i in range(1, N + 1):
+        t[:, 0] = i
+        cost = H != R[:, i - 1:i]
+        # Substitution/match from the diagonal, deletion from above
+        diagonal = prev[:, :-1] + cost
+        above = prev[:, 1:] + 1
+        np.minimum(diagonal, above, out=t[:, 1:])
+        # Insertions from the left: d[j] = min over k <= j of t[k] + (j - k)
+        np.add(np.minimum.accumulate(t - cols, axis=1), cols, out=current)
+        # Tie-breaking of rapidfuzz's Levenshtein.editops (used by jiwer): deletion if the cell can
+        # be reached from above, else insertion if the distance drops going down the previous column,
+        # else the diagonal
+        is_deletion = current[:, 1:] == above
+        is_insertion = np.zeros((b, M), dtype=bool)
+        is_insertion[:, 1:] = current[:, 1:-1] == prev[:, 1:-1] - 1
+        moves[:, i - 1] = np.where(is_deletion, DELETION, np.where(is_insertion, INSERTION, cost.astype(np.uint8)))
+        prev, current = current, prev
+
+    counts = np.zeros((b, 4), dtype=np.int64)
+    i, j = n.copy(), m.copy()
+    while True:
+        active = np.nonzero((i > 0) & (j > 0))[0]
+        if len(active) == 0:
+            break
+        move = moves[active, i[active] - 1, j[active] - 1]
+        counts[active, move] += 1
+        i[active] -= move != INSERTION
+        j[active] -= move != DELETION
+    counts[:, DELETION] += i
+    counts[:, INSERTION] += j
+    return counts
+
+
+def _common_affixes(ref: np.ndarray, hyp: np.ndarray) -> Tuple[int, int]:
+    """Lengths of the common prefix and (in the rest) the common suffix of two word ID arrays."""
+    length = min(len(ref), len(hyp))
+    differences = np.flatnonzero(ref[:length] != hyp[:length])
+    prefix = int(differences[0]) if len(differences) else length
+    length -= prefix
+    differences = np.flatnonzero(ref[len(ref) - length:][::-1] != hyp[len(hyp) - length:][::-1])
+    suffix = int(differences[0]) if len(differences) else length
+    return prefix, suffix
+
+
+def align_batch(refs: Sequence[np.ndarray], hyps: Sequence[np.ndarray], chunk_size: int = 512,
+                max_cells: int = MAX_CELLS) -> List[Alignment]:
+    """
+    Align many reference/hypothesis pairs of integer word IDs at once.
+
+    Like jiwer, the common prefix and suffix of a pair are matched first, and only the rest
+    is aligned. Pairs are sorted by length and processed in chunks of at most chunk_size pairs
+    and max_cells DP cells (pairs x longest reference x longest hypothesis), so padding stays
+    small and memory stays bounded for long-form transcripts; a single pair larger than
+    max_cells is aligned on its own.
+
+    Returns:
+        List of Alignments, in the same order as the pairs
+    """
+    affixes = [_common_affixes(ref, hyp) for ref, hyp in zip(refs, hyps)]
+    refs = [ref[prefix:len(ref) - suffix] for ref, (prefix, suffix) in zip(refs, affixes)]
+    hyps = [hyp[prefix:len(hyp) - suffix] for hyp, (prefix, suffix) in zip(hyps, affixes)]
+    order = sorted(range(len(refs)), key=lambda k: (len(refs[k]), len(hyps[k])))
+    results: List[Optional[Alignment]] = [None] * len(refs)
+    chunks, chunk, max_n, max_m = [], [], 0, 0
+    for k in order:
+        n, m = max(max_n, len(refs[k])), max(max_m, len(hyps[k]))
+        if chunk and (len(chunk) == chunk_size or (len(chunk) + 1) * (n + 1) * (m + 1) > max_cells):
+            chunks.append(chunk)
+            chunk, n, m = [], len(refs[k]), len(hyps[k])
+        chunk.append(k)
+        max_n, max_m = n, m
+    if chunk:
+        chunks.append(chunk)
+
+    for chunk in chunks:
+        counts = _align_chunk([refs[k] for k in chunk], [hyps[k] for k in chunk])
+        for k, (hits, substitutions, deletions, insertions) in zip(chunk, counts.tolist()):
+            results[k] = Alignment(hits + sum(affixes[k]), substitutions, deletions, insertions)
+    return results
+
+
+def align(ref: np.ndarray, hyp: np.ndarray) -> Alignment:
+    """Count hits, substitutions, deletions and insertions of a minimum-cost alignment of one pair."""
+    return align_batch([ref], [hyp])[0]
+
+
+class WEREngine:
+    """
+    Evaluate hypotheses of several models against one set of references.
+
+    References are tokenized and encoded once; alignments are cached per
+    (reference index, hypothesis) so identical outputs of different models or
+    repeated runs in the same session are only aligned once. All uncached pairs
+    of a model are aligned in one vectorized batch.
+    """
+
+    def __init__(self, references: Sequence[str]):
+        self.vocab: Dict[str, int] = {}
+        self.references = [self.encode(ref) for ref in references]
+        self._cache: Dict[Tuple[int, str], Alignment] = {}
+
+    def encode(self, text: str) -> np.ndarray:
+        """Map the whitespace-separated words of text to integer IDs."""
+        vocab = self.vocab
+        ids = [vocab.get(word) for word in text.split()]
+        if None in ids:
+            ids = [vocab.setdefault(word, len(vocab)) for word in text.split()]
+        return np.array(ids, dtype=np.int32)
+
+    def align(self, ref_index: int, hypothesis: str) -> Alignment:
+        """Align a hypothesis with the reference at ref_index."""
+        key = (ref_index, hypothesis)
+        alignment = self._cache.get(key)
+        if alignment is None:
+            alignment = align(self.references[ref_index], self.encode(hypothesis))
+            self._cache[key] = alignment
+        return alignment
+
+    def align_all(self, hypotheses: Sequence[Optional[str]], skip_empty: bool = True) -> List[Optional[Alignment]]:
+        """
+        Align hypotheses, given in the same order as the references, in one batch.
+
+        Returns:
+            List of Alignments, None for missing hypotheses (None) and, if skip_empty, for pairs
+            where the reference or the hypothesis is empty
+        """
+        indices = []
+        for index, hypothesis in enumerate(hypotheses):
+            if hypothesis is None:
+                continue
+            if skip_empty and (len(self.references[index]) == 0 or not hypothesis.strip()):
+                continue
+            indices.append(index)
+
+        todo = [index for index in indices if (index, hypotheses[index]) not in self._cache]
+        alignments = align_batch([self.references[index] for index in todo],
+                                 [self.encode(hypotheses[index]) for index in todo])
+        for index, alignment in zip(todo, alignments):
+            self._cache[(index, hypotheses[index])] = alignment
+
+        results: List[Optional[Alignment]] = [None] * len(self.references)
+        for index in indices:
+            results[index] = self._cache[(index, hypotheses[index])]
+        return results
+
+    def evaluate(self, hypotheses: Sequence[Optional[str]], skip_empty: bool = True) -> dict:
+        """
+        Evaluate one model's hypotheses, given in the same order as the references.
+
+        Args:
+            hypotheses: Hypothesis strings (None for missing hypotheses, which are skipped)
+            skip_empty: Skip pairs where the reference or the hypothesis is empty
+
+        Returns:
+            Dictionary with corpus-level WER (total errors / total reference words), mean
+            per-utterance WER, per-utterance WERs (NaN for skipped pairs) and S/D/I/hit counts
+        """
+        alignments = self.align_all(hypotheses, skip_empty=skip_empty)
+        totals = Alignment(0, 0, 0, 0)
+        per_utterance = np.full(len(self.references), np.nan)
+        for index, alignment in enumerate(alignments):
+            if alignment is None:
+                continue
+            per_utterance[index] = alignment.wer
+            totals.hits += alignment.hits
+            totals.substitutions += alignment.substitutions
+            totals.deletions += alignment.deletions
+            totals.insertions += alignment.insertions
+
+        scored = per_utterance[~np.isnan(per_utterance)]
+        return {
+            'corpus_wer': totals.wer if totals.ref_words else float('inf'),
+            'mean_utterance_wer': float(scored.mean()) if len(scored) else float('inf'),
+            'utterance_wer': per_utterance.tolist(),
+            'utterances': int(len(scored)),
+            'ref_words': totals.ref_words,
+            'hits': totals.hits,
+            'substitutions': totals.substitutions,
+            'deletions': totals.deletions,
+            'insertions': totals.insertions,
+        }
+
+
+def wer(reference: str, hypothesis: str) -> float:
+    """WER of a single reference/hypothesis pair."""
+    engine = WEREngine([reference])
+    return engine.align(0, hypothesis).wer
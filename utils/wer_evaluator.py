@@ -8,8 +8,17 @@ by calculating Word Error Rate between reference and hypothesis transcripts.
 import os
 import glob
 from pathlib import Path
-from typing import List, Dict, Tuple
-import jiwer
+from typing import List, Dict, Tuple, Optional, Union
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+try:
+    from utils.wer_engine import WEREngine, wer as engine_wer
+    from utils.profiling import get_profiler
+except ImportError:  # Run as a script from within utils/
+    from wer_engine import WEREngine, wer as engine_wer
+    from profiling import get_profiler
 
 
 def read_reference_transcripts(ref_path: str = os.path.join("data", "reference_transcripts", "orthographic")) -> List[str]:
@@ -74,38 +83,209 @@ def calculate_wer(reference: str, hypothesis: str) -> float:
         
     Returns:
         WER as a float (0.0 = perfect, higher = more errors)
+
+    Raises:
+        ValueError: If the reference is empty (the WER is undefined), as jiwer.wer does
     """
-    return jiwer.wer(reference, hypothesis)
+    if not reference.strip():
+        raise ValueError("The reference is empty; the WER is undefined")
+    return engine_wer(reference, hypothesis)
+
 
+def _scored_hypotheses(ref_transcripts: List[str], hyp_transcripts: List[str],
+                       penalize_empty: bool) -> List[Optional[str]]:
+    """Hypotheses to score (None = skipped): empty references are never scored, empty hypotheses if penalize_empty."""
+    return [None if not ref.strip() or (not hyp.strip() and not penalize_empty) else hyp
+            for ref, hyp in zip(ref_transcripts, hyp_transcripts)]
 
-def evaluate_wer(ref_transcripts: List[str], model_transcripts: Dict[str, List[str]]) -> Dict[str, float]:
+
+def evaluate_wer(ref_transcripts: List[str], model_transcripts: Dict[str, List[str]],
+                 penalize_empty: bool = True) -> Dict[str, float]:
     """
     Evaluate WER for all models against reference transcripts.
     
     Args:
         ref_transcripts: List of reference transcript strings
         model_transcripts: Dictionary mapping model names to transcript lists
+        penalize_empty: Score empty hypotheses as all words deleted (default, like evaluate_models);
+            False skips them. Empty references are always skipped.
         
     Returns:
         Dictionary mapping model names to average WER scores
     """
     results = {}
+    engine = WEREngine(ref_transcripts)
     
     for model_name, hyp_transcripts in model_transcripts.items():
         if len(hyp_transcripts) != len(ref_transcripts):
             print(f"Warning: Mismatch in transcript counts for {model_name}")
             continue
             
-        total_wer = 0.0
-        valid_pairs = 0
+        hypotheses = _scored_hypotheses(ref_transcripts, hyp_transcripts, penalize_empty)
+        results[model_name] = engine.evaluate(hypotheses, skip_empty=False)['mean_utterance_wer']
+    
+    return results
+
+
+def evaluate_wer_detailed(ref_transcripts: List[str], model_transcripts: Dict[str, List[str]],
+                          penalize_empty: bool = True) -> Dict[str, dict]:
+    """
+    Evaluate WER for all models, with corpus-level and per-utterance scores.
+    
+    Args:
+        ref_transcripts: List of reference transcript strings
+        model_transcripts: Dictionary mapping model names to transcript lists
+        penalize_empty: Score empty hypotheses as all words deleted (default); False skips them
+        
+    Returns:
+        Dictionary mapping model names to a dictionary with 'corpus_wer' (total errors / total
+        reference words), 'mean_utterance_wer', 'utterance_wer' and substitution, deletion,
+        insertion and hit counts
+    """
+    engine = WEREngine(ref_transcripts)
+    results = {}
+    for model_name, hyp_transcripts in model_transcripts.items():
+        if len(hyp_transcripts) != len(ref_transcripts):
+            print(f"Warning: Mismatch in transcript counts for {model_name}")
+            continue
+        hypotheses = _scored_hypotheses(ref_transcripts, hyp_transcripts, penalize_empty)
+        results[model_name] = engine.evaluate(hypotheses, skip_empty=False)
+    return results
+
+
+TIMEOUT_TRANSCRIPT = 'None'  # written by transcribe_segments for segments that timed out
+
+
+def read_transcripts_by_id(path: str) -> Dict[str, str]:
+    """
+    Read all .txt transcripts in a folder, keyed by segment ID (the filename without extension).
+    
+    Args:
+        path: Path to folder containing transcript files
         
-        for ref, hyp in zip(ref_transcripts, hyp_transcripts):
-            if ref.strip() and hyp.strip():  # Skip empty transcripts
-                wer = calculate_wer(ref, hyp)
-                total_wer += wer
-                valid_pairs += 1
+    Returns:
+        Dictionary mapping segment IDs to transcript strings
+    """
+    transcripts = {}
+    for file_path in glob.glob(os.path.join(path, "*.txt")):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            transcripts[Path(file_path).stem] = f.read().strip()
+    return transcripts
+
+
+def _evaluate_model(model: str, references: Dict[str, str], hypotheses: Dict[str, str],
+                    penalize_missing: bool, penalize_empty: bool = True) -> List[dict]:
+    """Evaluate one model's hypotheses against the references, joined on segment ID (one row per segment)."""
+    segment_ids = sorted(references)
+    statuses, hyp_list = [], []
+    for segment_id in segment_ids:
+        hypothesis = hypotheses.get(segment_id)
+        if not references[segment_id].strip():
+            # Without reference words the WER is undefined: never scored
+            status, hypothesis = 'empty_reference', None
+        elif hypothesis is None:
+            status = 'missing'
+        elif hypothesis == TIMEOUT_TRANSCRIPT:
+            status, hypothesis = 'timeout', None
+        elif not hypothesis.strip():
+            status = 'empty'
+            if not penalize_empty:
+                hypothesis = None
+        else:
+            status = 'scored'
+        if hypothesis is None and penalize_missing and status in ('missing', 'timeout'):
+            hypothesis = ''  # score as if nothing was recognised: all reference words deleted
+        statuses.append(status)
+        hyp_list.append(hypothesis)
+
+    with get_profiler().stage('evaluation', model=model, segments=len(segment_ids)):
+        engine = WEREngine([references[segment_id] for segment_id in segment_ids])
+        alignments = engine.align_all(hyp_list, skip_empty=False)
+
+    rows = []
+    for segment_id, status, alignment in zip(segment_ids, statuses, alignments):
+        row = {'model': model, 'segment_id': segment_id, 'status': status,
+               'ref_words': None, 'hits': None, 'substitutions': None, 'deletions': None,
+               'insertions': None, 'wer': None}
+        if alignment is not None:
+            row.update(ref_words=alignment.ref_words, hits=alignment.hits,
+                       substitutions=alignment.substitutions, deletions=alignment.deletions,
+                       insertions=alignment.insertions, wer=alignment.wer)
+        rows.append(row)
+    for segment_id in sorted(set(hypotheses) - set(references)):
+        rows.append({'model': model, 'segment_id': segment_id, 'status': 'no_reference'})
+    return rows
+
+
+def evaluate_models(ref_path: str, asr_paths: Union[str, List[str]], max_workers: Optional[int] = None,
+                    penalize_missing: bool = False, output_path: Optional[str] = None,
+                    penalize_empty: bool = True) -> pd.DataFrame:
+    """
+    Evaluate all models in one or more ASR output folders, joining hypotheses to references by segment ID.
+    
+    Models are evaluated in parallel in a process pool. Missing hypotheses, timeouts ('None'
+    transcripts), empty outputs and hypotheses without a reference are kept in the table with
+    their status instead of causing the whole model to be skipped. Segments with an empty
+    reference (status 'empty_reference') are never scored: without reference words the WER
+    is undefined.
+    
+    Args:
+        ref_path: Path to folder containing reference transcript files
+        asr_paths: Folder (or list of folders) with one subfolder of transcripts per model
+        max_workers: Number of worker processes (default: number of CPUs)
+        penalize_missing: Score missing and timed-out hypotheses as empty (all words deleted)
+            instead of leaving them out of the WER
+        penalize_empty: Score empty hypotheses as all words deleted (default). This includes the
+            empty transcripts of segments the VAD pre-filter dropped (utils/vad.py), so speech it
+            misses counts against the WER; False leaves empty hypotheses out of the WER
+        output_path: Optional .csv or .parquet file to write the table to
         
-        avg_wer = total_wer / valid_pairs if valid_pairs > 0 else float('inf')
-        results[model_name] = avg_wer
+    Returns:
+        DataFrame with one row per model x segment: model, segment_id, status, ref_words,
+        hits, substitutions, deletions, insertions and wer. The model column is
+        '<asr folder>/<model folder>'.
+    """
+    if isinstance(asr_paths, str):
+        asr_paths = [asr_paths]
+    references = read_transcripts_by_id(ref_path)
+
+    jobs = {}
+    for asr_path in asr_paths:
+        for model_dir in sorted(os.listdir(asr_path)):
+            model_path = os.path.join(asr_path, model_dir)
+            if os.path.isdir(model_path) and not model_dir.startswith('.'):
+                jobs[f"{os.path.basename(os.path.normpath(asr_path))}/{model_dir}"] = read_transcripts_by_id(model_path)
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_evaluate_model, model, references, hypotheses, penalize_missing, penalize_empty)
+                   for model, hypotheses in jobs.items()]
+        for future in futures:
+            rows.extend(future.result())
+
+    columns = ['model', 'segment_id', 'status', 'ref_words', 'hits', 'substitutions', 'deletions', 'insertions', 'wer']
+    table = pd.DataFrame(rows, columns=columns)
+    if output_path is not None:
+        if output_path.endswith('.parquet'):
+            table.to_parquet(output_path, index=False)
+        else:
+            table.to_csv(output_path, index=False)
+    return table
+
+
+def summarize_results(table: pd.DataFrame) -> pd.DataFrame:
+    """
+    Summarize an evaluate_models table per model.
     
-    return results
+    Returns:
+        DataFrame with corpus WER (total errors / total reference words), mean per-utterance
+        WER and the number of segments per status, one row per model
+    """
+    scored = table.dropna(subset=['wer'])
+    errors = scored['substitutions'] + scored['deletions'] + scored['insertions']
+    summary = pd.DataFrame({
+        'corpus_wer': errors.groupby(scored['model']).sum() / scored.groupby('model')['ref_words'].sum(),
+        'mean_utterance_wer': scored.groupby('model')['wer'].mean(),
+    })
+    counts = table.groupby(['model', 'status']).size().unstack(fill_value=0)
+    return summary.join(counts, how='outer')